@@ -220,7 +220,7 @@ class IntroductionIntention(AbstractIntention, PresentTeamApp):
             question = self.context.chat.add_utterance([UtteranceHypothesis(query, 1)], False)
             question.analyze()
 
-            brain_response = self.brain.query_brain(question)
+            brain_response = self.async_brain.query_brain(question).result()
             reply = reply_to_question(brain_response)
             if reply: self.say(reply, block=False)
         except Exception as e:
@@ -1,11 +1,8 @@
-######################################### Helpers for question processing #########################################
+from pepper.brain.utils.query_registry import QueryTemplate
 
-def create_query(self, utterance):
-    empty = self._rdf_builder.fill_literal('')
 
-    # Query subject
-    if utterance.triple.subject_name == empty:
-        query = """
+# Questions about the subject, the complement or the existence of a triple
+QUESTION_SUBJECT = QueryTemplate('question/subject', """
                    SELECT distinct ?slabel ?authorlabel ?certaintyValue ?polarityValue ?sentimentValue ?emotionValue ?temporalValue
                            WHERE { 
                                ?s n2mu:%s ?o . 
@@ -39,13 +36,9 @@ def create_query(self, utterance):
                                ?sentiment rdf:type grasps:SentimentValue .
                                ?sentiment rdfs:label ?sentimentValue .
                            }
-                   """ % (utterance.triple.predicate_name,
-                          utterance.triple.complement_name,
-                          utterance.triple.predicate_name)
+                   """)
 
-    # Query complement
-    elif utterance.triple.complement_name == empty:
-        query = """
+QUESTION_COMPLEMENT = QueryTemplate('question/complement', """
                    SELECT distinct ?olabel ?authorlabel ?certaintyValue ?polarityValue ?sentimentValue ?emotionValue ?temporalValue
                            WHERE { 
                                ?s n2mu:%s ?o .   
@@ -79,13 +72,9 @@ def create_query(self, utterance):
                                ?sentiment rdf:type grasps:SentimentValue .
                                ?sentiment rdfs:label ?sentimentValue .
                            }
-                   """ % (utterance.triple.predicate_name,
-                          utterance.triple.subject_name,
-                          utterance.triple.predicate_name)
+                   """)
 
-    # Query existence
-    else:
-        query = """
+QUESTION_EXISTENCE = QueryTemplate('question/existence', """
                    SELECT distinct ?authorlabel ?certaintyValue ?polarityValue ?sentimentValue ?emotionValue ?temporalValue
                            WHERE { 
                                ?s n2mu:%s ?o .   
@@ -119,10 +108,32 @@ def create_query(self, utterance):
                                ?sentiment rdf:type grasps:SentimentValue .
                                ?sentiment rdfs:label ?sentimentValue .
                            }
-                   """ % (utterance.triple.predicate_name,
-                          utterance.triple.subject_name,
-                          utterance.triple.complement_name,
-                          utterance.triple.predicate_name)
+                   """)
+
+
+######################################### Helpers for question processing #########################################
+
+def create_query(self, utterance):
+    empty = self._rdf_builder.fill_literal('')
+
+    # Query subject
+    if utterance.triple.subject_name == empty:
+        query = QUESTION_SUBJECT.fill(utterance.triple.predicate_name,
+                                      utterance.triple.complement_name,
+                                      utterance.triple.predicate_name)
+
+    # Query complement
+    elif utterance.triple.complement_name == empty:
+        query = QUESTION_COMPLEMENT.fill(utterance.triple.predicate_name,
+                                         utterance.triple.subject_name,
+                                         utterance.triple.predicate_name)
+
+    # Query existence
+    else:
+        query = QUESTION_EXISTENCE.fill(utterance.triple.predicate_name,
+                                        utterance.triple.subject_name,
+                                        utterance.triple.complement_name,
+                                        utterance.triple.predicate_name)
 
     query = self.query_prefixes + query
 
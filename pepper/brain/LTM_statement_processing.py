@@ -63,11 +63,13 @@ def _create_detections(self, cntxt, context):
     object_type = self._rdf_builder.create_resource_uri('N2MU', 'object')
     instances = []
     observations = []
+    object_ids = []
 
     for item in cntxt.objects:
         if item.name.lower() != 'person':
             # Create instance
             mem_id, memory = get_object_id(memory, item.name)
+            object_ids.append((item.name, mem_id))
             objct_id = self._rdf_builder.fill_literal(mem_id, datatype=self.namespaces['XML']['string'])
             objct = self._rdf_builder.fill_entity(casefold_text('%s %s' % (item.name, objct_id), format='triple'),
                                                   [casefold_text(item.name, format='triple'), 'Instance', 'object'],
@@ -87,6 +89,13 @@ def _create_detections(self, cntxt, context):
                                                                    casefold_text(item.name, format='triple'))
             self.ontology_graph.add((learnable_type, RDFS.subClassOf, object_type))
 
+            # A new subclass changes the ontology, so its cached lookups are outdated once uploaded
+            if casefold_text(item.name, format='triple') not in self._cached_classes():
+                self._ontology_cache.invalidate_on_upload()
+
+    # Remember the ids given to objects in this location
+    self.location_reasoner.register_object_ids(cntxt, object_ids)
+
     # Detections: faces
     for item in cntxt.people:
         if item.name.lower() != item.UNKNOWN.lower():
@@ -170,6 +179,12 @@ def _create_context(self, cntxt):
     # Detections
     instances, observations = _create_detections(self, cntxt, context)
 
+    # Keep episodic memory up to date
+    if cntxt.location is not None:
+        self.location_reasoner.index_context(context.label, location.label, time.label,
+                                             [instance.label for instance in instances] +
+                                             [location_city.label, location_country.label, location_region.label])
+
     return context, instances, observations
 
 
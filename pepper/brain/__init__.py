@@ -4,4 +4,5 @@ The Pepper Brain Package contains the tools to submit and query the RDF database
 
 
 from .long_term_memory import LongTermMemory
+from .async_brain import AsyncBrain
 from pepper.brain.infrastructure import *
@@ -0,0 +1,133 @@
+from pepper import logger
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+
+
+class AsyncBrain(object):
+    def __init__(self, brain, max_pending_experiences=100):
+        # type: (LongTermMemory, int) -> None
+        """
+        Thread-safe facade on a brain, running its calls on a brain thread and returning futures of their results
+
+        Calls run one at a time in the order they were made, as the local memory of a brain is not thread-safe. Callers
+        (e.g. camera or speech callbacks) return immediately, and get the result with future.result() or
+        future.add_done_callback when they need it. Calls made directly on the brain are not ordered with these
+
+        Parameters
+        ----------
+        brain: LongTermMemory
+            Brain to run calls on
+        max_pending_experiences: int
+            Number of experiences waiting for the brain thread, after which new experiences are dropped instead of
+            queued (as perception keeps producing them while the Triple store is slow). If None, none are dropped
+        """
+        self._brain = brain
+        self.max_pending_experiences = max_pending_experiences
+
+        self._log = logger.getChild(self.__class__.__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._lock = Lock()
+        self._pending_experiences = 0
+        self._dropped_experiences = 0
+
+    @property
+    def brain(self):
+        # type: () -> LongTermMemory
+        """
+        Brain calls are run on
+        """
+        return self._brain
+
+    @property
+    def dropped_experiences(self):
+        # type: () -> int
+        """
+        Number of experiences dropped because too many were pending
+        """
+        return self._dropped_experiences
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Run any function on the brain thread, ordered with the other calls
+        :param function: function to run, usually a method of the brain
+        :return: Future of the result of the function, failures are logged when it is done
+        """
+        future = self._executor.submit(function, *args, **kwargs)
+        future.add_done_callback(lambda done: self._log_failure(function, done))
+        return future
+
+    def _log_failure(self, function, future):
+        # Callers that do not wait for the result (e.g. experiences, renaming locations) do not see failures otherwise
+        if not future.cancelled() and future.exception() is not None:
+            self._log.error("{} failed: {}".format(getattr(function, '__name__', function), future.exception()))
+
+    def update(self, utterance, reason_types=False, await_thoughts=None):
+        """
+        Process a statement, see LongTermMemory.update
+        :return: Future of the output of update
+        """
+        return self.submit(self._brain.update, utterance, reason_types, await_thoughts)
+
+    def update_many(self, utterances, reason_types=False, thoughts=False):
+        """
+        Process many statements at once, see LongTermMemory.update_many
+        :return: Future of the outputs of update_many
+        """
+        return self.submit(self._brain.update_many, utterances, reason_types, thoughts)
+
+    def query_brain(self, utterance):
+        """
+        Answer a question, see LongTermMemory.query_brain
+        :return: Future of the output of query_brain
+        """
+        return self.submit(self._brain.query_brain, utterance)
+
+    def experience(self, utterance):
+        """
+        Process an experience, see LongTermMemory.experience
+        :return: Future of the output of experience, with None as result if the experience was dropped
+        """
+        with self._lock:
+            if self.max_pending_experiences is not None and self._pending_experiences >= self.max_pending_experiences:
+                self._dropped_experiences += 1
+                self._log.warning("Dropped experience, {} pending".format(self._pending_experiences))
+
+                dropped = Future()
+                dropped.set_result(None)
+                return dropped
+
+            self._pending_experiences += 1
+
+        return self.submit(self._experience, utterance)
+
+    def _experience(self, utterance):
+        try:
+            return self._brain.experience(utterance)
+        finally:
+            with self._lock:
+                self._pending_experiences -= 1
+
+    def reason_location(self, cntxt):
+        """
+        Guess the location of a context, see LocationReasoner.reason_location
+        :return: Future of the guessed location label
+        """
+        return self.submit(self._brain.reason_location, cntxt)
+
+    def set_location_label(self, label):
+        """
+        Rename the current location, see LocationReasoner.set_location_label
+        :return: Future that is done once the location was renamed
+        """
+        return self.submit(self._brain.set_location_label, label)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the brain thread, after the calls made so far
+        :param wait: whether to wait for these calls to finish
+        :return:
+        """
+        self._executor.shutdown(wait=wait)
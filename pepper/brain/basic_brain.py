@@ -1,8 +1,109 @@
-from pepper.brain.utils.helper_functions import read_query
-from pepper.brain.infrastructure import StoreConnector, RdfBuilder
+from pepper.brain.utils.helper_functions import read_query, fill_query
+from pepper.brain.infrastructure import StoreConnector, LocalStoreConnector, RdfBuilder, BrainJournal, WriteBuffer
 from pepper import config, logger
 
-from datetime import datetime
+from threading import Lock
+from time import time
+
+
+class OntologyCache(object):
+    def __init__(self, ttl=None):
+        # type: (float) -> None
+        """
+        Versioned cache of ontology lookups. Entries expire after ttl seconds, and all of them at once when the
+        ontology changes (see invalidate)
+
+        Parameters
+        ----------
+        ttl: float
+            Seconds an entry is valid. If None, entries are only dropped by invalidate
+        """
+        self.ttl = ttl
+
+        self._lock = Lock()
+        self._version = 0
+        self._entries = {}
+        self._changed_locally = False
+
+    def get(self, key, fetch):
+        """
+        Get a cached value, fetching it again if it expired or the ontology changed since it was fetched
+        :param key: name of the lookup
+        :param fetch: function without arguments returning the value
+        :return: cached value
+        """
+        with self._lock:
+            version = self._version
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] == version and (self.ttl is None or time() - entry[1] < self.ttl):
+                return entry[2]
+
+        # Fetch without holding the lock, a value fetched while the ontology changed is not kept
+        value = fetch()
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (version, time(), value)
+
+        return value
+
+    def invalidate(self):
+        """
+        Drop all cached lookups, to be called when the ontology changes
+        :return:
+        """
+        with self._lock:
+            self._version += 1
+            self._entries = {}
+            self._changed_locally = False
+
+    def invalidate_on_upload(self):
+        """
+        Mark the ontology as changed in local memory, so the cache is invalidated once it is uploaded
+        :return:
+        """
+        with self._lock:
+            self._changed_locally = True
+
+    def uploaded(self):
+        """
+        Invalidate the cache if local memory that was just uploaded changed the ontology
+        :return:
+        """
+        if self._changed_locally:
+            self.invalidate()
+
+
+class BrainContext(object):
+    def __init__(self, address=config.BRAIN_URL_LOCAL):
+        # type: (str) -> None
+        """
+        Store connection, RDF builder, brain log, ontology cache and write buffer shared by a brain and the
+        reasoners it uses
+
+        Parameters
+        ----------
+        address: str
+            IP address and port of the Triple store, or address of an in-process store (see LocalStoreConnector)
+        """
+        if address.startswith(LocalStoreConnector.SCHEME):
+            self.connection = LocalStoreConnector(address, format=config.BRAIN_WIRE_FORMAT,
+                                                  slow_query_threshold=config.BRAIN_SLOW_QUERY_THRESHOLD,
+                                                  slow_query_log_size=config.BRAIN_SLOW_QUERY_LOG_SIZE)
+        else:
+            self.connection = StoreConnector(address, format=config.BRAIN_WIRE_FORMAT,
+                                             pool_size=config.BRAIN_POOL_SIZE, timeout=config.BRAIN_TIMEOUT,
+                                             retries=config.BRAIN_RETRIES,
+                                             slow_query_threshold=config.BRAIN_SLOW_QUERY_THRESHOLD,
+                                             slow_query_log_size=config.BRAIN_SLOW_QUERY_LOG_SIZE)
+
+        self.rdf_builder = RdfBuilder(cache_size=config.BRAIN_RDF_CACHE_SIZE)
+        self.brain_log = BrainJournal(config.BRAIN_LOG_ROOT, self.connection.format,
+                                      max_bytes=config.BRAIN_LOG_SEGMENT_SIZE, max_age=config.BRAIN_LOG_SEGMENT_AGE)
+        self.ontology_cache = OntologyCache(config.BRAIN_ONTOLOGY_CACHE_TTL)
+        self.write_buffer = WriteBuffer(self.connection, self.brain_log, max_triples=config.BRAIN_BUFFER_SIZE,
+                                        max_delay=config.BRAIN_BUFFER_DELAY, on_upload=self.ontology_cache.uploaded)
 
 
 class BasicBrain(object):
@@ -16,8 +117,8 @@ class BasicBrain(object):
 
     _NOT_TO_ASK_PREDICATES = ['faceID', 'name']
 
-    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, is_submodule=False):
-        # type: (str, bool) -> None
+    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, is_submodule=False, context=None):
+        # type: (str, bool, bool, BrainContext) -> None
         """
         Interact with Triple store
 
@@ -25,17 +126,28 @@ class BasicBrain(object):
         ----------
         address: str
             IP address and port of the Triple store
+        clear_all: bool
+            Whether to clear the contents of the Triple store (testing purposes)
+        is_submodule: bool
+            Whether this brain is a reasoner of another brain, in which case the ontology is not uploaded
+        context: BrainContext
+            Connection, RDF builder and brain log to borrow from another brain. A new one is created if None
         """
-        self._connection = StoreConnector(address, format='trig')
-        self._rdf_builder = RdfBuilder()
+        self.context = BrainContext(address) if context is None else context
+
+        self._connection = self.context.connection
+        self._rdf_builder = self.context.rdf_builder
+        self._ontology_cache = self.context.ontology_cache
+        self._write_buffer = self.context.write_buffer
 
         self._log = logger.getChild(self.__class__.__name__)
         self._log.debug("Booted")
 
-        self._brain_log = config.BRAIN_LOG_ROOT.format(datetime.now().strftime('%Y-%m-%d-%H-%M'))
+        self._brain_log = self.context.brain_log
 
-        # Start with a clean local memory
-        self.clean_local_memory()
+        # Start with a clean local memory, unless it is borrowed from another brain
+        if context is None:
+            self.clean_local_memory()
 
         if not is_submodule:
             # Possible clear all contents (testing purposes)
@@ -54,9 +166,12 @@ class BasicBrain(object):
         """
         self._log.info("Posting triples")
 
-        return self._connection.upload(data)
+        code = self._connection.upload(data)
+        self._ontology_cache.uploaded()
 
-    def _submit_query(self, query, ask=False, post=False):
+        return code
+
+    def _submit_query(self, query, ask=False, post=False, flush_buffer=True):
         """
         Submit a query to the triple store
         Parameters
@@ -65,27 +180,62 @@ class BasicBrain(object):
             SPARQL query to be posted
         ask: bool
             Whether the query is of type ask, in which case the structure of the response changes
+        post: bool
+            Whether the query is a SPARQL update. Updates that succeed are written to the brain journal
+        flush_buffer: bool
+            Whether to upload buffered experiences first, so the query sees them
 
         Returns
         -------
 
         """
+        if flush_buffer:
+            self._write_buffer.flush()
+
         self._log.debug("Posting query")
 
-        return self._connection.query(query, ask=ask, post=post)
+        response = self._connection.query(query, ask=ask, post=post)
+
+        # Updates change the brain as uploads do, journal them so replaying the journal applies them too
+        if post and str(response).startswith('2'):
+            self._brain_log.write_update(query)
+
+        return response
+
+    def _submit_query_iter(self, query, page_size=config.BRAIN_QUERY_PAGE_SIZE, flush_buffer=True):
+        """
+        Submit a select query to the triple store, reading its result rows as they are consumed
+        Parameters
+        ----------
+        query: str
+            SPARQL select query, ordered and without LIMIT or OFFSET when paged
+        page_size: int
+            Number of rows requested at once, or None to request all of them at once
+        flush_buffer: bool
+            Whether to upload buffered experiences first, so the query sees them
+
+        Returns
+        -------
+        rows: generator of bindings, as in the SPARQL JSON results of the query
+        """
+        if flush_buffer:
+            self._write_buffer.flush()
+
+        self._log.debug("Posting streamed query")
+
+        return self._connection.query_iter(query, page_size=page_size)
 
     ########## brain structure exploration ##########
-    def _serialize(self, file_path):
+    def _serialize(self, journal):
         """
-        Save graph to local file and return the serialized string
-        :param file_path: path to where data will be saved
+        Append local memory to the brain journal, return the serialized string and clean it
+        :param journal: BrainJournal where data will be saved
         :return: serialized data as string
         """
-        # Save to file but return the python representation
-        with open(file_path + '.' + self._connection.format, 'w') as f:
-            self.dataset.serialize(f, format=self._connection.format)
-
+        # Serialize once, journal that and return it
         data = self.dataset.serialize(format=self._connection.format)
+        journal.write(data)
+
         self.clean_local_memory()
 
         return data
@@ -102,6 +252,8 @@ class BasicBrain(object):
             data = self._serialize(self._brain_log)
             _ = self._connection.upload(data)
 
+            self._ontology_cache.invalidate()
+
     def ontology_is_uploaded(self):
         """
         Query the existance of the Ontology graph, thus not importing the whole Ontology every time
@@ -113,31 +265,19 @@ class BasicBrain(object):
 
         return response
 
-    def get_predicates(self):
-        """
-        Get predicates in social ontology
-        :return:
-        """
+    def _query_predicates(self):
         query = read_query('structure exploration/predicates')
         response = self._submit_query(query)
 
         return [elem['p']['value'].split('/')[-1] for elem in response]
 
-    def get_classes(self):
-        """
-        Get classes or types in social ontology
-        :return:
-        """
+    def _query_classes(self):
         query = read_query('structure exploration/classes')
         response = self._submit_query(query)
 
         return [elem['c']['value'].split('/')[-1] for elem in response]
 
-    def get_labels_and_classes(self):
-        """
-        Get classes in social ontology
-        :return:
-        """
+    def _query_labels_and_classes(self):
         query = read_query('structure exploration/labels_and_classes')
         response = self._submit_query(query)
 
@@ -147,6 +287,44 @@ class BasicBrain(object):
 
         return temp
 
+    def _cached_classes(self):
+        """
+        Classes in social ontology as a set, for membership tests. Cached, do not modify
+        :return:
+        """
+        return self._ontology_cache.get('class_set', lambda: frozenset(self._cached_class_list()))
+
+    def _cached_class_list(self):
+        return self._ontology_cache.get('classes', self._query_classes)
+
+    def _cached_labels_and_classes(self):
+        """
+        Mapping of labels to classes in social ontology. Cached, do not modify
+        :return:
+        """
+        return self._ontology_cache.get('labels_and_classes', self._query_labels_and_classes)
+
+    def get_predicates(self):
+        """
+        Get predicates in social ontology
+        :return:
+        """
+        return list(self._ontology_cache.get('predicates', self._query_predicates))
+
+    def get_classes(self):
+        """
+        Get classes or types in social ontology
+        :return:
+        """
+        return list(self._cached_class_list())
+
+    def get_labels_and_classes(self):
+        """
+        Get classes in social ontology
+        :return:
+        """
+        return dict(self._cached_labels_and_classes())
+
     ########## learned facts exploration ##########
     def count_statements(self):
         """
@@ -162,7 +340,7 @@ class BasicBrain(object):
         Count statements or 'facts' in the brain by a given author
         :return:
         """
-        query = read_query('trust/count_statements_by') % actor_label
+        query = fill_query('trust/count_statements_by', actor_label)
         response = self._submit_query(query)
         return response[0]['num_stat']['value']
 
@@ -171,7 +349,7 @@ class BasicBrain(object):
         Return statements or 'facts' in the brain by a given author, that have not been heard from anyone else
         :return:
         """
-        query = read_query('trust/novel_statements_by') % actor_label
+        query = fill_query('trust/novel_statements_by', actor_label)
         response = self._submit_query(query)
         return [elem['stat']['value'].split('/')[-1] for elem in response]
 
@@ -180,16 +358,22 @@ class BasicBrain(object):
         Count statements or 'facts' in the brain
         :return:
         """
+        return list(self.iter_conflicts())
+
+    def iter_conflicts(self):
+        """
+        Iterate over all conflicts in the brain, reading them page by page
+        :return:
+        """
         query = read_query('content exploration/all_conflicts')
-        response = self._submit_query(query)
-        return response
+        return self._submit_query_iter(query)
 
     def get_conflicts_by(self, actor_label):
         """
         Count statements or 'facts' in the brain
         :return:
         """
-        query = read_query('trust/conflicts_by') % (actor_label, actor_label)
+        query = fill_query('trust/conflicts_by', actor_label, actor_label)
         response = self._submit_query(query)
         return response
 
@@ -207,9 +391,15 @@ class BasicBrain(object):
         Get names of people I have talked to
         :return:
         """
+        return list(self.iter_my_friends())
+
+    def iter_my_friends(self):
+        """
+        Iterate over names of people I have talked to, reading them page by page
+        :return:
+        """
         query = read_query('content exploration/my_friends')
-        response = self._submit_query(query)
-        return [elem['name']['value'].split('/')[-1] for elem in response]
+        return (elem['name']['value'].split('/')[-1] for elem in self._submit_query_iter(query))
 
     def get_best_friends(self):
         """
@@ -226,7 +416,7 @@ class BasicBrain(object):
         :param actor_label: name of person
         :return:
         """
-        query = read_query('trust/when_last_chat_with') % actor_label
+        query = fill_query('trust/when_last_chat_with', actor_label)
         response = self._submit_query(query)
 
         return response[0]['time']['value'].split('/')[-1] if response != [] else ''
@@ -237,18 +427,29 @@ class BasicBrain(object):
         :param actor_label: name of person
         :return:
         """
-        query = read_query('trust/count_chat_with') % actor_label
+        query = fill_query('trust/count_chat_with', actor_label)
         response = self._submit_query(query)
 
         return response[0]['num_chats']['value'].split('/')[-1] if response != [] else ''
 
+    def get_chats_with(self, actor_label):
+        """
+        Get ids of the chats I had with this person
+        :param actor_label: name of person
+        :return:
+        """
+        query = fill_query('trust/chats_with', actor_label)
+        response = self._submit_query(query)
+
+        return [elem['chatid']['value'] for elem in response]
+
     def get_instance_of_type(self, instance_type):
         """
         Get instances of a certain class type
         :param instance_type: name of class in ontology
         :return:
         """
-        query = read_query('typing/instance_of_type') % instance_type
+        query = fill_query('typing/instance_of_type', instance_type)
         response = self._submit_query(query)
         return [elem['name']['value'] for elem in response] if response else []
 
@@ -258,7 +459,7 @@ class BasicBrain(object):
         :param label: label of instance
         :return:
         """
-        query = read_query('typing/type_of_instance') % label
+        query = fill_query('typing/type_of_instance', label)
         response = self._submit_query(query)
         return [elem['type']['value'] for elem in response] if response else []
 
@@ -268,7 +469,7 @@ class BasicBrain(object):
         :param label: label of instance
         :return:
         """
-        query = read_query('id/id_of_instance') % label
+        query = fill_query('id/id_of_instance', label)
         response = self._submit_query(query)
         return [elem['id']['value'] for elem in response] if response else []
 
@@ -278,9 +479,16 @@ class BasicBrain(object):
         :param predicate:
         :return:
         """
-        query = read_query('content exploration/triples_with_predicate') % predicate
-        response = self._submit_query(query)
-        return [(elem['sname']['value'], elem['oname']['value']) for elem in response]
+        return list(self.iter_triples_with_predicate(predicate))
+
+    def iter_triples_with_predicate(self, predicate):
+        """
+        Iterate over triples that contain this predicate, reading them page by page
+        :param predicate:
+        :return:
+        """
+        query = fill_query('content exploration/triples_with_predicate', predicate)
+        return ((elem['sname']['value'], elem['oname']['value']) for elem in self._submit_query_iter(query))
 
     ########## WARNING deletions area ##########
 
@@ -291,20 +499,52 @@ class BasicBrain(object):
         """
         self._log.debug("Clearing brain")
         query = "delete {?s ?p ?o} where {?s ?p ?o .}  "
-        _ = self._connection.query(query, post=True)
+        _ = self._submit_query(query, post=True, flush_buffer=False)
+
+    def _take_local_memory(self):
+        """
+        Hand over the local memory built so far, and start a clean one
+        :return: rdflib Dataset with the local memory
+        """
+        dataset = self.dataset
+        self.clean_local_memory()
+
+        return dataset
 
     def clean_local_memory(self):
         """
-        Assign direct access to rdf builder attributes
+        Start a clean local memory in the (shared) rdf builder
         Returns
         -------
 
         """
-        self.namespaces = self._rdf_builder.namespaces
-        self.dataset = self._rdf_builder.dataset
+        self._rdf_builder.reset_dataset()
+
+    # Direct access to rdf builder attributes, which change when local memory is cleaned
+    @property
+    def namespaces(self):
+        return self._rdf_builder.namespaces
+
+    @property
+    def dataset(self):
+        return self._rdf_builder.dataset
+
+    @property
+    def ontology_graph(self):
+        return self._rdf_builder.ontology_graph
+
+    @property
+    def instance_graph(self):
+        return self._rdf_builder.instance_graph
+
+    @property
+    def claim_graph(self):
+        return self._rdf_builder.claim_graph
+
+    @property
+    def perspective_graph(self):
+        return self._rdf_builder.perspective_graph
 
-        self.ontology_graph = self._rdf_builder.ontology_graph
-        self.instance_graph = self._rdf_builder.instance_graph
-        self.claim_graph = self._rdf_builder.claim_graph
-        self.perspective_graph = self._rdf_builder.perspective_graph
-        self.interaction_graph = self._rdf_builder.interaction_graph
+    @property
+    def interaction_graph(self):
+        return self._rdf_builder.interaction_graph
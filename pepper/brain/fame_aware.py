@@ -1,4 +1,4 @@
-from pepper.brain.utils.helper_functions import read_query, casefold_text
+from pepper.brain.utils.helper_functions import fill_query, casefold_text
 from pepper.brain.long_term_memory import LongTermMemory
 
 from pepper.brain.LTM_statement_processing import _link_entity, _create_claim_graph
@@ -34,7 +34,7 @@ class FameAwareMemory(LongTermMemory):
 
         for comb in combinations:
             # Try exact matching query
-            query = read_query('famous_person') % (comb, comb, comb)
+            query = fill_query('famous_person', comb, comb, comb)
             try:
                 r = requests.get(url, params={'format': 'json', 'query': query}, timeout=3)
                 data = r.json() if r.status_code != 500 else None
@@ -1,3 +1,8 @@
 from pepper.brain.infrastructure.building_blocks import *
+from pepper.brain.infrastructure.episodic_index import *
+from pepper.brain.infrastructure.lru_cache import *
 from pepper.brain.infrastructure.rdf_builder import *
 from pepper.brain.infrastructure.store_connector import *
+from pepper.brain.infrastructure.local_store_connector import *
+from pepper.brain.infrastructure.brain_journal import *
+from pepper.brain.infrastructure.write_buffer import *
@@ -0,0 +1,160 @@
+from pepper import logger
+
+from threading import Lock
+from datetime import datetime
+from time import time
+from uuid import uuid4
+import atexit
+import errno
+import json
+import gzip
+import glob
+import os
+
+
+class BrainJournal(object):
+
+    # File extension of every serialization format the journal can hold
+    EXTENSIONS = {'nquads': 'nq', 'trig': 'trig'}
+
+    # SPARQL updates are journaled as comment lines (skipped by N-Quads and TriG parsers) starting with this marker,
+    # followed by the update as a JSON string
+    UPDATE = '#update '
+
+    def __init__(self, root, format, max_bytes=64 * 1024 * 1024, max_age=3600):
+        # type: (str, str, int, float) -> BrainJournal
+        """
+        Append-only journal of everything uploaded to the brain, and of the SPARQL updates applied to it, written as
+        gzip compressed segments
+
+        Parameters
+        ----------
+        root: str
+            Path of the segments, with a {} placeholder for the time, journal and number of the segment
+        format: str
+            Serialization format of the data written to the journal, one of BrainJournal.EXTENSIONS
+        max_bytes: int
+            Compressed size (in bytes) after which a new segment is started
+        max_age: float
+            Seconds after which a new segment is started. If None, segments are only rotated on size
+        """
+        if format not in self.EXTENSIONS:
+            raise ValueError("Unsupported journal format: {}".format(format))
+
+        self.root = root
+        self.format = format
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._log = logger.getChild(self.__class__.__name__)
+
+        self._lock = Lock()
+        self._raw = None
+        self._file = None
+        self._path = None
+        self._opened = None
+        self._segment = 0
+
+        # Several journals may write under the same root at the same time (e.g. one per BrainContext, or one per
+        # process), their segments are told apart by the id of the journal
+        self._id = uuid4().hex[:12]
+
+        atexit.register(self.close)
+
+    @property
+    def path(self):
+        # type: () -> str
+        """
+        Path of the segment being written, None if no segment is open
+        """
+        return self._path if self._raw is not None else None
+
+    def write(self, data):
+        """
+        Append serialized data to the journal
+        :param data: data serialized in the format of the journal
+        :return:
+        """
+        with self._lock:
+            if self._file is None or self._must_rotate():
+                self._rotate()
+
+            self._file.write(data)
+
+            # Sync flush, so everything written so far can be recovered if the application does not close the journal
+            self._file.flush()
+
+    def write_update(self, query):
+        """
+        Append a SPARQL update that was applied to the brain to the journal, in order with the uploaded data
+        :param query: SPARQL update
+        :return:
+        """
+        # On a line of its own, also when the data before it does not end with a line end
+        self.write('\n{}{}\n'.format(self.UPDATE, json.dumps(query)))
+
+    def _must_rotate(self):
+        return self._raw.tell() >= self.max_bytes or \
+               (self.max_age is not None and time() - self._opened >= self.max_age)
+
+    def _rotate(self):
+        self._close_segment()
+
+        while True:
+            self._segment += 1
+            name = '{}_{}_{:05d}'.format(datetime.now().strftime('%Y-%m-%d-%H-%M-%S'), self._id, self._segment)
+            path = '{}.{}.gz'.format(self.root.format(name), self.EXTENSIONS[self.format])
+
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+
+            # Never overwrite a segment, not even one of another journal
+            try:
+                descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+        self._path = path
+        self._raw = os.fdopen(descriptor, 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._opened = time()
+
+        self._log.debug("Journaling to {}".format(path))
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+
+            self._file = None
+            self._raw = None
+
+    def close(self):
+        """
+        Close the segment being written, a next write starts a new segment
+        :return:
+        """
+        with self._lock:
+            self._close_segment()
+
+    @classmethod
+    def segments(cls, root):
+        """
+        Paths of all journal segments, oldest first
+        :param root: path of the segments, with a {} placeholder for the time, journal and number of the segment
+        :return: list of (path, format) tuples
+        """
+        segments = []
+        for format, extension in cls.EXTENSIONS.items():
+            for path in glob.glob('{}.{}.gz'.format(root.format('*'), extension)):
+                segments.append((path, format))
+
+        # Segment names start with their time, then the journal and number, so they sort chronologically
+        return sorted(segments, key=lambda segment: os.path.basename(segment[0]))
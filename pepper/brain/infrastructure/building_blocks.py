@@ -1,4 +1,5 @@
 import random
+from concurrent.futures import Future
 from rdflib import Literal
 from datetime import date, datetime
 from typing import List, Optional
@@ -9,7 +10,64 @@ from pepper.brain.utils.constants import NOT_TO_MENTION_TYPES
 from pepper.brain.utils.helper_functions import hash_claim_id, is_proper_noun, casefold_text
 
 
-class RDFBase(object):
+# Labels repeat across statements and query results, every distinct label is kept once (up to this many labels)
+_MAX_INTERNED_LABELS = 100000
+_INTERNED_LABELS = {}
+
+
+def intern_label(label):
+    """
+    Get the shared copy of a label, so equal labels do not take memory more than once
+    Parameters
+    ----------
+    label: str
+        Label (string, unicode or rdflib Literal)
+
+    Returns
+    -------
+    label: str
+        Shared copy of the label, or the label itself if it can not be shared
+
+    """
+    if not isinstance(label, basestring):
+        return label
+
+    # Type is part of the key, so str, unicode and Literal labels that compare equal are not swapped
+    key = (type(label), label)
+    interned = _INTERNED_LABELS.get(key)
+
+    if interned is None:
+        if len(_INTERNED_LABELS) >= _MAX_INTERNED_LABELS:
+            return label
+
+        interned = _INTERNED_LABELS.setdefault(key, label)
+
+    return interned
+
+
+class ValueObject(object):
+    """
+    Building block compared by value: equal when of the same class and with equal _key(). Building blocks are changed
+    by casefold, which changes their hash, so do not casefold them while they are in a set or dictionary
+    """
+    __slots__ = ()
+
+    def _key(self):
+        raise NotImplementedError()
+
+    def __eq__(self, other):
+        return self is other or (type(self) is type(other) and self._key() == other._key())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self._key()))
+
+
+class RDFBase(ValueObject):
+    __slots__ = ('_id', '_label', '_offset', '_confidence')
+
     def __init__(self, id, label, offset=None, confidence=0.0):
         # type: (str, str, Optional[slice], float) -> None
         """
@@ -26,8 +84,8 @@ class RDFBase(object):
             Confidence value that this RDFBase was mentioned
         """
 
-        self._id = id
-        self._label = label
+        self._id = intern_label(id)
+        self._label = intern_label(label)
         self._offset = offset
         self._confidence = confidence
 
@@ -65,17 +123,23 @@ class RDFBase(object):
         """
         if format == 'triple':
             # Label
-            self._label = Literal(casefold_text(self.label, format=format))
+            self._label = intern_label(Literal(casefold_text(self.label, format=format)))
 
         elif format == 'natural':
             # Label
-            self._label = casefold_text(self.label, format=format)
+            self._label = intern_label(casefold_text(self.label, format=format))
+
+    def _key(self):
+        # Offset and confidence describe a mention, mentions of the same thing are equal
+        return self._id, self._label
 
     def __repr__(self):
         return '{}'.format(self.label)
 
 
 class Entity(RDFBase):
+    __slots__ = ('_types',)
+
     def __init__(self, id, label, types, offset=None, confidence=0.0):
         # type: (str, str, List[str], Optional[slice], float) -> None
         """
@@ -95,7 +159,7 @@ class Entity(RDFBase):
         """
         super(Entity, self).__init__(id, label, offset, confidence)
 
-        self._types = [t for t in types if t != '' and t is not None]
+        self._types = [intern_label(t) for t in types if t != '' and t is not None]
         self._types = list(dict.fromkeys(self._types))
 
     @property
@@ -110,7 +174,7 @@ class Entity(RDFBase):
 
     def add_types(self, types):
         # type: (List[str]) -> ()
-        fixed_types = [t for t in types if t != '' and t is not None]
+        fixed_types = [intern_label(t) for t in types if t != '' and t is not None]
         self._types.extend(fixed_types)
 
     def casefold(self, format='triple'):
@@ -127,19 +191,24 @@ class Entity(RDFBase):
         """
         if format == 'triple':
             # Label
-            self._label = Literal(casefold_text(self.label, format=format))
+            self._label = intern_label(Literal(casefold_text(self.label, format=format)))
             # Types
-            self._types = [casefold_text(t, format=format) for t in self.types]
+            self._types = [intern_label(casefold_text(t, format=format)) for t in self.types]
 
         elif format == 'natural':
             # Label
             self._label = casefold_text(self.label, format=format)
-            self._label = self._label.capitalize() if is_proper_noun(self.types) else self._label
+            self._label = intern_label(self._label.capitalize() if is_proper_noun(self.types) else self._label)
             # Types
-            self._types = [t.lower().replace("_", " ") for t in self.types]
+            self._types = [intern_label(t.lower().replace("_", " ")) for t in self.types]
+
+    def _key(self):
+        return self._id, self._label, tuple(self._types)
 
 
 class Predicate(RDFBase):
+    __slots__ = ('_cardinality',)
+
     def __init__(self, id, label, offset=None, confidence=0.0, cardinality=1):
         # type: (str, str, Optional[slice], float, int) -> None
         """
@@ -187,13 +256,17 @@ class Predicate(RDFBase):
         if format == 'triple':
             # Label
             self._label = Literal(casefold_text(self.label, format=format))
-            self._label = Literal(
-                self._fix_predicate_morphology(subject_label, str(self.label), complement_label, format=format))
+            self._label = intern_label(Literal(
+                self._fix_predicate_morphology(subject_label, str(self.label), complement_label, format=format)))
 
         elif format == 'natural':
             # Label
             self._label = casefold_text(self.label, format=format)
-            self._label = self._fix_predicate_morphology(subject_label, self.label, complement_label, format=format)
+            self._label = intern_label(
+                self._fix_predicate_morphology(subject_label, self.label, complement_label, format=format))
+
+    def _key(self):
+        return self._id, self._label, self._cardinality
 
     @staticmethod
     def _fix_predicate_morphology(subject, predicate, complement, format='triple'):
@@ -242,7 +315,9 @@ class Predicate(RDFBase):
         return new_predicate.strip(' ')
 
 
-class Triple(object):
+class Triple(ValueObject):
+    __slots__ = ('_subject', '_predicate', '_complement')
+
     def __init__(self, subject, predicate, complement):
         # type: (Entity, Predicate, Entity) -> None
         """
@@ -330,6 +405,9 @@ class Triple(object):
         self._complement.casefold(format)
         self._predicate.casefold(self.subject, self.complement, format)
 
+    def _key(self):
+        return self._subject, self._predicate, self._complement
+
     def __iter__(self):
         return iter([('subject', self.subject), ('predicate', self.predicate), ('complement', self.complement)])
 
@@ -348,7 +426,9 @@ class Triple(object):
                                                 self.complement_types if self.complement_types is not None else '?']))
 
 
-class Perspective(object):
+class Perspective(ValueObject):
+    __slots__ = ('_certainty', '_polarity', '_sentiment', '_time', '_emotion')
+
     def __init__(self, certainty, polarity, sentiment, time=None, emotion=None):
         # type: (float, int, float, Time, Emotion) -> None
         """
@@ -418,8 +498,13 @@ class Perspective(object):
         # type: (Emotion) -> ()
         self._emotion = emotion
 
+    def _key(self):
+        return self._certainty, self._polarity, self._sentiment, self._time, self._emotion
+
+
+class Provenance(ValueObject):
+    __slots__ = ('_author', '_date')
 
-class Provenance(object):
     def __init__(self, author, date):
         # type: (str, date) -> None
         """
@@ -432,7 +517,7 @@ class Provenance(object):
             Date when the mention was said
         """
 
-        self._author = author
+        self._author = intern_label(author)
         self._date = datetime.strptime(date, '%Y-%m-%d')
 
     @property
@@ -459,17 +544,22 @@ class Provenance(object):
         """
         if format == 'triple':
             # Label
-            self._author = self.author.lower().replace(" ", "_")
+            self._author = intern_label(self.author.lower().replace(" ", "_"))
 
         elif format == 'natural':
             # Label
-            self._author = self.author.lower().replace("_", " ")
+            self._author = intern_label(self.author.lower().replace("_", " "))
+
+    def _key(self):
+        return self._author, self._date
 
     def __repr__(self):
         return '{} on {}'.format(self.author, self.date.strftime("%B,%Y"))
 
 
-class CardinalityConflict(object):
+class CardinalityConflict(ValueObject):
+    __slots__ = ('_provenance', '_complement')
+
     def __init__(self, provenance, entity):
         # type: (Provenance, Entity) -> None
         """
@@ -524,11 +614,16 @@ class CardinalityConflict(object):
         self._provenance.casefold(format)
         self._complement.casefold(format)
 
+    def _key(self):
+        return self._provenance, self._complement
+
     def __repr__(self):
         return '{} about {}'.format(self._provenance.__repr__(), self.complement_name)
 
 
-class NegationConflict(object):
+class NegationConflict(ValueObject):
+    __slots__ = ('_provenance', '_polarity_value')
+
     def __init__(self, provenance, polarity_value):
         # type: (Provenance, polarity_value) -> None
         """
@@ -580,12 +675,17 @@ class NegationConflict(object):
         # TODO: Cannot Casefold String, uncommented for now?
         # self._polarity_value.casefold(format)
 
+    def _key(self):
+        return self._provenance, self._polarity_value
+
     def __repr__(self):
         return '{} about {}'.format(self._provenance.__repr__(), self.polarity_value)
 
 
 # TODO revise overlap with provenance
 class StatementNovelty(object):
+    __slots__ = ('_provenance',)
+
     def __init__(self, provenance):
         # type: (Provenance) -> None
         """
@@ -631,6 +731,8 @@ class StatementNovelty(object):
 
 
 class EntityNovelty(object):
+    __slots__ = ('_subject', '_complement')
+
     def __init__(self, existence_subject, existence_complement):
         # type: (bool, bool) -> None
         """
@@ -661,7 +763,9 @@ class EntityNovelty(object):
         return '{} - {}'.format(subject, complement)
 
 
-class Gap(object):
+class Gap(ValueObject):
+    __slots__ = ('_predicate', '_entity')
+
     def __init__(self, predicate, entity):
         # type: (Predicate, Entity) -> None
         """
@@ -716,11 +820,16 @@ class Gap(object):
         self._entity.casefold(format)
         self._predicate.casefold(self.entity, None, format)
 
+    def _key(self):
+        return self._predicate, self._entity
+
     def __repr__(self):
         return '{} {}'.format(self.predicate_name, self.entity_range_name)
 
 
 class Gaps(object):
+    __slots__ = ('_subject', '_complement')
+
     def __init__(self, subject_gaps, complement_gaps):
         # type: (List[Gap], List[Gap]) -> None
         """
@@ -769,7 +878,9 @@ class Gaps(object):
                '{} object gaps: e.g. {}'.format(len(self._subject), s.__repr__(), len(self._complement), o.__repr__())
 
 
-class Overlap(object):
+class Overlap(ValueObject):
+    __slots__ = ('_provenance', '_entity')
+
     def __init__(self, provenance, entity):
         # type: (Provenance, Entity) -> None
         """
@@ -827,11 +938,16 @@ class Overlap(object):
         self._provenance.casefold(format)
         self._entity.casefold(format)
 
+    def _key(self):
+        return self._provenance, self._entity
+
     def __repr__(self):
         return '{} about {}'.format(self._provenance.__repr__(), self.entity_name)
 
 
 class Overlaps(object):
+    __slots__ = ('_subject', '_complement')
+
     def __init__(self, subject_overlaps, complement_overlaps):
         # type: (List[Overlap], List[Overlap]) -> None
         """
@@ -882,11 +998,15 @@ class Overlaps(object):
 
 
 class Thoughts(object):
+    __slots__ = ('_statement_novelty', '_entity_novelty', '_negation_conflicts', '_complement_conflict',
+                 '_subject_gaps', '_complement_gaps', '_overlaps', '_trust')
+
     def __init__(self, statement_novelty, entity_novelty, negation_conflicts, complement_conflict,
                  subject_gaps, complement_gaps, overlaps, trust):
         # type: (List[StatementNovelty], EntityNovelty, List[NegationConflict], List[CardinalityConflict], Gaps, Gaps, Overlaps, float) -> None
         """
-        Construct Thoughts Object
+        Construct Thoughts Object. Any of the thoughts may also be given as a Future, in which case it is awaited
+        the first time it is accessed
         Parameters
         ----------
         statement_novelty: List[StatementNovelty]
@@ -916,36 +1036,49 @@ class Thoughts(object):
         self._overlaps = overlaps
         self._trust = trust
 
+    @staticmethod
+    def _resolve(thought):
+        # Thoughts still being computed are futures
+        return thought.result() if isinstance(thought, Future) else thought
+
     def complement_conflicts(self):
         # type: () -> List[CardinalityConflict]
+        self._complement_conflict = self._resolve(self._complement_conflict)
         return self._complement_conflict
 
     def negation_conflicts(self):
         # type: () -> List[NegationConflict]
+        self._negation_conflicts = self._resolve(self._negation_conflicts)
         return self._negation_conflicts
 
     def statement_novelties(self):
         # type: () -> List[StatementNovelty]
+        self._statement_novelty = self._resolve(self._statement_novelty)
         return self._statement_novelty
 
     def entity_novelty(self):
         # type: () -> EntityNovelty
+        self._entity_novelty = self._resolve(self._entity_novelty)
         return self._entity_novelty
 
     def complement_gaps(self):
         # type: () -> Gaps
+        self._complement_gaps = self._resolve(self._complement_gaps)
         return self._complement_gaps
 
     def subject_gaps(self):
         # type: () -> Gaps
+        self._subject_gaps = self._resolve(self._subject_gaps)
         return self._subject_gaps
 
     def overlaps(self):
         # type: () -> Overlaps
+        self._overlaps = self._resolve(self._overlaps)
         return self._overlaps
 
     def trust(self):
         # type: () -> float
+        self._trust = self._resolve(self._trust)
         return self._trust
 
     def casefold(self, format='triple'):
@@ -960,21 +1093,21 @@ class Thoughts(object):
         -------
 
         """
-        for n in self._statement_novelty:
+        for n in self.statement_novelties():
             n.casefold(format)
-        for c in self._negation_conflicts:
+        for c in self.negation_conflicts():
             c.casefold(format)
-        for c in self._complement_conflict:
+        for c in self.complement_conflicts():
             c.casefold(format)
-        self._subject_gaps.casefold(format)
-        self._complement_gaps.casefold(format)
-        self._overlaps.casefold(format)
+        self.subject_gaps().casefold(format)
+        self.complement_gaps().casefold(format)
+        self.overlaps().casefold(format)
 
     def __repr__(self):
-        representation = {'statement_novelty': self._statement_novelty, 'entity_novelty': self._entity_novelty,
-                          'negation_conflicts': self._negation_conflicts,
-                          'complement_conflict': self._complement_conflict,
-                          'subject_gaps': self._subject_gaps, 'complement_gaps': self._complement_gaps,
-                          'overlaps': self._overlaps}
+        representation = {'statement_novelty': self.statement_novelties(), 'entity_novelty': self.entity_novelty(),
+                          'negation_conflicts': self.negation_conflicts(),
+                          'complement_conflict': self.complement_conflicts(),
+                          'subject_gaps': self.subject_gaps(), 'complement_gaps': self.complement_gaps(),
+                          'overlaps': self.overlaps()}
 
         return '{}'.format(representation)
@@ -0,0 +1,102 @@
+import numpy as np
+
+from threading import Lock
+
+
+class EpisodicIndex(object):
+
+    def __init__(self):
+        # type: () -> EpisodicIndex
+        """
+        In memory inverted index of contexts by what was detected in them, to find the contexts most similar to an
+        observation without comparing it to every context one by one
+        """
+        self._lock = Lock()
+
+        self._episodes = []  # episode (context, place, date and detections) per context number
+        self._numbers = {}  # context number per context label
+        self._postings = {}  # context numbers per detection
+
+        # Arrays of sizes and postings, built when needed
+        self._size_array = None
+        self._posting_arrays = {}
+
+    def __len__(self):
+        return len(self._episodes)
+
+    def add(self, context, place, date, detections):
+        """
+        Add (what was detected in) a context to the index. Detections of a context that is already indexed are added
+        to the ones it has
+        :param context: label of the context
+        :param place: label of the place of the context
+        :param date: date of the context
+        :param detections: labels of what was detected in the context, including its geographical location
+        :return:
+        """
+        with self._lock:
+            if context not in self._numbers:
+                self._numbers[context] = len(self._episodes)
+                self._episodes.append({'context': context, 'place': place, 'date': date, 'detections': set()})
+
+            number = self._numbers[context]
+            episode = self._episodes[number]
+            episode['place'] = place
+            episode['date'] = date
+
+            for detection in detections:
+                if detection not in episode['detections']:
+                    episode['detections'].add(detection)
+                    self._postings.setdefault(detection, []).append(number)
+                    self._posting_arrays.pop(detection, None)
+
+            self._size_array = None
+
+    def most_similar(self, observations, k=1):
+        """
+        Find the contexts most similar to a set of observations, by the Dice coefficient of their detections
+        :param observations: labels of what is observed
+        :param k: number of contexts to return
+        :return: list of (overlap, episode) tuples, most similar first. Episodes are dictionaries with context, place,
+        date and detections, and should not be modified
+        """
+        observations = set(observations)
+
+        with self._lock:
+            postings = [self._posting_array(observation) for observation in observations
+                        if observation in self._postings]
+
+            if not postings:
+                return []
+
+            if self._size_array is None:
+                self._size_array = np.array([len(episode['detections']) for episode in self._episodes], dtype=float)
+
+            # Count shared detections per context, and turn them into Dice coefficients
+            shared = np.bincount(np.concatenate(postings), minlength=len(self._episodes))
+            overlaps = 2.0 * shared / (len(observations) + self._size_array)
+
+            k = min(k, len(overlaps))
+            best = np.argpartition(-overlaps, k - 1)[:k]
+            best = best[np.argsort(-overlaps[best])]
+
+            return [(float(overlaps[number]), self._episodes[number]) for number in best if shared[number] > 0]
+
+    def _posting_array(self, detection):
+        # Must be called holding the lock
+        if detection not in self._posting_arrays:
+            self._posting_arrays[detection] = np.array(self._postings[detection], dtype=int)
+
+        return self._posting_arrays[detection]
+
+    def clear(self):
+        """
+        Remove all contexts from the index
+        :return:
+        """
+        with self._lock:
+            self._episodes = []
+            self._numbers = {}
+            self._postings = {}
+            self._size_array = None
+            self._posting_arrays = {}
@@ -0,0 +1,198 @@
+from pepper.brain.infrastructure.store_connector import AbstractStoreConnector
+
+from rdflib import Dataset, URIRef, BNode, Literal
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql.sparql import NotBoundError
+
+from threading import RLock
+from time import time
+import re
+
+
+class LocalStoreConnector(AbstractStoreConnector):
+
+    # Addresses of in-process stores start with this scheme, optionally followed by a folder to persist to
+    SCHEME = 'local://'
+
+    # Stores are shared by every connector using the same address, like the Triple store would be
+    _STORES = {}
+    _STORES_LOCK = RLock()
+
+    # Aggregates projected by a query, with the value GraphDB gives them over an empty group
+    _AGGREGATE = re.compile(r'\(\s*(GROUP_CONCAT|COUNT|SUM)\s*\(.*?\)\s+as\s+\?(\w+)\s*\)', re.IGNORECASE | re.DOTALL)
+    _EMPTY_AGGREGATES = {'GROUP_CONCAT': Literal(''), 'COUNT': Literal(0, datatype=XSD.integer),
+                         'SUM': Literal(0, datatype=XSD.integer)}
+    _GROUP_BY = re.compile(r'\bGROUP\s+BY\b', re.IGNORECASE)
+
+    def __init__(self, address, format, slow_query_threshold=None, slow_query_log_size=100):
+        # type: (str, str, float, int) -> LocalStoreConnector
+        """
+        Interact with an in-process Triple store, for offline runs, tests and benchmarks
+
+        Unlike GraphDB, no inference is done: queries only see the triples that were uploaded. As in GraphDB, the
+        default graph is the union of all named graphs
+
+        Parameters
+        ----------
+        address: str
+            'local://' for a store in memory, or 'local://' followed by a folder to persist the store in (this
+            requires the Sleepycat store of rdflib)
+        format: str
+            Serialization format used when uploading data, one of LocalStoreConnector.CONTENT_TYPES
+        slow_query_threshold: float
+            Seconds after which a query is kept in the slow query log. If None, no queries are logged
+        slow_query_log_size: int
+            Number of slow queries kept, the oldest are dropped first
+        """
+        if not address.startswith(self.SCHEME):
+            raise ValueError("Local store addresses start with {}, got {}".format(self.SCHEME, address))
+
+        super(LocalStoreConnector, self).__init__(address, format, slow_query_threshold, slow_query_log_size)
+
+        self._dataset, self._lock = self._get_store(address)
+
+    @classmethod
+    def _get_store(cls, address):
+        """
+        Get the dataset for this address, creating it the first time the address is used
+        :param address: address of the local store
+        :return: rdflib Dataset and the lock guarding it
+        """
+        with cls._STORES_LOCK:
+            if address not in cls._STORES:
+                path = address[len(cls.SCHEME):]
+
+                if path:
+                    dataset = Dataset(store='Sleepycat', default_union=True)
+                    dataset.open(path, create=True)
+                else:
+                    dataset = Dataset(default_union=True)
+
+                cls._STORES[address] = (dataset, RLock())
+
+            return cls._STORES[address]
+
+    @staticmethod
+    def _to_json(term):
+        """
+        Represent an RDF term as in SPARQL JSON results
+        :param term: rdflib term
+        :return: dictionary with type and value (and datatype or language of literals)
+        """
+        if isinstance(term, URIRef):
+            return {'type': 'uri', 'value': unicode(term)}
+        elif isinstance(term, BNode):
+            return {'type': 'bnode', 'value': unicode(term)}
+        elif isinstance(term, Literal):
+            binding = {'type': 'literal', 'value': unicode(term)}
+
+            if term.datatype is not None:
+                binding['datatype'] = unicode(term.datatype)
+            elif term.language is not None:
+                binding['xml:lang'] = term.language
+
+            return binding
+        else:
+            raise TypeError("Unknown RDF term: {}".format(term))
+
+    def upload(self, data):
+        """
+        Add data to the brain
+        :param data: serialized data as string
+        :return: response status
+        """
+        start = time()
+
+        with self._lock:
+            self._dataset.parse(data=data, format=self.format)
+
+        self._count('upload', start, 'upload', sent=len(data))
+
+        return '204'
+
+    def query(self, query, ask=False, post=False):
+        """
+        Submit a SPARQL query to the triple store, and returning the results as JSON
+        Parameters
+        ----------
+        query: str SPARQL query
+        ask: Boolean whether the query returns a Boolean
+        post: Boolean whether the query is posting information instead of querying
+
+        Returns
+        -------
+        response: dictionary query results from triple store
+
+        """
+        start = time()
+
+        with self._lock:
+            if post:
+                self._dataset.update(query)
+                self._count('query', start, self.query_name(query), query, sent=len(query))
+
+                return '204'
+
+            if ask:
+                response = self._dataset.query(query).askAnswer
+            else:
+                response = self._select(query)
+
+        # Nothing is transferred, results are not counted in bytes
+        self._count('query', start, self.query_name(query), query, 1 if ask else len(response), len(query))
+
+        return response
+
+    def _stream(self, query):
+        """
+        Submit a SPARQL select query and yield its result rows. The store lives in memory anyway, the rows of a query
+        (or a page of them) are read at once, so the store is not locked while they are consumed
+        :param query: SPARQL select query
+        :return: generator of bindings, as in the SPARQL JSON results of query
+        """
+        start = time()
+
+        with self._lock:
+            rows = self._select(query)
+
+        self._count('query', start, self.query_name(query), query, len(rows), len(query))
+
+        for row in rows:
+            yield row
+
+    def _select(self, query):
+        """
+        Run a SPARQL select query, and shape its result rows as GraphDB returns them: a row of aggregates over an empty
+        result binds them to an empty string or zero instead of leaving them unbound, and grouping an empty result
+        without aggregates gives no rows
+        :param query: SPARQL select query
+        :return: list of bindings, as in the SPARQL JSON results of query
+        """
+        empty_aggregates = {variable: self._EMPTY_AGGREGATES[function.upper()]
+                            for function, variable in self._AGGREGATE.findall(query)}
+
+        result = self._dataset.query(query)
+
+        try:
+            bindings = result.bindings
+        except NotBoundError:
+            # rdflib fails grouping the empty result of a grouped subquery, GraphDB returns a row of empty aggregates
+            bindings = [{}]
+
+        variables = [str(variable) for variable in result.vars or []]
+        empty_aggregates = {variable: term for variable, term in empty_aggregates.items() if variable in variables}
+        grouped = self._GROUP_BY.search(query) is not None
+
+        rows = []
+        for row in bindings:
+            row = {str(variable): self._to_json(term) for variable, term in row.items() if term is not None}
+
+            if not row and empty_aggregates:
+                row = {variable: self._to_json(term) for variable, term in empty_aggregates.items()}
+            elif not row and grouped:
+                # rdflib gives an empty group for an empty result
+                continue
+
+            rows.append(row)
+
+        return rows
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache(object):
+    def __init__(self, max_size=10000):
+        # type: (int) -> None
+        """
+        Bounded cache dropping the least recently used entry when full
+
+        Parameters
+        ----------
+        max_size: int
+            Number of entries kept. If 0, nothing is cached
+        """
+        self.max_size = max_size
+
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, create):
+        """
+        Get a cached value, creating it if it is not cached
+        :param key: hashable key of the value
+        :param create: function without arguments returning the value
+        :return: cached value
+        """
+        with self._lock:
+            if key in self._entries:
+                value = self._entries.pop(key)
+                self._entries[key] = value
+                self.hits += 1
+                return value
+
+            self.misses += 1
+
+        # Create without holding the lock, two threads creating the same value both get an equal one
+        value = create()
+
+        with self._lock:
+            if self.max_size > 0:
+                self._entries[key] = value
+
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        """
+        Drop all cached values
+        :return:
+        """
+        with self._lock:
+            self._entries = OrderedDict()
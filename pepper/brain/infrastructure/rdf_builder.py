@@ -1,5 +1,5 @@
 from pepper.brain.utils.helper_functions import casefold_text
-from pepper.brain.infrastructure import Predicate, Entity, Triple, Provenance
+from pepper.brain.infrastructure import Predicate, Entity, Triple, Provenance, LRUCache
 from pepper import logger
 
 from rdflib import Dataset, Namespace, OWL
@@ -12,13 +12,24 @@ import os
 class RdfBuilder(object):
     ONTOLOGY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../ontologies'))
 
-    def __init__(self):
-        # type: () -> None
+    def __init__(self, cache_size=10000):
+        # type: (int) -> None
+        """
+        Build RDF terms and statements in a local dataset
+
+        Parameters
+        ----------
+        cache_size: int
+            Number of URIs and of literals kept, as the same labels are turned into terms over and over
+        """
 
         self.ontology_paths = {}
         self.namespaces = {}
         self.dataset = Dataset()
 
+        self._uris = LRUCache(cache_size)
+        self._literals = LRUCache(cache_size)
+
         self._log = logger.getChild(self.__class__.__name__)
         self._log.debug("Booted")
 
@@ -120,6 +131,15 @@ class RdfBuilder(object):
         self.dataset.bind('wdt', self.namespaces['WDT'])
         self.dataset.bind('wikibase', self.namespaces['wikibase'])
 
+    def reset_dataset(self):
+        """
+        Start a new, empty dataset with the same namespaces and named graphs
+        :return:
+        """
+        self.dataset = Dataset()
+        self._bind_namespaces()
+        self.define_named_graphs()
+
     def define_named_graphs(self):
         # Instance graph
         self.ontology_graph = self.dataset.graph(self.create_resource_uri('LW', 'Ontology'))
@@ -196,13 +216,20 @@ class RdfBuilder(object):
             Representing the URI of the resource
 
         """
-        if namespace in self.namespaces.keys():
+        return self._uris.get((namespace, resource_name), lambda: self._create_resource_uri(namespace, resource_name))
+
+    def _create_resource_uri(self, namespace, resource_name):
+        if namespace in self.namespaces:
             uri = URIRef(to_iri(self.namespaces[namespace] + resource_name))
         else:
             uri = URIRef(to_iri('{}:{}'.format(namespace, resource_name)))
 
         return uri
 
+    def _create_uri(self, uri):
+        # URIs given as is are keyed by a 1-tuple, apart from the (namespace, label) pairs
+        return self._uris.get((uri,), lambda: URIRef(to_iri(uri)))
+
     def fill_literal(self, value, datatype=None):
         # type: (str, str) -> Literal
         """
@@ -219,6 +246,17 @@ class RdfBuilder(object):
             Literal with value and datatype given
         """
 
+        try:
+            # Type is part of the key, as True == 1 but their literals differ
+            key = (type(value), value, datatype)
+            hash(key)
+        except TypeError:
+            return self._create_literal(value, datatype)
+
+        return self._literals.get(key, lambda: self._create_literal(value, datatype))
+
+    @staticmethod
+    def _create_literal(value, datatype=None):
         return Literal(value, datatype=datatype) if datatype is not None else Literal(value)
 
     def fill_entity(self, label, types, namespace='LW', uri=None):
@@ -244,9 +282,9 @@ class RdfBuilder(object):
             self._log.warning('Unknown type: {}'.format(label))
             return self.fill_entity_from_label(label, namespace)
         else:
-            entity_id = self.create_resource_uri(namespace, label) if not uri else URIRef(to_iri(uri))
+            entity_id = self.create_resource_uri(namespace, label) if not uri else self._create_uri(uri)
             fixed_types = self._fix_nlp_types(types)
-            return Entity(entity_id, Literal(label), fixed_types)
+            return Entity(entity_id, self.fill_literal(label), fixed_types)
 
     def fill_predicate(self, label, namespace='N2MU', uri=None):
         # type: (str, str, str) -> Predicate
@@ -266,9 +304,9 @@ class RdfBuilder(object):
 
             Predicate object with given label
         """
-        predicate_id = self.create_resource_uri(namespace, label) if not uri else URIRef(to_iri(uri))
+        predicate_id = self.create_resource_uri(namespace, label) if not uri else self._create_uri(uri)
 
-        return Predicate(predicate_id, Literal(label))
+        return Predicate(predicate_id, self.fill_literal(label))
 
     def fill_entity_from_label(self, label, namespace='LW', uri=None):
         # type: (str, str, str) -> Entity
@@ -287,9 +325,9 @@ class RdfBuilder(object):
         -------
             Entity object with given label and no type information
         """
-        entity_id = self.create_resource_uri(namespace, label) if not uri else URIRef(to_iri(uri))
+        entity_id = self.create_resource_uri(namespace, label) if not uri else self._create_uri(uri)
 
-        return Entity(entity_id, Literal(label), [''])
+        return Entity(entity_id, self.fill_literal(label), [''])
 
     def empty_entity(self):
         # type: () -> Entity
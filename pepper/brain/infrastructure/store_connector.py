@@ -1,22 +1,324 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 import requests
 
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from time import time
+import bisect
+import re
 
-class StoreConnector(object):
 
-    def __init__(self, address, format):
-        # type: (str, str) -> StoreConnector
+class AbstractStoreConnector(object):
+
+    # Content type of every serialization format data can be uploaded in
+    CONTENT_TYPES = {'trig': 'application/x-trig', 'nquads': 'application/n-quads'}
+
+    # Upper bounds (in seconds) of the latency histogram buckets kept per query, the last bucket has no bound
+    LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    # Queries from the query registry start with a comment naming them (see QueryTemplate), others are inline
+    _QUERY_NAME = re.compile(r'^#query: (.+)$', re.MULTILINE)
+    INLINE = 'inline'
+
+    def __init__(self, address, format, slow_query_threshold=None, slow_query_log_size=100):
+        # type: (str, str, float, int) -> AbstractStoreConnector
         """
-        Interact with Triple store
+        Interact with Triple store, keeping track of the latency of every call, and of statistics per query
 
         Parameters
         ----------
         address: str
-            IP address and port of the Triple store
+            Address of the Triple store
+        format: str
+            Serialization format used when uploading data, one of AbstractStoreConnector.CONTENT_TYPES
+        slow_query_threshold: float
+            Seconds after which a query is kept in the slow query log. If None, no queries are logged
+        slow_query_log_size: int
+            Number of slow queries kept, the oldest are dropped first
         """
+        if format not in self.CONTENT_TYPES:
+            raise ValueError("Unsupported upload format: {}".format(format))
 
         self.address = address
         self.format = format
+        self.slow_query_threshold = slow_query_threshold
+
+        self._latency_lock = Lock()
+        self._latency = {'query': self._empty_counter(), 'upload': self._empty_counter()}
+        self._query_stats = {}
+        self._slow_queries = deque(maxlen=slow_query_log_size)
+
+    @staticmethod
+    def _empty_counter():
+        return {'calls': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+
+    def _empty_query_stats(self):
+        return {'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'sent': 0, 'received': 0,
+                'histogram': [0] * (len(self.LATENCY_BUCKETS) + 1)}
+
+    @classmethod
+    def query_name(cls, query):
+        """
+        Name of a query, as given by the query registry
+        :param query: SPARQL query
+        :return: name of the query, or INLINE for queries not coming from the registry
+        """
+        match = cls._QUERY_NAME.search(query)
+        return match.group(1).strip() if match else cls.INLINE
+
+    def _count(self, kind, start, name=None, query=None, rows=None, sent=0, received=0):
+        """
+        Register the latency of a call that started at 'start', and the statistics of the query it ran
+        :param kind: 'query' or 'upload'
+        :param start: time at which the call started
+        :param name: name the call is counted under, not counted per query if None
+        :param query: query text, kept in the slow query log if the call was slow
+        :param rows: number of result rows
+        :param sent: number of bytes sent
+        :param received: number of bytes received
+        :return:
+        """
+        elapsed = time() - start
+
+        with self._latency_lock:
+            counter = self._latency[kind]
+            counter['calls'] += 1
+            counter['total'] += elapsed
+            counter['last'] = elapsed
+            counter['max'] = max(counter['max'], elapsed)
+
+            if name is None:
+                return
+
+            stats = self._query_stats.setdefault(name, self._empty_query_stats())
+            stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['rows'] += rows or 0
+            stats['sent'] += sent
+            stats['received'] += received
+            stats['histogram'][bisect.bisect_left(self.LATENCY_BUCKETS, elapsed)] += 1
+
+            if self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold:
+                self._slow_queries.append({'time': datetime.fromtimestamp(start), 'name': name, 'seconds': elapsed,
+                                           'rows': rows, 'query': query})
+
+    @property
+    def query_stats(self):
+        """
+        Statistics per query name (uploads are counted as 'upload'): calls, total, mean and max latency in seconds,
+        result rows, bytes sent and received, and a latency histogram with the number of calls per bucket
+        :return: dictionary of query name to statistics
+        """
+        bounds = [str(bound) for bound in self.LATENCY_BUCKETS] + ['inf']
+
+        with self._latency_lock:
+            query_stats = {}
+            for name, stats in self._query_stats.items():
+                query_stats[name] = dict(stats)
+                query_stats[name]['mean'] = stats['total'] / stats['calls'] if stats['calls'] else 0.0
+                query_stats[name]['histogram'] = dict(zip(bounds, stats['histogram']))
+
+            return query_stats
+
+    @property
+    def slow_queries(self):
+        """
+        Queries that took longer than slow_query_threshold, oldest first
+        :return: list of dictionaries with time, name, seconds, rows and (rendered) query
+        """
+        with self._latency_lock:
+            return [dict(entry) for entry in self._slow_queries]
+
+    def dump_slow_queries(self, path):
+        """
+        Write the slow query log to a file, every query preceded by a comment with its time, name, latency and rows
+        :param path: path of the file
+        :return: number of queries written
+        """
+        slow_queries = self.slow_queries
+
+        with open(path, 'w') as f:
+            for entry in slow_queries:
+                f.write("# {} {} {:.3f}s {} rows\n".format(entry['time'].isoformat(), entry['name'], entry['seconds'],
+                                                          entry['rows']))
+                query = entry['query'] if entry['query'] is not None else ''
+                f.write((query.encode('utf-8') if isinstance(query, unicode) else query) + "\n\n")
+
+        return len(slow_queries)
+
+    def reset_query_stats(self):
+        """
+        Reset the statistics per query and the slow query log
+        :return:
+        """
+        with self._latency_lock:
+            self._query_stats = {}
+            self._slow_queries.clear()
+
+    @property
+    def latency(self):
+        """
+        Per call latency counters (in seconds) for queries and uploads
+        :return: dictionary with calls, total, mean, max and last latency per kind of call
+        """
+        with self._latency_lock:
+            latency = {}
+            for kind, counter in self._latency.items():
+                latency[kind] = dict(counter)
+                latency[kind]['mean'] = counter['total'] / counter['calls'] if counter['calls'] else 0.0
+
+            return latency
+
+    def reset_latency(self):
+        """
+        Reset the latency counters
+        :return:
+        """
+        with self._latency_lock:
+            self._latency = {'query': self._empty_counter(), 'upload': self._empty_counter()}
+
+    def upload(self, data):
+        """
+        Post data to the brain
+        :param data: serialized data as string
+        :return: response status
+        """
+        raise NotImplementedError()
+
+    def query(self, query, ask=False, post=False):
+        """
+        Submit a SPARQL query to the triple store, and returning the results as JSON
+        Parameters
+        ----------
+        query: str SPARQL query
+        ask: Boolean whether the query returns a Boolean
+        post: Boolean whether the query is posting information instead of querying
+
+        Returns
+        -------
+        response: dictionary query results from triple store
+
+        """
+        raise NotImplementedError()
+
+    def query_iter(self, query, page_size=None):
+        """
+        Submit a SPARQL select query to the triple store, and yield its result rows as they are read
+
+        When paging, LIMIT and OFFSET are appended to the query, so it should not have them already, and it should be
+        ordered (ORDER BY) for pages not to overlap
+        Parameters
+        ----------
+        query: str SPARQL select query
+        page_size: int number of rows requested at once, or None to request all of them at once
+
+        Returns
+        -------
+        rows: generator of bindings, as in the SPARQL JSON results of query
+
+        """
+        if page_size is None:
+            for row in self._stream(query):
+                yield row
+            return
+
+        offset = 0
+        while True:
+            rows = 0
+            for row in self._stream('{}\nLIMIT {} OFFSET {}'.format(query, page_size, offset)):
+                rows += 1
+                yield row
+
+            if rows < page_size:
+                return
+
+            offset += page_size
+
+    def _stream(self, query):
+        """
+        Submit a SPARQL select query and yield its result rows as they are read
+        :param query: SPARQL select query
+        :return: generator of bindings, as in the SPARQL JSON results of query
+        """
+        raise NotImplementedError()
+
+
+class StoreConnector(AbstractStoreConnector):
+
+    # Sessions (and their connection pools) are shared by every connector talking to the same address, with the same
+    # pool size and retries
+    _SESSIONS = {}
+    _SESSIONS_LOCK = Lock()
+
+    # urllib3 1.26 renamed method_whitelist to allowed_methods, 2.0 dropped the old name
+    _ALLOWED_METHODS = 'allowed_methods' if hasattr(Retry, 'DEFAULT_ALLOWED_METHODS') else 'method_whitelist'
+
+    # Streamed results are read as SPARQL TSV: one row per line, with terms written as in N-Triples
+    _TSV = 'text/tab-separated-values'
+    _TSV_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+    _TSV_ESCAPES = {'t': u'\t', 'b': u'\b', 'n': u'\n', 'r': u'\r', 'f': u'\f', '"': u'"', "'": u"'", '\\': u'\\'}
+    _XSD = 'http://www.w3.org/2001/XMLSchema#'
+
+    def __init__(self, address, format, pool_size=10, timeout=(3.05, 30), retries=3, slow_query_threshold=None,
+                 slow_query_log_size=100):
+        # type: (str, str, int, tuple, int, float, int) -> StoreConnector
+        """
+        Interact with Triple store over HTTP
+
+        Parameters
+        ----------
+        address: str
+            IP address and port of the Triple store
+        format: str
+            Serialization format used when uploading data, one of StoreConnector.CONTENT_TYPES
+        pool_size: int
+            Number of keep-alive connections kept open to the Triple store
+        timeout: tuple
+            Connect and read timeout (in seconds) for every request
+        retries: int
+            Number of times a failed connection is retried before giving up. Queries are also retried when the Triple
+            store is unavailable (502, 503 or 504), uploads and updates are not
+        slow_query_threshold: float
+            Seconds after which a query is kept in the slow query log. If None, no queries are logged
+        slow_query_log_size: int
+            Number of slow queries kept, the oldest are dropped first
+        """
+        super(StoreConnector, self).__init__(address, format, slow_query_threshold, slow_query_log_size)
+
+        self.timeout = timeout
+        self._session = self._get_session(address, pool_size, retries)
+
+    @classmethod
+    def _get_session(cls, address, pool_size, retries):
+        """
+        Get the pooled session for this address, creating it the first time the address is used
+        :param address: IP address and port of the Triple store
+        :param pool_size: number of keep-alive connections
+        :param retries: number of retries on connection errors
+        :return: requests.Session
+        """
+        with cls._SESSIONS_LOCK:
+            key = (address, pool_size, retries)
+
+            if key not in cls._SESSIONS:
+                # Queries only read, they are retried when the Triple store is unavailable too (they are posted)
+                query_retry = Retry(total=retries, read=0, backoff_factor=0.1, status_forcelist=(502, 503, 504),
+                                    **{cls._ALLOWED_METHODS: frozenset(['GET', 'POST'])})
+
+                # Uploads and updates are retried only if they could not connect, so they are never applied twice
+                statements_retry = Retry(total=retries, read=0, status=0, backoff_factor=0.1)
+
+                session = requests.Session()
+                session.mount(address, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                   max_retries=query_retry))
+                session.mount(address + '/statements', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                                   max_retries=statements_retry))
+                cls._SESSIONS[key] = session
+
+            return cls._SESSIONS[key]
 
     def upload(self, data):
         """
@@ -26,10 +328,13 @@ class StoreConnector(object):
         """
 
         # From serialized string
+        start = time()
         post_url = self.address + "/statements"
-        response = requests.post(post_url,
-                                 data=data,
-                                 headers={'Content-Type': 'application/x-' + self.format})
+        response = self._session.post(post_url,
+                                      data=data,
+                                      headers={'Content-Type': self.CONTENT_TYPES[self.format]},
+                                      timeout=self.timeout)
+        self._count('upload', start, 'upload', sent=len(data), received=len(response.content))
 
         return str(response.status_code)
 
@@ -47,26 +352,122 @@ class StoreConnector(object):
         response: dictionary query results from triple store
 
         """
-        # Set up connection
-        endpoint = self.address
-        if post:
-            endpoint += '/statements'
-
-        sparql = SPARQLWrapper(endpoint)
-
-        # Response parameters
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        sparql.addParameter('Accept', 'application/sparql-results+json')
+        start = time()
 
         if post:
-            sparql.method = 'POST'
+            # SPARQL update, posted to the statements endpoint
+            response = self._session.post(self.address + '/statements', data={'update': query},
+                                          timeout=self.timeout)
+            response.raise_for_status()
+            self._count('query', start, self.query_name(query), query, sent=len(query),
+                        received=len(response.content))
 
-        response = sparql.query().convert()
+            return str(response.status_code)
+
+        response = self._session.post(self.address, data={'query': query},
+                                      headers={'Accept': 'application/sparql-results+json'},
+                                      timeout=self.timeout)
+        response.raise_for_status()
+        received = len(response.content)
+        response = response.json()
 
         if ask:
+            self._count('query', start, self.query_name(query), query, 1, len(query), received)
             return response['boolean']
-        if post:
-            return response
         else:
-            return response["results"]["bindings"]
\ No newline at end of file
+            self._count('query', start, self.query_name(query), query, len(response["results"]["bindings"]),
+                        len(query), received)
+            return response["results"]["bindings"]
+
+    def _stream(self, query):
+        """
+        Submit a SPARQL select query and yield its result rows as they are read
+        :param query: SPARQL select query
+        :return: generator of bindings, as in the SPARQL JSON results of query
+        """
+        start = time()
+        response = self._session.post(self.address, data={'query': query}, headers={'Accept': self._TSV},
+                                      timeout=self.timeout, stream=True)
+        rows = 0
+        received = 0
+
+        try:
+            response.raise_for_status()
+
+            lines = response.iter_lines(delimiter=b'\n')
+            header = next(lines, b'').rstrip(b'\r')
+            variables = [variable.lstrip('?') for variable in header.decode('utf-8').split(u'\t')] if header else []
+            received += len(header) + 1
+
+            for line in lines:
+                received += len(line) + 1
+
+                # iter_lines yields an empty line after the final newline of the body, which is not a row
+                line = line.rstrip(b'\r')
+                if not line:
+                    continue
+
+                cells = line.decode('utf-8').split(u'\t')
+                if len(cells) != len(variables):
+                    raise ValueError("Row {} of the results of {} has {} cells for {} variables"
+                                     .format(rows + 1, self.query_name(query), len(cells), len(variables)))
+
+                rows += 1
+                yield {variable: self._parse_tsv_term(cell) for variable, cell in zip(variables, cells) if cell}
+
+        finally:
+            # Give the connection back to the pool, also when not all rows were read
+            response.close()
+            self._count('query', start, self.query_name(query), query, rows, len(query), received)
+
+    @classmethod
+    def _parse_tsv_term(cls, cell):
+        """
+        Turn a TSV result term into a SPARQL JSON binding
+        :param cell: term, as in N-Triples or as a bare number or boolean
+        :return: dictionary with type and value (and datatype or language of literals)
+        """
+        if cell.startswith(u'<'):
+            return {'type': 'uri', 'value': cls._unescape_tsv(cell[1:-1])}
+
+        if cell.startswith(u'_:'):
+            return {'type': 'bnode', 'value': cell[2:]}
+
+        if cell.startswith(u'"'):
+            end = cell.rindex(u'"')
+            binding = {'type': 'literal', 'value': cls._unescape_tsv(cell[1:end])}
+            suffix = cell[end + 1:]
+
+            if suffix.startswith(u'@'):
+                binding['xml:lang'] = suffix[1:]
+            elif suffix.startswith(u'^^'):
+                binding['datatype'] = suffix[3:-1]
+
+            return binding
+
+        # Numbers and booleans may be written bare
+        if cell in (u'true', u'false'):
+            datatype = 'boolean'
+        elif u'e' in cell or u'E' in cell:
+            datatype = 'double'
+        elif u'.' in cell:
+            datatype = 'decimal'
+        else:
+            datatype = 'integer'
+
+        return {'type': 'literal', 'value': cell, 'datatype': cls._XSD + datatype}
+
+    @classmethod
+    def _unescape_tsv(cls, text):
+        if u'\\' not in text:
+            return text
+
+        def unescape(match):
+            short_code, long_code, character = match.groups()
+            if short_code or long_code:
+                # Decoded as an escape sequence, as unichr can not build non-BMP characters on narrow builds
+                return match.group(0).encode('ascii').decode('unicode-escape')
+
+            return cls._TSV_ESCAPES.get(character, u'\\' + character)
+
+        return cls._TSV_ESCAPE.sub(unescape, text)
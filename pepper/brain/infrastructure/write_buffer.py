@@ -0,0 +1,167 @@
+from rdflib import Dataset
+
+from pepper import logger
+
+from threading import Thread, Event, Lock
+from time import time
+import atexit
+
+
+class WriteBuffer(object):
+
+    def __init__(self, connection, journal, max_triples=5000, max_delay=5.0, on_upload=None):
+        # type: (StoreConnector, BrainJournal, int, float, callable) -> WriteBuffer
+        """
+        Write-behind buffer merging the local memory of many experiences, to upload them to the Triple store at once
+
+        Parameters
+        ----------
+        connection: StoreConnector
+            Connection to upload the buffered data with
+        journal: BrainJournal
+            Brain journal every upload is appended to
+        max_triples: int
+            Number of buffered triples after which the buffer is flushed
+        max_delay: float
+            Seconds after which buffered data is flushed. If None, only size and explicit flushes upload data
+        on_upload: callable
+            Function without arguments called after every upload
+        """
+        self._connection = connection
+        self._journal = journal
+        self._on_upload = on_upload
+
+        self.max_triples = max_triples
+        self.max_delay = max_delay
+
+        self._log = logger.getChild(self.__class__.__name__)
+
+        # Buffer state is guarded by _lock, uploads (one at a time, in order) by _flush_lock
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._pending = Dataset()
+        self._size = 0
+        self._since = None
+
+        self._stop_flushing = Event()
+
+        if max_delay is not None:
+            thread = Thread(target=self._flush_periodically, name="BrainWriteBufferThread")
+            thread.daemon = True
+            thread.start()
+
+        # Do not lose what is buffered when the application exits
+        atexit.register(self.stop)
+
+    @property
+    def size(self):
+        # type: () -> int
+        """
+        Number of buffered triples (counting duplicates)
+        """
+        return self._size
+
+    def add(self, dataset):
+        """
+        Merge the named graphs of a dataset into the buffer, flushing it if it grew too large
+        :param dataset: rdflib Dataset with local memory
+        :return: response status if the buffer was flushed, None otherwise
+        """
+        quads = [(s, p, o, g if g is not None else self._pending.default_context)
+                 for s, p, o, g in dataset.quads((None, None, None, None))]
+
+        if not quads:
+            return None
+
+        with self._lock:
+            if self._size == 0:
+                for prefix, namespace in dataset.namespaces():
+                    self._pending.bind(prefix, namespace)
+
+                self._since = time()
+
+            self._pending.addN(quads)
+            self._size += len(quads)
+
+            full = self._size >= self.max_triples
+
+        # Upload without holding the buffer, so other experiences can be added in the meantime
+        return self.flush() if full else None
+
+    def flush(self):
+        """
+        Upload all buffered data in one request, and append it to the brain journal
+
+        Data that fails to upload is not journaled, but stays buffered for the next flush. Experiences can be added
+        while uploading, and are uploaded by the next flush
+        :return: response status, or None if there was nothing to upload
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._size == 0:
+                    return None
+
+                pending, size, since = self._pending, self._size, self._since
+
+                self._pending = Dataset()
+                self._size = 0
+                self._since = None
+
+            try:
+                data = pending.serialize(format=self._connection.format)
+                code = self._connection.upload(data)
+            except Exception:
+                self._restore(pending, size, since)
+                raise
+
+            if not str(code).startswith('2'):
+                self._log.error("Could not upload {} buffered triples (status {}), keeping them buffered"
+                                .format(size, code))
+                self._restore(pending, size, since)
+                return code
+
+            # Only journal what reached the brain
+            self._journal.write(data)
+
+            self._log.debug("Flushed {} triples".format(size))
+
+        if self._on_upload is not None:
+            self._on_upload()
+
+        return code
+
+    def _restore(self, pending, size, since):
+        """
+        Put data that failed to upload back in the buffer, together with what was added in the meantime
+        :param pending: rdflib Dataset that failed to upload
+        :param size: number of triples in it
+        :param since: time the oldest of them was buffered
+        :return:
+        """
+        with self._lock:
+            for prefix, namespace in pending.namespaces():
+                self._pending.bind(prefix, namespace)
+
+            self._pending.addN((s, p, o, g if g is not None else self._pending.default_context)
+                               for s, p, o, g in pending.quads((None, None, None, None)))
+            self._size += size
+            self._since = since
+
+    def _flush_periodically(self):
+        while not self._stop_flushing.wait(min(self.max_delay, 1.0)):
+            if self._since is not None and time() - self._since >= self.max_delay:
+                self._try_flush()
+
+    def _try_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self._log.error("Could not flush buffered triples: {}".format(e))
+
+    def stop(self):
+        """
+        Flush what is buffered and stop flushing periodically
+        :return:
+        """
+        self._stop_flushing.set()
+        self._try_flush()
@@ -8,8 +8,15 @@ from pepper.brain.LTM_statement_processing import model_graphs
 
 from pepper import config
 
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
 
 class LongTermMemory(BasicBrain):
+
+    # Thoughts that can be awaited in update, named after the accessors of Thoughts
+    THOUGHTS = ['statement_novelties', 'entity_novelty', 'negation_conflicts', 'complement_conflicts',
+                'subject_gaps', 'complement_gaps', 'overlaps', 'trust']
+
     def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False):
         # type: (str, bool) -> None
         """
@@ -25,15 +32,21 @@ class LongTermMemory(BasicBrain):
 
         self.myself = None
         self.query_prefixes = read_query('prefixes')  # USED ONLY WHEN QUERYING
-        self.thought_generator = ThoughtGenerator()
-        self.location_reasoner = LocationReasoner()
-        self.type_reasoner = TypeReasoner()
-        self.trust_calculator = TrustCalculator()
+
+        # Reasoners borrow this brain's connection and RDF builder
+        self.thought_generator = ThoughtGenerator(address, context=self.context)
+        self.location_reasoner = LocationReasoner(address, context=self.context)
+        self.type_reasoner = TypeReasoner(address, context=self.context)
+        self.trust_calculator = TrustCalculator(address, context=self.context)
+
+        # Bounded pool on which thought queries are dispatched concurrently
+        self._thought_executor = ThreadPoolExecutor(max_workers=config.BRAIN_THOUGHT_WORKERS)
 
         self.set_location_label = self.location_reasoner.set_location_label
         self.reason_location = self.location_reasoner.reason_location
 
-        self.trust_calculator.compute_trust_network()
+        # Build the trust network in the background, it is kept up to date incrementally after each update
+        self.trust_calculator.start_rebuilding(config.BRAIN_TRUST_REBUILD_INTERVAL)
 
     #################################### Main functions to interact with the brain ####################################
     def get_thoughts_on_entity(self, entity_label, reason_types=False):
@@ -70,8 +83,8 @@ class LongTermMemory(BasicBrain):
 
         return output
 
-    def update(self, utterance, reason_types=False):
-        # type (Utterance) -> Thoughts
+    def update(self, utterance, reason_types=False, await_thoughts=None):
+        # type (Utterance, bool, Optional[List[str]]) -> dict
         """
         Main function to interact with if a statement is coming into the brain. Takes in an Utterance containing a
         parsed statement as a Triple, transforms them to linked data, and posts them to the triple store
@@ -81,6 +94,9 @@ class LongTermMemory(BasicBrain):
             Contains all necessary information regarding a statement just made.
         reason_types: Boolean
             Signal to entity linking over the semantic web
+        await_thoughts: Optional[List[str]]
+            Names of the thoughts (see LongTermMemory.THOUGHTS) to wait for before returning. The rest keep being
+            computed in the background and are awaited when accessed on the Thoughts object. All by default
 
         Returns
         -------
@@ -91,73 +107,238 @@ class LongTermMemory(BasicBrain):
         """
         if utterance.triple is not None:
 
-            # Casefold
-            utterance.casefold(format='triple')
+            # Create graphs and triples
+            instance = self._model_statement(utterance, reason_types)
 
-            if reason_types:
-                # Try to figure out what this entity is
-                if not utterance.triple.complement.types:
-                    complement_type, _ = self.type_reasoner.reason_entity_type(str(utterance.triple.complement_name),
-                                                                               exact_only=True)
-                    utterance.triple.complement.add_types([complement_type])
+            # Upload the experiences buffered so far, so thoughts are computed on an up to date brain
+            self._write_buffer.flush()
+            thoughts = self._submit_thoughts_before_upload(utterance, instance)
 
-                if not utterance.triple.subject.types:
-                    subject_type, _ = self.type_reasoner.reason_entity_type(str(utterance.triple.subject_name),
-                                                                            exact_only=True)
-                    utterance.triple.complement.add_types([subject_type])
+            # Finish process of uploading new knowledge to the triple store, once the brain has been read without it
+            local_memory = self._take_local_memory()
+            wait(thoughts.values())
+            code = self._upload_local_memory(local_memory)
 
-            # Create graphs and triples
-            instance = model_graphs(self, utterance)
+            thoughts.update(self._submit_thoughts_after_upload(utterance, thoughts))
 
-            # Check if this knowledge already exists on the brain
-            statement_novelty = self.thought_generator.get_statement_novelty(instance.id)
+            # Create JSON output
+            output = {'response': code, 'statement': utterance,
+                      'thoughts': self._collect_thoughts(thoughts, await_thoughts)}
 
-            # Check how many items of the same type as subject and complement we have
-            entity_novelty = self.thought_generator.fill_entity_novelty(utterance.triple.subject.id,
-                                                                        utterance.triple.complement.id)
+        else:
+            # Create JSON output
+            output = {'response': None, 'statement': utterance, 'thoughts': None}
+
+        return output
+
+    def update_many(self, utterances, reason_types=False, thoughts=False):
+        # type (List[Utterance], bool, bool) -> List[dict]
+        """
+        Bulk version of update: models all statements in one local memory and uploads them at once. Meant for loading
+        many statements, like historic conversations
+        Parameters
+        ----------
+        utterances: List[Utterance]
+            Statements to add to the brain
+        reason_types: Boolean
+            Signal to entity linking over the semantic web
+        thoughts: Boolean
+            Whether to compute thoughts on the statements. Novelty and overlaps are computed on the brain without any
+            of the statements, conflicts and gaps on the brain with all of them. If False, the trust network is only
+            brought up to date by its next rebuild
+
+        Returns
+        -------
+        outputs: List[dict]
+            One output per utterance, as returned by update
+        """
+        statements = [utterance for utterance in utterances if utterance.triple is not None]
+
+        # Create graphs and triples for all statements
+        instances = [self._model_statement(utterance, reason_types) for utterance in statements]
+
+        # Upload the experiences buffered so far, so thoughts are computed on an up to date brain
+        self._write_buffer.flush()
+        statement_thoughts = [self._submit_thoughts_before_upload(utterance, instance)
+                              for utterance, instance in zip(statements, instances)] if thoughts else []
+
+        # Upload all statements at once, once the brain has been read without them
+        local_memory = self._take_local_memory()
+        wait([future for before_upload in statement_thoughts for future in before_upload.values()])
+        code = self._upload_local_memory(local_memory)
+
+        for utterance, before_upload in zip(statements, statement_thoughts):
+            before_upload.update(self._submit_thoughts_after_upload(utterance, before_upload))
+
+        # Create JSON output, in the order of the utterances
+        statement_thoughts = iter(statement_thoughts)
+        outputs = []
+        for utterance in utterances:
+            if utterance.triple is not None:
+                outputs.append({'response': code, 'statement': utterance,
+                                'thoughts': self._collect_thoughts(next(statement_thoughts)) if thoughts else None})
+            else:
+                outputs.append({'response': None, 'statement': utterance, 'thoughts': None})
+
+        return outputs
+
+    def _model_statement(self, utterance, reason_types):
+        """
+        Casefold a statement, reason about the types of its entities if needed, and model it in local memory
+        :param utterance: Utterance with a statement
+        :param reason_types: whether to reason about the types of subject and complement
+        :return: instance of the statement
+        """
+        # Casefold
+        utterance.casefold(format='triple')
+
+        if reason_types:
+            # Try to figure out what this entity is
+            if not utterance.triple.complement.types:
+                complement_type, _ = self.type_reasoner.reason_entity_type(str(utterance.triple.complement_name),
+                                                                           exact_only=True)
+                utterance.triple.complement.add_types([complement_type])
+
+            if not utterance.triple.subject.types:
+                subject_type, _ = self.type_reasoner.reason_entity_type(str(utterance.triple.subject_name),
+                                                                        exact_only=True)
+                utterance.triple.complement.add_types([subject_type])
 
-            # Find any overlaps
-            overlaps = self.thought_generator.get_overlaps(utterance)
+        # Create graphs and triples
+        return model_graphs(self, utterance)
+
+    def _upload_local_memory(self, local_memory):
+        """
+        Upload local memory together with the experiences buffered so far
+        :param local_memory: rdflib Dataset with local memory
+        :return: response status
+        """
+        code = self._write_buffer.add(local_memory)
+
+        return self._write_buffer.flush() or code
+
+    def _submit_thoughts_before_upload(self, utterance, instance):
+        """
+        Submit the thoughts on a statement that must be computed on the brain without it
+        :param utterance: Utterance with a statement
+        :param instance: instance of the statement
+        :return: dictionary of thought name to Future
+        """
+        submit = self._thought_executor.submit
+
+        if config.BRAIN_CONSOLIDATED_THOUGHTS:
+            # Novelty and overlaps in one query
+            return self._split_future(submit(self.thought_generator.get_thoughts_before_upload, utterance, instance.id),
+                                      ['statement_novelties', 'entity_novelty', 'overlaps'])
+
+        thoughts = {}
+
+        # Check if this knowledge already exists on the brain
+        thoughts['statement_novelties'] = submit(self.thought_generator.get_statement_novelty, instance.id)
+
+        # Check how many items of the same type as subject and complement we have
+        thoughts['entity_novelty'] = submit(self.thought_generator.fill_entity_novelty,
+                                            utterance.triple.subject.id, utterance.triple.complement.id)
+
+        # Find any overlaps
+        thoughts['overlaps'] = submit(self.thought_generator.get_overlaps, utterance)
+
+        return thoughts
+
+    def _submit_thoughts_after_upload(self, utterance, thoughts):
+        """
+        Submit the thoughts on a statement that must be computed on the brain with it, and update trust
+        :param utterance: Utterance with a statement
+        :param thoughts: dictionary of thought name to Future, with the thoughts computed before the upload
+        :return: dictionary of thought name to Future
+        """
+        submit = self._thought_executor.submit
 
-            # Finish process of uploading new knowledge to the triple store
-            data = self._serialize(self._brain_log)
-            code = self._upload_to_brain(data)
+        if config.BRAIN_CONSOLIDATED_THOUGHTS:
+            # Conflicts and gaps in one query
+            after_upload = self._split_future(submit(self.thought_generator.get_thoughts_after_upload, utterance),
+                                              ['negation_conflicts', 'complement_conflicts', 'subject_gaps',
+                                               'complement_gaps'])
+
+        else:
+            after_upload = {}
 
             # Check for conflicts after adding the knowledge
-            negation_conflicts = self.thought_generator.get_negation_conflicts(utterance)
-            cardinality_conflict = self.thought_generator.get_complement_cardinality_conflicts(utterance)
+            after_upload['negation_conflicts'] = submit(self.thought_generator.get_negation_conflicts, utterance)
+            after_upload['complement_conflicts'] = submit(self.thought_generator.get_complement_cardinality_conflicts,
+                                                          utterance)
 
             # Check for gaps, in case we want to be proactive
-            subject_gaps = self.thought_generator.get_entity_gaps(utterance.triple.subject,
-                                                                  exclude=utterance.triple.complement)
-            complement_gaps = self.thought_generator.get_entity_gaps(utterance.triple.complement,
-                                                                     exclude=utterance.triple.subject)
+            after_upload['subject_gaps'] = submit(self.thought_generator.get_entity_gaps, utterance.triple.subject,
+                                                  exclude=utterance.triple.complement)
+            after_upload['complement_gaps'] = submit(self.thought_generator.get_entity_gaps,
+                                                     utterance.triple.complement, exclude=utterance.triple.subject)
 
-            # Report trust
-            trust = self.trust_calculator.get_trust(utterance.chat_speaker)
+        # Report trust, and update it with what this statement tells about the speaker
+        after_upload['trust'] = submit(self.trust_calculator.get_trust, utterance.chat_speaker)
+        submit(self._update_trust, utterance, thoughts['statement_novelties'], after_upload['negation_conflicts'])
 
-            # Create JSON output
-            thoughts = Thoughts(statement_novelty, entity_novelty, negation_conflicts, cardinality_conflict,
-                                subject_gaps, complement_gaps, overlaps, trust)
-            output = {'response': code, 'statement': utterance, 'thoughts': thoughts}
+        return after_upload
 
-        else:
-            # Create JSON output
-            output = {'response': None, 'statement': utterance, 'thoughts': None}
+    def _collect_thoughts(self, thoughts, await_thoughts=None):
+        """
+        Wait for the requested thoughts and build a Thoughts object, the rest are awaited when accessed
+        :param thoughts: dictionary of thought name to Future
+        :param await_thoughts: names of the thoughts to wait for, all by default
+        :return: Thoughts
+        """
+        thoughts = dict(thoughts)
 
-        return output
+        for name in (self.THOUGHTS if await_thoughts is None else await_thoughts):
+            thoughts[name] = thoughts[name].result()
+
+        return Thoughts(thoughts['statement_novelties'], thoughts['entity_novelty'],
+                        thoughts['negation_conflicts'], thoughts['complement_conflicts'],
+                        thoughts['subject_gaps'], thoughts['complement_gaps'], thoughts['overlaps'],
+                        thoughts['trust'])
+
+    @staticmethod
+    def _split_future(future, names):
+        """
+        Split the future of a dictionary of thoughts into one future per thought
+        :param future: Future of a dictionary of thoughts
+        :param names: names of the thoughts in the dictionary
+        :return: dictionary of name to Future of that thought
+        """
+        parts = {name: Future() for name in names}
+
+        def resolve(done):
+            for name, part in parts.items():
+                if done.exception() is not None:
+                    part.set_exception(done.exception())
+                else:
+                    part.set_result(done.result()[name])
+
+        future.add_done_callback(resolve)
+
+        # A copy, callers add other thoughts to it
+        return dict(parts)
+
+    def _update_trust(self, utterance, statement_novelty, negation_conflicts):
+        # Runs on the thought executor, after the thoughts it depends on were submitted
+        try:
+            self.trust_calculator.update_trust_network(utterance, statement_novelty.result(),
+                                                       negation_conflicts.result())
+        except Exception as e:
+            self._log.error("Could not update trust network: {}".format(e))
 
     def experience(self, utterance):
         """
         Main function to interact with if an experience is coming into the brain. Takes in a structured utterance
-        containing parsed experience, transforms them to triples, and posts them to the triple store
+        containing parsed experience, transforms them to triples, and buffers them to be posted to the triple store
+        together with other experiences. Queries on the brain upload the buffered experiences first
         :param utterance: Structured data of a parsed experience
-        :return: json response containing the status for posting the triples, and the original statement
+        :return: json response containing the status for posting the triples (None if they are still buffered),
+        and the original statement
         """
         # Create graphs and triples
         _ = model_graphs(self, utterance)
-        data = self._serialize(self._brain_log)
-        code = self._upload_to_brain(data)
+        code = self._write_buffer.add(self._take_local_memory())
 
         # Create JSON output
         output = {'response': code, 'statement': utterance}
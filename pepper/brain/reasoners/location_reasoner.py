@@ -1,13 +1,16 @@
-from pepper.brain.utils.helper_functions import read_query, casefold_text
-from pepper.brain.basic_brain import BasicBrain
+from pepper.brain.utils.helper_functions import read_query, fill_query, casefold_text
+from pepper.brain.infrastructure import EpisodicIndex
+from pepper.brain.basic_brain import BasicBrain, BrainContext
 
 from pepper import config
 
+from threading import Lock
+
 
 class LocationReasoner(BasicBrain):
 
-    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False):
-        # type: (str, bool) -> LocationReasoner
+    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, context=None):
+        # type: (str, bool, BrainContext) -> LocationReasoner
         """
         Interact with Triple store
 
@@ -15,9 +18,23 @@ class LocationReasoner(BasicBrain):
         ----------
         address: str
             IP address and port of the Triple store
+        context: BrainContext
+            Connection and RDF builder shared with the brain using this reasoner
         """
 
-        super(LocationReasoner, self).__init__(address, clear_all, is_submodule=True)
+        super(LocationReasoner, self).__init__(address, clear_all, is_submodule=True, context=context)
+
+        # Episodic memory, loaded from the brain on first use (and after a location is renamed) and kept up to date
+        # with every context added after
+        self._episodic_index = EpisodicIndex()
+        self._episodic_index_loaded = False
+        self._episodic_index_lock = Lock()
+
+        # Object ids seen per location and category, with the number of contexts they were seen in. Loaded from the
+        # brain once per location, and kept up to date with the ids assigned to objects after
+        self._object_ids = {}
+        self._object_contexts = {}
+        self._object_ids_lock = Lock()
 
     @staticmethod
     def _measure_detection_overlap(detections_1, detections_2):
@@ -62,6 +79,42 @@ class LocationReasoner(BasicBrain):
 
         return episodic_memory
 
+    def _load_episodic_index(self):
+        """
+        Index the episodic memory in the brain, the first time it is needed
+        :return:
+        """
+        if not self._episodic_index_loaded:
+            with self._episodic_index_lock:
+                if not self._episodic_index_loaded:
+                    for episode in self.get_episodic_memory():
+                        self._episodic_index.add(episode['context'], episode['place'], episode['date'],
+                                                 episode['detections'] + episode['geo'])
+
+                    self._episodic_index_loaded = True
+
+    def index_context(self, context, place, date, detections):
+        """
+        Add a context that is being added to the brain to the episodic memory
+        Parameters
+        ----------
+        context: str
+            Label of the context
+        place: str
+            Label of the place of the context
+        date: str
+            Label of the date of the context
+        detections: List[str]
+            Labels of what was detected in the context (with their ids), and of its geographical location
+
+        Returns
+        -------
+
+        """
+        # Labels as plain strings, as they come from the brain
+        detections = self._rdf_builder.clean_aggregated_detections(u'|'.join(detections))
+        self._episodic_index.add(unicode(context), unicode(place), unicode(date), detections)
+
     def _fill_location_memory_(self, raw_objects_in_location):
         """
         Structure overlap to get the provenance and entity on which they overlap
@@ -80,21 +133,73 @@ class LocationReasoner(BasicBrain):
 
         return preprocessed_types, preprocessed_ids
 
-    def get_location_memory(self, cntxt):
-        # brain object memories
-        query = read_query('context/ranked_object_ids_per_type') % 'cntxt.location.label'
-        response = self._submit_query(query)
+    @staticmethod
+    def _location_name(cntxt):
+        """
+        Name of the location of a context, as in its URI
+        :param cntxt: Context
+        :return: local name of the location
+        """
+        if cntxt.location.label.lower() == cntxt.location.UNKNOWN.lower():
+            # All unknowns have label Unknown, different ids but iri with id
+            return casefold_text('%s%s' % (cntxt.location.label, cntxt.location.id), format='triple')
 
-        location_memory = {}
+        return casefold_text('%s' % cntxt.location.label, format='triple')
+
+    def _query_object_ids(self, location):
+        """
+        Query the ids of objects seen at a location, with the number of contexts they were seen in
+        :param location: local name of the location
+        :return: dictionary of category to dictionary of id to number of contexts
+        """
+        # Buffered experiences are not uploaded for this query, the ids they assigned are kept in memory
+        query = fill_query('context/ranked_object_ids_per_type', location)
+        response = self._submit_query(query, flush_buffer=False)
+
+        object_ids = {}
         if response and response[0]['type']['value'] != '':
             for elem in response:
                 categories, ids = self._fill_location_memory_(elem)
+                counts = elem['imp']['value'].split('|') if 'imp' in elem else []
+
+                # Ids come ranked, use their number of contexts if it can be matched, their rank otherwise
+                if len(counts) == len(ids):
+                    counts = [int(count) for count in counts]
+                else:
+                    counts = range(len(ids), 0, -1)
+
                 # assign multiple categories (eg selene is person and agent)
                 for category in categories:
-                    temp = location_memory.get(casefold_text(category, format='triple'),
-                                               {'brain_ids': [], 'local_ids': []})
-                    temp['brain_ids'].extend(ids)
-                    location_memory[casefold_text(category, format='triple')] = temp
+                    category_ids = object_ids.setdefault(casefold_text(category, format='triple'), {})
+                    for object_id, count in zip(ids, counts):
+                        category_ids[object_id] = max(category_ids.get(object_id, 0), count)
+
+        return object_ids
+
+    def _get_object_ids(self, location):
+        """
+        Get the ids of objects seen at a location, querying them the first time the location is used
+        :param location: local name of the location
+        :return: dictionary of category to dictionary of id to number of contexts
+        """
+        with self._object_ids_lock:
+            if location in self._object_ids:
+                return self._object_ids[location]
+
+        object_ids = self._query_object_ids(location)
+
+        with self._object_ids_lock:
+            return self._object_ids.setdefault(location, object_ids)
+
+    def get_location_memory(self, cntxt):
+        # brain object memories, ranked by the number of contexts they were seen in
+        object_ids = self._get_object_ids(self._location_name(cntxt))
+
+        location_memory = {}
+        with self._object_ids_lock:
+            for category, ids in object_ids.items():
+                ranked_ids = sorted(ids.keys(), key=lambda object_id: -ids[object_id])
+                location_memory[category] = {'brain_ids': ranked_ids, 'local_ids': []}
 
         # Local object memories
         for item in cntxt.objects:  # Error, this skips the first element?
@@ -112,6 +217,56 @@ class LocationReasoner(BasicBrain):
 
         return location_memory
 
+    def register_object_ids(self, cntxt, object_ids):
+        """
+        Keep the ids assigned to the objects of a context, so the next contexts at the same location reuse them
+        Parameters
+        ----------
+        cntxt: Context
+            Context in which the objects were seen
+        object_ids: List[Tuple[str, str]]
+            Category and assigned id of every object
+
+        Returns
+        -------
+
+        """
+        location = self._location_name(cntxt)
+        known_ids = self._get_object_ids(location)
+
+        with self._object_ids_lock:
+            for category, object_id in object_ids:
+                category = casefold_text(category, format='triple')
+                contexts = self._object_contexts.setdefault((location, category, object_id), set())
+
+                # Count every context an object was seen in once
+                if cntxt.id not in contexts:
+                    contexts.add(cntxt.id)
+                    category_ids = known_ids.setdefault(category, {})
+                    category_ids[object_id] = category_ids.get(object_id, 0) + 1
+
+    def _rename_object_ids(self, default, location):
+        """
+        Move the ids of objects seen at renamed (unknown) locations to the location they were renamed to
+        :param default: local name the renamed locations start with
+        :param location: local name of the location they were renamed to
+        :return:
+        """
+        known_ids = self._get_object_ids(location)
+
+        with self._object_ids_lock:
+            renamed = [old for old in self._object_ids if old != location and old.startswith(default)]
+
+            for old in renamed:
+                for category, ids in self._object_ids.pop(old).items():
+                    category_ids = known_ids.setdefault(category, {})
+                    for object_id, count in ids.items():
+                        category_ids[object_id] = max(category_ids.get(object_id, 0), count)
+
+            for old, category, object_id in [key for key in self._object_contexts if key[0] in renamed]:
+                contexts = self._object_contexts.pop((old, category, object_id))
+                self._object_contexts.setdefault((location, category, object_id), set()).update(contexts)
+
     def reason_location(self, cntxt):
 
         guess = None
@@ -119,10 +274,10 @@ class LocationReasoner(BasicBrain):
         if cntxt.location.label != cntxt.location.UNKNOWN:
             return cntxt.location.label
 
-        # Query all locations and detections (through context)
-        memory = self.get_episodic_memory()
+        # Index all locations and detections (through context)
+        self._load_episodic_index()
 
-        if memory:
+        if len(self._episodic_index):
             # Generate set of current detections
             observations = []
             for item in cntxt.objects:
@@ -135,17 +290,12 @@ class LocationReasoner(BasicBrain):
             observations.append(cntxt.location.country)
             observations.append(cntxt.location.region)
 
-            # Compare one by one and determine most similar
-            for mem in memory:
-                all = mem['detections']
-                all.extend(mem['geo'])
-                mem['overlap'] = self._measure_detection_overlap(all, observations)
-
             # Pick most similar and determine equality based on a threshold
-            memory.sort(key=lambda x: x['overlap'])
-            best_guess = memory[0]
-            guess = best_guess['place'] \
-                if best_guess['overlap'] > 0.5 and best_guess['place'] != cntxt.location.UNKNOWN else None
+            most_similar = self._episodic_index.most_similar(observations, k=1)
+            if most_similar:
+                overlap, best_guess = most_similar[0]
+                guess = best_guess['place'] \
+                    if overlap > 0.5 and best_guess['place'] != cntxt.location.UNKNOWN else None
 
             self._log.info("Reasoned location to: {}".format(guess))
 
@@ -155,10 +305,17 @@ class LocationReasoner(BasicBrain):
         # https: // www.semanticarts.com / sparql - changing - instance - uris /
         # Replace as subject, replace label, replace as object in the database (long term memory)
 
-        queries = read_query('context/rename_location') % (default, label,
-                                                           default, default, default, default, label,
-                                                           default, label)
+        queries = fill_query('context/rename_location', default, label,
+                             default, default, default, default, label,
+                             default, label)
         for query in queries.split(';'):
             response = self._submit_query(query, post=True)
 
+        # Places in the episodic memory changed, index it again from the brain the next time it is needed
+        with self._episodic_index_lock:
+            self._episodic_index.clear()
+            self._episodic_index_loaded = False
+
+        self._rename_object_ids(casefold_text(default, format='triple'), casefold_text(label, format='triple'))
+
         self._log.info("Set location to: {}".format(label))
@@ -1,16 +1,18 @@
 import random
 from pepper.brain.infrastructure import CardinalityConflict, NegationConflict, StatementNovelty, EntityNovelty, \
     Gap, Gaps, Overlap, Overlaps
-from pepper.brain.utils.helper_functions import read_query
-from pepper.brain.basic_brain import BasicBrain
+from pepper.brain.utils.helper_functions import fill_query
+from pepper.brain.basic_brain import BasicBrain, BrainContext
 
 from pepper import config
 
+from rdflib import Literal
+
 
 class ThoughtGenerator(BasicBrain):
 
-    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False):
-        # type: (str, bool) -> ThoughtGenerator
+    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, context=None):
+        # type: (str, bool, BrainContext) -> ThoughtGenerator
         """
         Interact with Triple store
 
@@ -18,9 +20,11 @@ class ThoughtGenerator(BasicBrain):
         ----------
         address: str
             IP address and port of the Triple store
+        context: BrainContext
+            Connection and RDF builder shared with the brain using this reasoner
         """
 
-        super(ThoughtGenerator, self).__init__(address, clear_all, is_submodule=True)
+        super(ThoughtGenerator, self).__init__(address, clear_all, is_submodule=True, context=context)
 
     ########## novelty ##########
     def _fill_statement_novelty_(self, raw_provenance):
@@ -58,6 +62,9 @@ class ThoughtGenerator(BasicBrain):
         subject_novelty = self._check_instance_novelty_(subject_url)
         complement_novelty = self._check_instance_novelty_(complement_url)
 
+        return self._build_entity_novelty(subject_novelty, complement_novelty)
+
+    def _build_entity_novelty(self, subject_novelty, complement_novelty):
         entity_novelty = EntityNovelty(subject_novelty, complement_novelty)
 
         if entity_novelty.subject or entity_novelty.complement:
@@ -78,9 +85,12 @@ class ThoughtGenerator(BasicBrain):
         novelties: List[StatementNovelty]
             List of provenance for the instance
         """
-        query = read_query('thoughts/statement_novelty') % statement_uri
+        query = fill_query('thoughts/statement_novelty', statement_uri)
         response = self._submit_query(query)
 
+        return self._build_statement_novelty(response)
+
+    def _build_statement_novelty(self, response):
         if response and response[0] != {}:
             novelties = [self._fill_statement_novelty_(elem) for elem in response]
         else:
@@ -105,7 +115,7 @@ class ThoughtGenerator(BasicBrain):
         response: List[StatementNovelty]
             List of provenance for the instance
         """
-        query = read_query('thoughts/entity_novelty') % instance_url
+        query = fill_query('thoughts/entity_novelty', instance_url)
         response = self._submit_query(query, ask=True)
 
         return response
@@ -143,28 +153,23 @@ class ThoughtGenerator(BasicBrain):
             Gaps object containing gaps related to range and domain information that could be learned
         """
         # Role as subject
-        query = read_query('thoughts/subject_gaps') % (entity.label, entity.label if exclude is None else exclude.label)
-        response = self._submit_query(query)
-
-        if response:
-            subject_gaps = [self._fill_entity_gap_(elem)
-                            for elem in response
-                            if elem['p']['value'].split('/')[-1] not in self._NOT_TO_ASK_PREDICATES]
-
-        else:
-            subject_gaps = []
+        query = fill_query('thoughts/subject_gaps', entity.label, entity.label if exclude is None else exclude.label)
+        subject_response = self._submit_query(query)
 
         # Role as object
-        query = read_query('thoughts/object_gaps') % (entity.label, entity.label if exclude is None else exclude.label)
-        response = self._submit_query(query)
+        query = fill_query('thoughts/object_gaps', entity.label, entity.label if exclude is None else exclude.label)
+        complement_response = self._submit_query(query)
 
-        if response:
-            complement_gaps = [self._fill_entity_gap_(elem)
-                               for elem in response
-                               if elem['p']['value'].split('/')[-1] not in self._NOT_TO_ASK_PREDICATES]
+        return self._build_gaps(subject_response, complement_response)
 
-        else:
-            complement_gaps = []
+    def _build_gaps(self, subject_response, complement_response):
+        subject_gaps = [self._fill_entity_gap_(elem)
+                        for elem in subject_response
+                        if elem['p']['value'].split('/')[-1] not in self._NOT_TO_ASK_PREDICATES]
+
+        complement_gaps = [self._fill_entity_gap_(elem)
+                           for elem in complement_response
+                           if elem['p']['value'].split('/')[-1] not in self._NOT_TO_ASK_PREDICATES]
 
         gaps = Gaps(subject_gaps, complement_gaps)
 
@@ -207,26 +212,26 @@ class ThoughtGenerator(BasicBrain):
             Overlaps containing shared information with the heard statement
         """
         # Role as subject
-        query = read_query('thoughts/object_overlap') % (
-            utterance.triple.predicate_name, utterance.triple.complement_name,
-            utterance.triple.subject_name)
-        response = self._submit_query(query)
-
-        if response and response[0]['types']['value'] != '':
-            complement_overlap = [self._fill_overlap_(elem) for elem in response]
-        else:
-            complement_overlap = []
+        query = fill_query('thoughts/object_overlap',
+                           utterance.triple.predicate_name, utterance.triple.complement_name,
+                           utterance.triple.subject_name)
+        complement_response = self._submit_query(query)
 
         # Role as object
-        query = read_query('thoughts/subject_overlap') % (
-            utterance.triple.predicate_name, utterance.triple.subject_name,
-            utterance.triple.complement_name)
-        response = self._submit_query(query)
+        query = fill_query('thoughts/subject_overlap',
+                           utterance.triple.predicate_name, utterance.triple.subject_name,
+                           utterance.triple.complement_name)
+        subject_response = self._submit_query(query)
 
-        if response and response[0]['types']['value'] != '':
-            subject_overlap = [self._fill_overlap_(elem) for elem in response]
-        else:
-            subject_overlap = []
+        return self._build_overlaps(subject_response, complement_response)
+
+    def _build_overlaps(self, subject_response, complement_response):
+        # Grouped queries over no overlaps may return a row without the aggregated types
+        subject_overlap = [self._fill_overlap_(elem) for elem in subject_response
+                           if 'types' in elem and elem['types']['value'] != '']
+
+        complement_overlap = [self._fill_overlap_(elem) for elem in complement_response
+                              if 'types' in elem and elem['types']['value'] != '']
 
         overlaps = Overlaps(subject_overlap, complement_overlap)
 
@@ -286,7 +291,7 @@ class ThoughtGenerator(BasicBrain):
         return conflicts
 
     def get_conflicts_with_one_to_one_predicate(self, one_to_one_predicate):
-        query = read_query('one_to_one_conflicts') % one_to_one_predicate
+        query = fill_query('one_to_one_conflicts', one_to_one_predicate)
 
         response = self._submit_query(query)
         conflicts = []
@@ -318,11 +323,15 @@ class ThoughtGenerator(BasicBrain):
         if str(utterance.triple.predicate_name) not in self._ONE_TO_ONE_PREDICATES:
             return []
 
-        query = read_query('thoughts/object_cardinality_conflicts') % (utterance.triple.predicate_name,
-                                                                       utterance.triple.subject_name,
-                                                                       utterance.triple.complement_name)
+        query = fill_query('thoughts/object_cardinality_conflicts', utterance.triple.predicate_name,
+                           utterance.triple.subject_name,
+                           utterance.triple.complement_name)
 
         response = self._submit_query(query)
+
+        return self._build_cardinality_conflicts(response)
+
+    def _build_cardinality_conflicts(self, response):
         if response and response[0] != {}:
             conflicts = [self._fill_cardinality_conflict_(elem) for elem in response]
         else:
@@ -346,11 +355,15 @@ class ThoughtGenerator(BasicBrain):
         conflicts: List[NegationConflict]
             List of Conflicts containing the predicate which creates the conflict, and their provenance
         """
-        query = read_query('thoughts/negation_conflicts') % (utterance.triple.predicate_name,
-                                                             utterance.triple.subject_name,
-                                                             utterance.triple.complement_name)
+        query = fill_query('thoughts/negation_conflicts', utterance.triple.predicate_name,
+                           utterance.triple.subject_name,
+                           utterance.triple.complement_name)
 
         response = self._submit_query(query)
+
+        return self._build_negation_conflicts(response)
+
+    def _build_negation_conflicts(self, response):
         if response and response[0] != {}:
             conflicts = [self._fill_negation_conflict_(elem) for elem in response]
         else:
@@ -362,3 +375,79 @@ class ThoughtGenerator(BasicBrain):
             self._log.info("Negation Conflicts: {}".format(c.__str__()))
 
         return conflicts
+
+    ########## consolidated ##########
+    @staticmethod
+    def _split_tagged_rows(response):
+        """
+        Group the rows of a consolidated thoughts query by the thought (and role) they are tagged with
+        :param response: rows with a 'thought' and optionally a 'role' and 'entity' binding
+        :return: dictionary of (thought, entity, role) to rows, without the tags
+        """
+        rows = {}
+        for row in response:
+            tag = tuple(row.pop(key)['value'] if key in row else None for key in ('thought', 'entity', 'role'))
+            rows.setdefault(tag, []).append(row)
+
+        return rows
+
+    def get_thoughts_before_upload(self, utterance, statement_uri):
+        """
+        Query and build, in one query, the thoughts on a statement that must be computed before it is uploaded
+        Parameters
+        ----------
+        utterance: Utterance
+            Statement about to be uploaded
+        statement_uri: str
+            URI of the statement instance
+
+        Returns
+        -------
+        thoughts: dict
+            StatementNovelty list, EntityNovelty and Overlaps, by the name used in LongTermMemory.THOUGHTS
+        """
+        query = fill_query('thoughts/before_upload', statement_uri,
+                           utterance.triple.subject.id, utterance.triple.complement.id,
+                           utterance.triple.predicate_name, utterance.triple.complement_name,
+                           utterance.triple.subject_name,
+                           utterance.triple.predicate_name, utterance.triple.subject_name,
+                           utterance.triple.complement_name)
+        rows = self._split_tagged_rows(self._submit_query(query))
+
+        return {'statement_novelties': self._build_statement_novelty(rows.get(('statement_novelty', None, None), [])),
+                'entity_novelty': self._build_entity_novelty(('entity_novelty', None, 'subject') in rows,
+                                                             ('entity_novelty', None, 'complement') in rows),
+                'overlaps': self._build_overlaps(rows.get(('overlaps', None, 'subject'), []),
+                                                 rows.get(('overlaps', None, 'complement'), []))}
+
+    def get_thoughts_after_upload(self, utterance):
+        """
+        Query and build, in one query, the thoughts on a statement that must be computed after it is uploaded
+        Parameters
+        ----------
+        utterance: Utterance
+            Statement just uploaded
+
+        Returns
+        -------
+        thoughts: dict
+            NegationConflict list, CardinalityConflict list and Gaps of subject and complement, by the name used in
+            LongTermMemory.THOUGHTS
+        """
+        triple = utterance.triple
+        one_to_one = str(triple.predicate_name) in self._ONE_TO_ONE_PREDICATES
+
+        query = fill_query('thoughts/after_upload',
+                           triple.predicate_name, triple.subject_name, triple.complement_name,
+                           triple.predicate_name, triple.subject_name, triple.complement_name, Literal(one_to_one),
+                           triple.subject.label, triple.complement.label, triple.subject.label, triple.complement.label,
+                           triple.complement.label, triple.subject.label, triple.complement.label, triple.subject.label)
+        rows = self._split_tagged_rows(self._submit_query(query))
+
+        return {'negation_conflicts': self._build_negation_conflicts(rows.get(('negation_conflicts', None, None), [])),
+                'complement_conflicts':
+                    self._build_cardinality_conflicts(rows.get(('complement_conflicts', None, None), [])),
+                'subject_gaps': self._build_gaps(rows.get(('gaps', 'subject', 'subject'), []),
+                                                 rows.get(('gaps', 'subject', 'complement'), [])),
+                'complement_gaps': self._build_gaps(rows.get(('gaps', 'complement', 'subject'), []),
+                                                    rows.get(('gaps', 'complement', 'complement'), []))}
@@ -1,13 +1,15 @@
-from pepper.brain.utils.helper_functions import read_query, sigmoid
-from pepper.brain.basic_brain import BasicBrain
+from pepper.brain.utils.helper_functions import read_query, fill_query, sigmoid, polarity_to_polarity_value
+from pepper.brain.basic_brain import BasicBrain, BrainContext
 
 from pepper import config
 
+from threading import Thread, Event, Lock
+
 
 class TrustCalculator(BasicBrain):
 
-    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False):
-        # type: (str, bool) -> TrustCalculator
+    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, context=None):
+        # type: (str, bool, BrainContext) -> TrustCalculator
         """
         Interact with Triple store
 
@@ -15,20 +17,44 @@ class TrustCalculator(BasicBrain):
         ----------
         address: str
             IP address and port of the Triple store
+        context: BrainContext
+            Connection and RDF builder shared with the brain using this reasoner
         """
 
-        super(TrustCalculator, self).__init__(address, clear_all, is_submodule=True)
+        super(TrustCalculator, self).__init__(address, clear_all, is_submodule=True, context=context)
+
+        # Per speaker aggregates (chats, novel claims, conflicts) and brain wide totals the trust is computed from.
+        # Updates made while a rebuild queries the brain are recorded, and applied again to the rebuilt aggregates
+        self._lock = Lock()
+        self._aggregates = {}
+        self._chat_ids = {}
+        self._num_claims = 0.0
+        self._num_conflicts = 0.0
+        self._rebuild_updates = None
+
+        # Trust values as last computed, and those still to be written to the brain. Writes happen outside the lock
+        # and one at a time, each writing the latest pending values
+        self._trust_network = {}
+        self._pending_trust = {}
+        self._pending_rebuild = False
+        self._write_lock = Lock()
+
+        self._stop_rebuilding = Event()
 
     def get_trust(self, speaker):
         """
         Get trust level (between 1 and 0) of a friend. Default is set to 0.5
         :return:
         """
-        query = read_query('trust/trust_by') % speaker
+        with self._lock:
+            if speaker in self._trust_network:
+                return self._trust_network[speaker]
+
+        query = fill_query('trust/trust_by', speaker)
         response = self._submit_query(query)
 
         if response and response[0] != {}:
-            trust = response[0]['trust']['value']
+            trust = float(response[0]['trust']['value'])
         else:
             trust = 0.5
 
@@ -46,19 +72,36 @@ class TrustCalculator(BasicBrain):
         trust_value: float
             Weighted average of features
         """
+        aggregates, _ = self._query_aggregates(speaker)
+        return self._trust_from_aggregates(aggregates, max_chats, mean_novelty, mean_conflicts)
+
+    def _query_aggregates(self, speaker):
+        """
+        Query the chats, number of novel claims and number of conflicts of a speaker
+        :param speaker: label of friend
+        :return: dictionary with the aggregates, and set of ids of the chats counted in them
+        """
+        chat_ids = set(self.get_chats_with(speaker))
 
+        return {'chats': float(len(chat_ids)),
+                'novel_claims': float(len(self.novel_statements_by(speaker))),
+                'conflicts': float(len(self.get_conflicts_by(speaker)))}, chat_ids
+
+    @staticmethod
+    def _trust_from_aggregates(aggregates, max_chats, mean_novelty, mean_conflicts):
+        """
+        Weighted average of chat, novelty and conflict features of a speaker
+        :return: trust value
+        """
         # chat based feature
-        num_chats = float(self.count_chat_with(speaker))
-        chat_feature = num_chats / max_chats
-        t = sigmoid(chat_feature, growth_rate=3)
+        chat_feature = aggregates['chats'] / max_chats
 
         # new content feature
-        novel_claims = float(len(self.novel_statements_by(speaker)))
-        claims_feature = sigmoid(mean_novelty - novel_claims, growth_rate=mean_novelty if mean_novelty > 1 else 1)
+        claims_feature = sigmoid(mean_novelty - aggregates['novel_claims'],
+                                 growth_rate=mean_novelty if mean_novelty > 1 else 1)
 
         # conflicts feature
-        my_conflicts = float(len(self.get_conflicts_by(speaker)))
-        conflicts_feature = sigmoid(mean_conflicts - my_conflicts,
+        conflicts_feature = sigmoid(mean_conflicts - aggregates['conflicts'],
                                     growth_rate=mean_conflicts if mean_conflicts > 1 else 1)
 
         # Aggregate
@@ -66,53 +109,215 @@ class TrustCalculator(BasicBrain):
 
         return trust_value
 
+    def _compute_trust_values(self):
+        """
+        Compute trust for all known friends from the aggregates in memory. Must be called holding the lock
+        :return: dictionary of friend to trust value
+        """
+        num_friends = float(len(self._aggregates))
+        max_chats = max([a['chats'] for a in self._aggregates.values()]) if self._aggregates else 0
+
+        if num_friends == 0 or max_chats == 0:
+            return {}
+
+        mean_novelty = self._num_claims / num_friends
+        mean_conflicts = self._num_conflicts / num_friends
+
+        return {friend: self._trust_from_aggregates(aggregates, max_chats, mean_novelty, mean_conflicts)
+                for friend, aggregates in self._aggregates.items()}
+
+    def _write_trust(self):
+        """
+        Write the pending trust values to the brain in one batched update, replacing all trust values if the network
+        was rebuilt. Called without holding the lock, so reading trust never waits for the brain
+        :return:
+        """
+        with self._write_lock:
+            with self._lock:
+                trust_values, rebuild = self._pending_trust, self._pending_rebuild
+                self._pending_trust, self._pending_rebuild = {}, False
+
+            if not trust_values and not rebuild:
+                return
+
+            actors = []
+            triples = []
+            for friend, trust_in_friend in trust_values.items():
+                # Form actor
+                actor = self._rdf_builder.fill_entity(friend, ['Instance', 'Source', 'Actor', 'person'], 'LF')
+                trust = self._rdf_builder.fill_literal(trust_in_friend, datatype=self.namespaces['XML']['float'])
+
+                actors.append(actor.id)
+                triples.append((actor.id, self.namespaces['N2MU']['hasTrustworthinessLevel'], trust))
+
+            if rebuild and not triples:
+                query = read_query('trust/delete_trust')
+            elif rebuild:
+                query = fill_query('trust/rebuild_trust', self.interaction_graph.identifier, triples)
+            else:
+                query = fill_query('trust/replace_trust', actors, self.interaction_graph.identifier, triples)
+
+            _ = self._submit_query(query, post=True, flush_buffer=False)
+
+    def _count_statement(self, speaker, chat_id, polarity, statement_novelty, negation_conflicts):
+        """
+        Add a statement to the aggregates in memory. Must be called holding the lock
+        :param speaker: label of the speaker of the statement
+        :param chat_id: id of the chat the statement was made in, as stored in the brain
+        :param polarity: polarity value of the statement
+        :param statement_novelty: provenance of the statement before it was added
+        :param negation_conflicts: polarities of the statement after it was added
+        :return:
+        """
+        opposite = {'POSITIVE': 'NEGATIVE', 'NEGATIVE': 'POSITIVE'}.get(polarity)
+        aggregates = self._aggregates.setdefault(speaker, {'chats': 0.0, 'novel_claims': 0.0, 'conflicts': 0.0})
+
+        # Chats
+        chat_ids = self._chat_ids.setdefault(speaker, set())
+        if chat_id not in chat_ids:
+            chat_ids.add(chat_id)
+            aggregates['chats'] += 1
+
+        # Novel claims: a new claim is novel for this speaker, a claim heard once before is not novel anymore
+        if not statement_novelty:
+            aggregates['novel_claims'] += 1
+            self._num_claims += 1
+        elif len(statement_novelty) == 1 and statement_novelty[0].author != speaker \
+                and statement_novelty[0].author in self._aggregates:
+            other = self._aggregates[statement_novelty[0].author]
+            other['novel_claims'] = max(other['novel_claims'] - 1, 0.0)
+
+        # Conflicts: every mention with the opposite polarity forms a new conflict with this speaker
+        for conflict in negation_conflicts:
+            if opposite is not None and conflict.polarity_value == opposite:
+                aggregates['conflicts'] += 1
+                self._num_conflicts += 1
+
+                if conflict.author != speaker and conflict.author in self._aggregates:
+                    self._aggregates[conflict.author]['conflicts'] += 1
+
+    def update_trust_network(self, utterance, statement_novelty, negation_conflicts):
+        """
+        Incrementally update the trust network with a statement that was just added to the brain. Only the trust
+        values that changed are written, in one batched update. Aggregates may drift from the brain over time,
+        which is corrected by the periodic rebuild (see start_rebuilding)
+        Parameters
+        ----------
+        utterance: Utterance
+            Statement just added to the brain
+        statement_novelty: List[StatementNovelty]
+            Provenance of the statement before it was added
+        negation_conflicts: List[NegationConflict]
+            Polarities of the statement after it was added
+
+        Returns
+        -------
+
+        """
+        statement = (utterance.chat_speaker, str(utterance.chat.id),
+                     polarity_to_polarity_value(utterance.perspective.polarity), statement_novelty, negation_conflicts)
+
+        with self._lock:
+            self._count_statement(*statement)
+
+            # Apply it again once a running rebuild replaces the aggregates
+            if self._rebuild_updates is not None:
+                self._rebuild_updates.append(statement)
+
+            # Write only what changed
+            trust_values = self._compute_trust_values()
+            changed = {friend: trust for friend, trust in trust_values.items()
+                       if abs(self._trust_network.get(friend, -1.0) - trust) > 1e-3}
+            self._trust_network.update(changed)
+            self._pending_trust.update(changed)
+
+        self._write_trust()
+
     def delete_trust_network(self):
         """
         Delete the trust values for all known friends
         :return:
         """
         query = read_query('trust/delete_trust')
-        _ = self._connection.query(query, post=True)
+        _ = self._submit_query(query, post=True, flush_buffer=False)
 
     def compute_trust_network(self):
         """
-        Compute the trust values for all known friends
+        Compute the trust values for all known friends from scratch, and replace all trust values in the brain with
+        them in one batched update. The brain is queried without holding the lock, updates made meanwhile are applied
+        again to the rebuilt aggregates (a statement already counted by the queries is then counted twice, until the
+        next rebuild)
         Returns
         -------
 
         """
-        self.delete_trust_network()
+        with self._lock:
+            self._rebuild_updates = []
 
-        # General grain parameters
-        friends = self.get_my_friends()
-        num_friends = float(len(friends))
+        try:
+            # General grain parameters
+            friends = self.get_my_friends()
+            aggregates, chat_ids = {}, {}
+            for friend in friends:
+                aggregates[friend], chat_ids[friend] = self._query_aggregates(friend)
+            num_claims = float(self.count_statements()) if friends else 0.0
+            num_conflicts = float(sum(1 for _ in self.iter_conflicts())) if friends else 0.0
+        except Exception:
+            with self._lock:
+                self._rebuild_updates = None
+            raise
 
-        if num_friends > 0:
+        with self._lock:
+            self._aggregates = aggregates
+            self._chat_ids = chat_ids
+            self._num_claims = num_claims
+            self._num_conflicts = num_conflicts
 
-            best_friends = self.get_best_friends()
-            max_chats = float(best_friends[0][1]) if best_friends else 0
+            for statement in self._rebuild_updates:
+                self._count_statement(*statement)
+            self._rebuild_updates = None
 
-            if max_chats > 0:
+            self._trust_network = self._compute_trust_values()
+            self._pending_trust = dict(self._trust_network)
+            self._pending_rebuild = True
 
-                num_claims = float(self.count_statements())
-                mean_novelty = num_claims / num_friends if num_friends > 0 else num_claims
+        self._write_trust()
 
-                num_conflicts = float(len(self.get_conflicts()))
-                mean_conflicts = num_conflicts / num_friends if num_friends > 0 else num_conflicts
+        self._log.info("Computed trust for all known agents")
 
-                for friend in friends:
-                    # Form actor
-                    actor = self._rdf_builder.fill_entity(friend, ['Instance', 'Source', 'Actor', 'person'], 'LF')
+    def start_rebuilding(self, interval=None):
+        """
+        Compute the trust network from scratch on a background thread, and repeat every interval seconds
+        Parameters
+        ----------
+        interval: Optional[float]
+            Seconds between full rebuilds. If None, the network is only built once
 
-                    # Compute trust
-                    trust_in_friend = self.compute_trust(friend, max_chats, mean_novelty, mean_conflicts)
-                    trust = self._rdf_builder.fill_literal(trust_in_friend, datatype=self.namespaces['XML']['float'])
+        Returns
+        -------
 
-                    # Structure knowledge
-                    self.interaction_graph.add((actor.id, self.namespaces['N2MU']['hasTrustworthinessLevel'], trust))
+        """
+        def rebuild():
+            while not self._stop_rebuilding.is_set():
+                try:
+                    self.compute_trust_network()
+                except Exception as e:
+                    self._log.error("Could not compute trust network: {}".format(e))
 
-                    # Finish process of uploading new knowledge to the triple store
-                    data = self._serialize(self._brain_log)
-                    code = self._upload_to_brain(data)
+                if interval is None:
+                    break
 
-        self._log.info("Computed trust for all known agents")
+                self._stop_rebuilding.wait(interval)
+
+        self._stop_rebuilding.clear()
+
+        thread = Thread(target=rebuild, name="TrustRebuildThread")
+        thread.daemon = True
+        thread.start()
+
+    def stop_rebuilding(self):
+        """
+        Stop the periodic rebuild of the trust network
+        :return:
+        """
+        self._stop_rebuilding.set()
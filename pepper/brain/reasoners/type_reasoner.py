@@ -1,5 +1,5 @@
-from pepper.brain.utils.helper_functions import read_query, casefold_text
-from pepper.brain.basic_brain import BasicBrain
+from pepper.brain.utils.helper_functions import fill_query, casefold_text
+from pepper.brain.basic_brain import BasicBrain, BrainContext
 
 from pepper import config
 
@@ -9,8 +9,8 @@ import requests
 
 class TypeReasoner(BasicBrain):
 
-    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False):
-        # type: () -> TypeReasoner
+    def __init__(self, address=config.BRAIN_URL_LOCAL, clear_all=False, context=None):
+        # type: (str, bool, BrainContext) -> TypeReasoner
         """
         Interact with Triple store
 
@@ -18,9 +18,11 @@ class TypeReasoner(BasicBrain):
         ----------
         address: str
             IP address and port of the Triple store
+        context: BrainContext
+            Connection and RDF builder shared with the brain using this reasoner
         """
 
-        super(TypeReasoner, self).__init__(address, clear_all, is_submodule=True)
+        super(TypeReasoner, self).__init__(address, clear_all, is_submodule=True, context=context)
 
     def reason_entity_type(self, item, exact_only=True):
         """
@@ -46,13 +48,13 @@ class TypeReasoner(BasicBrain):
                 item = item.replace(a, '')
 
         # Item is in the ontology already as a class
-        if item_label in self.get_classes():
+        if item_label in self._cached_classes():
             learned_type = item
             text = 'I know about %s. I will remember this object' % item
 
         # Item is in the ontology already as a label, return the type
-        mapping = self.get_labels_and_classes()
-        if item_label in mapping.keys():
+        mapping = self._cached_labels_and_classes()
+        if item_label in mapping:
             learned_type = mapping[item]
             text = ' I know about %s. It is of type %s. I will remember this object' % (item, learned_type)
 
@@ -93,7 +95,7 @@ class TypeReasoner(BasicBrain):
 
         for comb in combinations:
             # Try exact matching query
-            query = read_query('typing/dbpedia_type_and_description') % comb
+            query = fill_query('typing/dbpedia_type_and_description', comb)
             response = self._submit_query(query)
 
             # break if we have a hit
@@ -146,7 +148,7 @@ class TypeReasoner(BasicBrain):
 
         for comb in combinations:
             # Try exact matching query
-            query = read_query('typing/wikidata_type_and_description') % comb
+            query = fill_query('typing/wikidata_type_and_description', comb)
             try:
                 r = requests.get(url, params={'format': 'json', 'query': query}, timeout=3)
                 data = r.json() if r.status_code != 500 else None
@@ -1,43 +1,63 @@
-import os
 import re
 import numpy as np
 from datetime import date
 import string
 
 from pepper.brain.utils.constants import CAPITALIZED_TYPES
+from pepper.brain.utils.query_registry import QUERIES
 from pepper.language.utils.atoms import Emotion
 
 
 def read_query(query_filename):
     """
-    Read a query from file and return as a string
+    Read a query from the query registry and return as a string
     Parameters
     ----------
     query_filename: str name of the query. It will be looked for in the queries folder of this project
 
     Returns
     -------
-    query: str the query with placeholders for the query parameters, as a string to be formatted
+    query: str the query, with prefixes and with placeholders for the query parameters
 
     """
-    with open(os.path.join(os.path.dirname(__file__), "../queries/{}.rq".format(query_filename))) as fr:
-        query = fr.read()
-    return query
+    return QUERIES[query_filename].text
+
+
+def fill_query(query_filename, *params):
+    """
+    Fill the parameters of a query from the query registry, escaping them according to where they are placed
+    Parameters
+    ----------
+    query_filename: str name of the query. It will be looked for in the queries folder of this project
+    params: values for the placeholders of the query, in order
+
+    Returns
+    -------
+    query: str the query ready to be submitted
+
+    """
+    return QUERIES[query_filename].fill(*params)
 
 
 def is_proper_noun(types):
     return any(i in types for i in CAPITALIZED_TYPES)
 
 
+# Punctuation and spaces become dashes in triples, translated in one pass (tables for str and for unicode)
+_TRIPLE_SIGNS = string.punctuation + " "
+_TRIPLE_TABLE = string.maketrans(_TRIPLE_SIGNS, "-" * len(_TRIPLE_SIGNS))
+_TRIPLE_TABLE_UNICODE = {ord(sign): u"-" for sign in _TRIPLE_SIGNS}
+_DASHES = re.compile('-+')
+
+
 def casefold_text(text, format='triple'):
     if format == 'triple':
-        if isinstance(text, basestring):
-            for sign in string.punctuation:
-                text = text.replace(sign, "-")
-
-            text = text.lower().replace(" ", "-").strip('-')
+        if isinstance(text, unicode):
+            text = text.translate(_TRIPLE_TABLE_UNICODE).lower().strip('-')
+        elif isinstance(text, str):
+            text = text.translate(_TRIPLE_TABLE).lower().strip('-')
 
-        return re.sub('-+', '-', text)
+        return _DASHES.sub('-', text)
 
     elif format == 'natural':
         return text.lower().replace("-", " ").strip() if isinstance(text, basestring) else text
@@ -0,0 +1,237 @@
+from rdflib.term import Node
+
+from threading import Lock
+import os
+import re
+
+
+class QueryTemplate(object):
+
+    # Where a placeholder sits decides how its value is escaped
+    LITERAL = 'literal'  # inside a quoted string: '%s' or "%s"
+    IRI = 'iri'  # inside an IRI: <%s>
+    LOCAL_NAME = 'local_name'  # local part of a prefixed name: n2mu:%s
+    TERM = 'term'  # anywhere else: only RDF terms (or lists of them) are accepted
+
+    _PLACEHOLDER = re.compile(r'%s')
+    _PREFIX_DECLARATION = re.compile(r'prefix\s+([\w\-]*)\s*:', re.IGNORECASE)
+    _PREFIXED_NAME_END = re.compile(r'(?:^|[\s({,;])(?:[A-Za-z][\w\-.]*)?:$')
+    _IRI_UNSAFE = re.compile(r'[<>"{}|^`\\\s]')
+    _LOCAL_NAME_ESCAPABLE = "~.-!$&'()*+,;=/?#@%_"
+
+    # Comment naming the query, so the connector can report statistics per query
+    NAME_COMMENT = '#query: {}\n'
+
+    def __init__(self, name, text, prefixes='', named=True):
+        # type: (str, str, str, bool) -> None
+        """
+        SPARQL query with positional placeholders, validated and escaped according to where each placeholder sits
+
+        Parameters
+        ----------
+        name: str
+            Name of the query (path relative to the queries folder, without extension)
+        text: str
+            Query text, with %s placeholders
+        prefixes: str
+            Prefix declarations to prepend. Prefixes the query already declares are left out
+        named: bool
+            Whether to start the query with a comment naming it (not for fragments prepended to other queries)
+        """
+        self._name = name
+        self._validate(name, text)
+
+        declared = set(self._PREFIX_DECLARATION.findall(text))
+        prologue = [line for line in prefixes.splitlines()
+                    if line.strip() and self._PREFIX_DECLARATION.match(line.strip()).group(1) not in declared]
+
+        self._text = '\n'.join(prologue) + '\n' + text if prologue else text
+        self._text = self.NAME_COMMENT.format(name) + self._text if named else self._text
+        self._parts = self._PLACEHOLDER.split(self._text)
+        self._kinds = [self._placeholder_kind(part) for part in self._parts[:-1]]
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self._name
+
+    @property
+    def text(self):
+        # type: () -> str
+        return self._text
+
+    @property
+    def kinds(self):
+        # type: () -> list
+        return self._kinds
+
+    @staticmethod
+    def _validate(name, text):
+        """
+        Check the query only uses %s placeholders and has balanced brackets
+        :param name: name of the query
+        :param text: query text
+        :return:
+        """
+        if re.search(r'%(?!s)', text):
+            raise ValueError("Query {} contains a '%' that is not a %s placeholder".format(name))
+
+        for opening, closing in ['{}', '()']:
+            if text.count(opening) != text.count(closing):
+                raise ValueError("Query {} has unbalanced '{}{}'".format(name, opening, closing))
+
+    def _placeholder_kind(self, preceding):
+        """
+        Determine the kind of placeholder from the query text right before it
+        :param preceding: query text before the placeholder
+        :return: kind of placeholder
+        """
+        if preceding.endswith(("'", '"')):
+            return self.LITERAL
+        elif preceding.endswith('<'):
+            return self.IRI
+        elif self._PREFIXED_NAME_END.search(preceding):
+            return self.LOCAL_NAME
+        else:
+            return self.TERM
+
+    def fill(self, *params):
+        """
+        Fill the placeholders of the query, escaping every value according to its position
+        Parameters
+        ----------
+        params:
+            One value per placeholder, in order
+
+        Returns
+        -------
+        query: str
+            Query ready to be submitted
+        """
+        if len(params) != len(self._kinds):
+            raise ValueError("Query {} takes {} parameters, {} given".format(self._name, len(self._kinds),
+                                                                              len(params)))
+
+        query = [self._parts[0]]
+        for kind, value, part in zip(self._kinds, params, self._parts[1:]):
+            query.append(self.escape(value, kind))
+            query.append(part)
+
+        return ''.join(query)
+
+    @classmethod
+    def escape(cls, value, kind):
+        """
+        Escape a value to be placed in a query
+        :param value: value to escape
+        :param kind: kind of placeholder the value goes in
+        :return: escaped value
+        """
+        if kind == cls.TERM:
+            return cls._escape_term(value)
+
+        value = value if isinstance(value, basestring) else str(value)
+
+        if kind == cls.LITERAL:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace("'", "\\'") \
+                .replace('\n', '\\n').replace('\r', '\\r')
+        elif kind == cls.IRI:
+            return cls._IRI_UNSAFE.sub(lambda m: '%{:02X}'.format(ord(m.group())), value)
+        else:
+            return cls._escape_local_name(value)
+
+    @classmethod
+    def _escape_local_name(cls, value):
+        escaped = []
+        for i, char in enumerate(value):
+            if char.isalnum() or char in '_:' or (char == '-' and i > 0) or (char == '.' and 0 < i < len(value) - 1):
+                escaped.append(char)
+            elif char in cls._LOCAL_NAME_ESCAPABLE:
+                escaped.append('\\' + char)
+            else:
+                escaped.append(''.join('%{:02X}'.format(b) for b in bytearray(char.encode('utf-8'))))
+
+        return ''.join(escaped)
+
+    @classmethod
+    def _escape_term(cls, value):
+        # RDF terms are written in N3, a tuple of terms as a triple pattern and a list as one item per line
+        if isinstance(value, Node):
+            return value.n3()
+        elif isinstance(value, tuple) and all(isinstance(v, Node) for v in value):
+            return ' '.join(v.n3() for v in value) + ' .'
+        elif isinstance(value, list):
+            return '\n'.join(cls._escape_term(v) for v in value)
+        else:
+            raise TypeError("Only RDF terms can be placed outside of quotes, IRIs or prefixed names, "
+                            "got {}".format(type(value)))
+
+    def __repr__(self):
+        return 'QueryTemplate({}, {} parameters)'.format(self._name, len(self._kinds))
+
+
+class QueryRegistry(object):
+
+    PREFIXES = 'prefixes'
+
+    def __init__(self, root):
+        # type: (str) -> None
+        """
+        Loads and validates every query under a folder once, and hands out their templates
+
+        Parameters
+        ----------
+        root: str
+            Folder with .rq files (possibly in subfolders)
+        """
+        self._root = root
+        self._templates = None
+        self._lock = Lock()
+
+    def _load(self):
+        templates = {}
+
+        with open(os.path.join(self._root, self.PREFIXES + '.rq')) as f:
+            prefixes = f.read()
+
+        for directory, _, files in os.walk(self._root):
+            for filename in files:
+                if filename.endswith('.rq'):
+                    path = os.path.join(directory, filename)
+                    name = os.path.relpath(path, self._root)[:-len('.rq')].replace(os.sep, '/')
+
+                    with open(path) as f:
+                        text = f.read()
+
+                    if name == self.PREFIXES:
+                        templates[name] = QueryTemplate(name, text, named=False)
+                    else:
+                        templates[name] = QueryTemplate(name, text, prefixes)
+
+        return templates
+
+    @property
+    def templates(self):
+        """
+        All query templates by name, loaded on first access
+        :return: dictionary of name to QueryTemplate
+        """
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self._load()
+
+        return self._templates
+
+    def __getitem__(self, name):
+        # type: (str) -> QueryTemplate
+        try:
+            return self.templates[name]
+        except KeyError:
+            raise KeyError("Unknown query: {}".format(name))
+
+    def __contains__(self, name):
+        return name in self.templates
+
+
+QUERIES = QueryRegistry(os.path.join(os.path.dirname(__file__), '../queries'))
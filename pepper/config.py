@@ -60,7 +60,7 @@ INTERNAL_LANGUAGE = 'en-GB'  # Must start with 'en-' (Must by a dialect of Engli
 #       ...
 #       config.py            << this file >>
 #       log.txt              LOG
-#       brain_log.trig       BRAIN_LOG_ROOT
+#       brain_log_*.nq.gz    BRAIN_LOG_ROOT
 #       ...
 #   README.md               ReadMe File
 #   google_cloud_key.json   Google Cloud Key
@@ -111,8 +111,10 @@ if not os.path.exists(KEY_WOLFRAM):
 # General Logging
 LOG = pepper.LOGGING_FILE
 
-# Brain Logging
+# Brain Logging: journal of everything uploaded to the brain, in compressed segments rotated on size (bytes) and age
 BRAIN_LOG_ROOT = os.path.join(PACKAGE_ROOT, "../backups/brain/brain_log_{}")
+BRAIN_LOG_SEGMENT_SIZE = 64 * 1024 * 1024
+BRAIN_LOG_SEGMENT_AGE = 24 * 3600
 
 # <<< Application URLs >>>
 
@@ -120,6 +122,46 @@ BRAIN_LOG_ROOT = os.path.join(PACKAGE_ROOT, "../backups/brain/brain_log_{}")
 BRAIN_URL_LOCAL = "http://localhost:7200/repositories/leolani"
 BRAIN_URL_REMOTE = "http://145.100.58.167:50053/sparql"
 
+# In-process brain, for offline runs, tests and benchmarks (append a folder to persist it, e.g. "local:///tmp/brain")
+BRAIN_URL_EMBEDDED = "local://"
+
+# Brain connection settings: number of pooled keep-alive connections, (connect, read) timeout in seconds
+# and number of retries on connection errors
+BRAIN_POOL_SIZE = 10
+BRAIN_TIMEOUT = (3.05, 30)
+BRAIN_RETRIES = 3
+
+# Number of brain queries run concurrently when generating thoughts (keep below BRAIN_POOL_SIZE)
+BRAIN_THOUGHT_WORKERS = 6
+
+# Compute thoughts with one consolidated query before and one after uploading a statement (False: one query per
+# thought, easier to debug)
+BRAIN_CONSOLIDATED_THOUGHTS = True
+
+# Seconds between full rebuilds of the trust network (None: only build it once, at boot)
+BRAIN_TRUST_REBUILD_INTERVAL = 3600
+
+# Seconds ontology lookups (classes, predicates, labels) are cached before being queried again (None: no expiry)
+BRAIN_ONTOLOGY_CACHE_TTL = 600
+
+# Brain queries taking at least this many seconds are kept (up to BRAIN_SLOW_QUERY_LOG_SIZE of them) in the slow
+# query log of the connection, see StoreConnector.slow_queries (None: do not log slow queries)
+BRAIN_SLOW_QUERY_THRESHOLD = 1.0
+BRAIN_SLOW_QUERY_LOG_SIZE = 100
+
+# Rows read per request by brain queries scanning the whole brain (None: read all rows with a single request)
+BRAIN_QUERY_PAGE_SIZE = 10000
+
+# Number of URIs and of literals the RdfBuilder keeps, instead of building them again for every statement
+BRAIN_RDF_CACHE_SIZE = 10000
+
+# Experiences are buffered and uploaded together once this many triples are pending, or after this many seconds
+BRAIN_BUFFER_SIZE = 5000
+BRAIN_BUFFER_DELAY = 5.0
+
+# Serialization format of data uploaded to (and logged by) the brain: 'nquads', or 'trig'
+BRAIN_WIRE_FORMAT = 'nquads'
+
 # NAOqi Robot URL
 NAOQI_IP = "192.168.1.176"  # Default WiFi
 NAOQI_PORT = 9559
@@ -128,6 +170,9 @@ NAOQI_URL = "tcp://{}:{}".format(NAOQI_IP, NAOQI_PORT)
 
 # <<< Application Sensor Parameters >>>
 FACE_RECOGNITION_THRESHOLD = 0.3
+FACE_RECOGNITION_CONCURRENCY = 2  # Number of camera frames sent to OpenFace at the same time
+FACE_RECOGNITION_TIMEOUT = 10.0  # Seconds to wait for the faces in a camera frame, before giving up on it
+FACE_RECOGNITION_MAX_UNANSWERED = 8  # Camera frames OpenFace has not answered yet (given up on or not), before failing
 OBJECT_RECOGNITION_THRESHOLD = 0.25
 VOICE_ACTIVITY_DETECTION_THRESHOLD = 0.6
 
@@ -149,6 +194,17 @@ MICROPHONE_CHANNELS = 1
 CAMERA_RESOLUTION = pepper.CameraResolution.QVGA
 CAMERA_FRAME_RATE = 3
 
+# Number of threads processing sensor input and running components (None: one per CPU core, at least two)
+PIPELINE_WORKERS = None
+
+# Number of those threads kept for audio and speech: vision and background stages (which may block, e.g. waiting for
+# OpenFace or object detection) never occupy them
+PIPELINE_RESERVED_WORKERS = 1
+
+# Number of most recent timing spans (e.g. per camera frame: queueing, callbacks, detectors) kept for tracing,
+# see pepper.framework.util.Tracer (0: tracing off)
+TRACE_SIZE = 10000
+
 # NAOqi Text to Speech Speed
 NAOQI_SPEECH_SPEED = 90
 
@@ -1,4 +1,4 @@
-from pepper.framework.util import Mailbox, Scheduler, Bounds, spherical2cartesian
+from pepper.framework.util import Pipeline, Stage, Tracer, Bounds, spherical2cartesian
 from pepper import CameraResolution
 from pepper import logger
 
@@ -11,7 +11,7 @@ from time import time, strftime, localtime
 import json
 import os
 
-from typing import Tuple, List, Optional, Callable
+from typing import Tuple, List, Dict, Optional, Callable
 
 
 class AbstractImage(object):
@@ -242,14 +242,18 @@ class AbstractCamera(object):
         self._true_rate = rate
         self._t0 = time()
 
-        # Create Mailbox and Image Processor:
-        #   Each time an image is captured it is put in the mailbox, overriding whatever there might currently be.
-        #   In a separate thread, the _processor worker takes an image and calls all registered callbacks.
+        # Register Image Processor Stage in the Pipeline:
+        #   Each time an image is captured it is put in the stage, overriding whatever there might currently be.
+        #   A pipeline worker takes the image, hands it to every registered callback and passes it on to connected
+        #   stages. Every callback has a stage of its own (see CameraSubscriber), so callbacks run in parallel,
+        #   each on the latest image it can keep up with, and a slow callback does not hold back the others.
         #   This way the processing of images does not block the acquisition of new images,
         #   while at the same new images don't build up a queue, but are discarded when the _processor is too busy.
-        self._mailbox = Mailbox()
-        self._processor_scheduler = Scheduler(self._processor, name="CameraThread")
-        self._processor_scheduler.start()
+        #   The time each image spends in the stages is traced, keyed by the image hash
+        self._subscribers = {}  # type: Dict[Callable[[AbstractImage], None], CameraSubscriber]
+        self._stage = Pipeline.default().add_stage("Camera", self._processor, Pipeline.VISION,
+                                                   trace=lambda image: image.hash)
+        self._tracer = Tracer.default()
 
         # Default behaviour is to not run by default. Calling AbstractApplication.run() will activate the camera
         self._running = False
@@ -335,6 +339,47 @@ class AbstractCamera(object):
         """
         return self._true_rate
 
+    @property
+    def dropped_frames(self):
+        # type: () -> int
+        """
+        Number of Frames Dropped
+
+        Frames are dropped when a newer frame arrives before the callbacks are done with the previous one
+
+        Returns
+        -------
+        dropped_frames: int
+            Number of Frames Dropped
+        """
+        return self._stage.dropped
+
+    @property
+    def subscribers(self):
+        # type: () -> List[CameraSubscriber]
+        """
+        Callbacks with their own Stage, with the rate at which they process images and the images they dropped
+
+        Returns
+        -------
+        subscribers: List[CameraSubscriber]
+        """
+        return list(self._subscribers.values())
+
+    @property
+    def stage(self):
+        # type: () -> Stage
+        """
+        Image Processor Stage
+
+        Connect stages to it (see :meth:`~pepper.framework.util.Pipeline.connect`) to process every image it processes
+
+        Returns
+        -------
+        stage: Stage
+        """
+        return self._stage
+
     @property
     def shape(self):
         # type: () -> np.ndarray
@@ -396,7 +441,8 @@ class AbstractCamera(object):
         ----------
         image: AbstractImage
         """
-        self._mailbox.put(image)
+        self._tracer.add(image.hash, "Camera/acquisition", image.time)
+        self._stage.put(image)
 
     def start(self):
         """Start Streaming Images from Camera"""
@@ -406,26 +452,185 @@ class AbstractCamera(object):
         """Stop Streaming Images from Camera"""
         self._running = False
 
-    def _processor(self):
+    def _processor(self, image):
+        # type: (AbstractImage) -> Optional[AbstractImage]
         """
         Image Processor
 
-        Calls each callback for each image, threaded, for higher image throughput and less image latency
-        """
+        Hands each image to the stage of each callback, for higher image throughput and less image latency
 
-        # Get latest image from Mailbox
-        image = self._mailbox.get()
+        Parameters
+        ----------
+        image: AbstractImage
 
-        # Call Every Registered Callback
+        Returns
+        -------
+        image: AbstractImage or None
+            Image to pass on to connected stages, None when the camera is not running
+        """
+
+        # Hand Image to Every Registered Callback
         if self._running:
-            for callback in self.callbacks:
-                callback(image)
+            for subscriber in self._update_subscribers():
+                subscriber.put(image)
 
         # Update Statistics
         self._update_dt()
 
+        if self._running:
+            return image
+
+    def _update_subscribers(self):
+        # type: () -> List[CameraSubscriber]
+        """
+        Create Subscribers for new Callbacks, and close those of removed Callbacks
+
+        Callbacks are added to & removed from the callbacks list directly, so this is done for every image
+
+        Returns
+        -------
+        subscribers: List[CameraSubscriber]
+            Subscriber per Callback, in order of the Callbacks
+        """
+        callbacks = list(self.callbacks)
+
+        for callback in callbacks:
+            if callback not in self._subscribers:
+                self._subscribers[callback] = CameraSubscriber(callback)
+
+        for callback in list(self._subscribers.keys()):
+            if callback not in callbacks:
+                self._subscribers.pop(callback).close()
+
+        return [self._subscribers[callback] for callback in callbacks]
+
     def _update_dt(self):
         t1 = time()
         self._dt_buffer.append((t1 - self._t0))
         self._t0 = t1
         self._true_rate = 1 / np.mean(self._dt_buffer)
+
+
+class CameraSubscriber(object):
+    """
+    Camera Callback with a Stage of its own
+
+    The Stage holds the latest image only, so the callback is called as often as it can keep up with the camera.
+    Images arriving while it is busy replace the waiting image, and are counted as dropped.
+    Exceptions in the callback are logged, and do not affect other callbacks.
+
+    Parameters
+    ----------
+    callback: Callable[[AbstractImage], None]
+    """
+
+    def __init__(self, callback):
+        # type: (Callable[[AbstractImage], None]) -> None
+        self._callback = callback
+        self._name = self._callback_name(callback)
+
+        # Variables to do some performance statistics
+        self._dt_buffer = deque([], maxlen=10)
+        self._rate = 0.0
+        self._t0 = time()
+
+        self._stage = Pipeline.default().add_stage("Camera/{}".format(self._name), self._process, Pipeline.VISION,
+                                                   trace=lambda image: image.hash)
+
+    @property
+    def name(self):
+        # type: () -> str
+        """
+        Name of Callback (module.function)
+
+        Returns
+        -------
+        name: str
+        """
+        return self._name
+
+    @property
+    def callback(self):
+        # type: () -> Callable[[AbstractImage], None]
+        """
+        Callback
+
+        Returns
+        -------
+        callback: Callable[[AbstractImage], None]
+        """
+        return self._callback
+
+    @property
+    def rate(self):
+        # type: () -> float
+        """
+        Effective Image Rate of Callback (Frames per Second)
+
+        Returns
+        -------
+        rate: float
+        """
+        return self._rate
+
+    @property
+    def processed(self):
+        # type: () -> int
+        """
+        Number of Images processed by Callback
+
+        Returns
+        -------
+        processed: int
+        """
+        return self._stage.processed
+
+    @property
+    def dropped(self):
+        # type: () -> int
+        """
+        Number of Images dropped because the Callback was busy
+
+        Returns
+        -------
+        dropped: int
+        """
+        return self._stage.dropped
+
+    def put(self, image):
+        # type: (AbstractImage) -> None
+        """
+        Hand Image to Callback, replacing the image that might be waiting for it
+
+        Parameters
+        ----------
+        image: AbstractImage
+        """
+        self._stage.put(image)
+
+    def close(self):
+        """Remove Stage of Callback from Pipeline"""
+        Pipeline.default().remove(self._stage)
+
+    def _process(self, image):
+        # type: (AbstractImage) -> None
+        try:
+            self._callback(image)
+        finally:
+            self._update_dt()
+
+    def _update_dt(self):
+        t1 = time()
+        self._dt_buffer.append((t1 - self._t0))
+        self._t0 = t1
+        self._rate = 1 / np.mean(self._dt_buffer)
+
+    @staticmethod
+    def _callback_name(callback):
+        # Callbacks are mostly private functions of Components, named after their module to tell them apart
+        name = getattr(callback, '__name__', callback.__class__.__name__)
+        module = getattr(callback, '__module__', None)
+        return "{}.{}".format(module.split('.')[-1], name) if module else name
+
+    def __repr__(self):
+        return "{}[{}: {:.1f} Hz, {} dropped]".format(self.__class__.__name__, self.name, self.rate, self.dropped)
@@ -1,9 +1,8 @@
-from pepper.framework.util import Scheduler
+from pepper.framework.util import Pipeline
 from pepper import logger
 
 import numpy as np
 
-from Queue import Queue
 from time import time
 
 from collections import deque
@@ -25,6 +24,9 @@ class AbstractMicrophone(object):
         Functions to call each time some audio samples are captured
     """
 
+    # Number of audio chunks waiting to be processed, after which the oldest are dropped
+    QUEUE_SIZE = 1000
+
     def __init__(self, rate, channels, callbacks):
         # type: (int, int, List[Callable[[np.ndarray], None]]) -> None
 
@@ -37,13 +39,13 @@ class AbstractMicrophone(object):
         self._true_rate = rate
         self._t0 = time()
 
-        # Create Queue and Sound Processor:
-        #   Each time audio samples are captured it is put in the audio processing queue
-        #   In a separate thread, the _processor worker takes these samples and calls all registered callbacks.
+        # Register Sound Processor Stage in the Pipeline:
+        #   Each time audio samples are captured they are put in the stage queue
+        #   A pipeline worker takes these samples, in order, and calls all registered callbacks.
         #   This way, samples are not accidentally skipped (NAOqi has some very strict timings)
-        self._queue = Queue()
-        self._processor_scheduler = Scheduler(self._processor, 0, name="MicrophoneThread")
-        self._processor_scheduler.start()
+        #   Audio has the highest priority, so samples only pile up (and are dropped) when the system is overloaded
+        self._stage = Pipeline.default().add_stage("Microphone", self._processor, Pipeline.AUDIO,
+                                                   queue_size=AbstractMicrophone.QUEUE_SIZE)
 
         # Default behaviour is to not run by default. Calling AbstractApplication.run() will activate the microphone
         self._running = False
@@ -138,7 +140,7 @@ class AbstractMicrophone(object):
         ----------
         audio: np.ndarray
         """
-        self._queue.put(audio)
+        self._stage.put(audio)
 
     def start(self):
         """Start Microphone Stream"""
@@ -148,15 +150,17 @@ class AbstractMicrophone(object):
         """Stop Microphone Stream"""
         self._running = False
 
-    def _processor(self):
+    def _processor(self, audio):
+        # type: (np.ndarray) -> None
         """
         Audio Processor
 
         Calls each callback for each audio frame, threaded, for higher audio throughput
-        """
 
-        # Get Audio Samples from Buffer
-        audio = self._queue.get()
+        Parameters
+        ----------
+        audio: np.ndarray
+        """
 
         # Call each regisered Callback with Samples
         if self._running:
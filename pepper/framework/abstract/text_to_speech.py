@@ -20,14 +20,16 @@ class AbstractTextToSpeech(object):
         # type: (str) -> None
         self._language = language
 
+        self._log = logger.getChild(self.__class__.__name__)
+
         self._queue = Queue()
         self._talking_jobs = 0
 
-        self._scheduler = Scheduler(self._worker, name="TextToSpeechThread")
+        # Text is said in order, and never dropped. Saying it blocks while speech is produced, so it runs on its own
+        # thread, not on the Pipeline Workers
+        self._scheduler = Scheduler(self._worker, interval=0, name="TextToSpeechThread")
         self._scheduler.start()
 
-        self._log = logger.getChild(self.__class__.__name__)
-
     @property
     def language(self):
         # type: () -> str
@@ -91,5 +93,10 @@ class AbstractTextToSpeech(object):
         raise NotImplementedError()
 
     def _worker(self):
-        self.on_text_to_speech(*self._queue.get())
-        self._talking_jobs -= 1
+        speech = self._queue.get()
+        try:
+            self.on_text_to_speech(*speech)
+        except Exception as e:
+            self._log.exception("Could not say text: {}".format(e))
+        finally:
+            self._talking_jobs -= 1
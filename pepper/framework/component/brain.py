@@ -1,5 +1,5 @@
 from pepper.framework.abstract import AbstractComponent, AbstractBackend
-from pepper.brain import LongTermMemory
+from pepper.brain import LongTermMemory, AsyncBrain
 
 
 class BrainComponent(AbstractComponent):
@@ -16,14 +16,28 @@ class BrainComponent(AbstractComponent):
         # type: (AbstractBackend) -> None
         super(BrainComponent, self).__init__(backend)
         self._brain = LongTermMemory()
+        self._async_brain = AsyncBrain(self._brain)
 
     @property
     def brain(self):
         """
-        Brain associated with Application
+        Brain associated with Application. Calls made on it directly are not ordered with the calls made through
+        async_brain, use async_brain for calls that may run while the application is running
 
         Returns
         -------
         brain: LongTermMemory
         """
         return self._brain
+
+    @property
+    def async_brain(self):
+        """
+        Brain associated with Application, with calls running on a brain thread and returning futures, so callbacks
+        (e.g. on_image or on_transcript) are not stalled by the Triple store
+
+        Returns
+        -------
+        async_brain: AsyncBrain
+        """
+        return self._async_brain
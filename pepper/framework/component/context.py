@@ -2,6 +2,7 @@ from . import SpeechRecognitionComponent, ObjectDetectionComponent, FaceRecognit
 from ..context import Context
 from ..sensor import UtteranceHypothesis, Object, Face, FaceClassifier
 from ..abstract import AbstractComponent, AbstractImage, AbstractBackend
+from ..util import Tracer
 
 from pepper.language import Utterance
 from pepper import config, ObjectDetectionTarget
@@ -72,6 +73,8 @@ class ContextComponent(AbstractComponent):
         # Make sure to stay synchronized
         context_lock = Lock()
 
+        tracer = Tracer.default()
+
         # << Private (to this component) Functions declared within __init__ >>
         # These functions are declared within the __init__ as to not clutter the Application with declarations.
         # This is an artifact of having applications inherit from all Components:
@@ -216,6 +219,12 @@ class ContextComponent(AbstractComponent):
             image: AbstractImage
             """
 
+            # Trace how stale the people and face info are, compared to this image
+            if self._people_info:
+                tracer.add(image.hash, "Context/people_age", self._people_info[0].image.time, image.time)
+            if self._face_info:
+                tracer.add(image.hash, "Context/face_age", self._face_info[0].image.time, image.time)
+
             # Get People within Conversation Bounds
             closest_people = get_closest_people(self._people_info)
 
@@ -1,8 +1,10 @@
 from pepper.framework.abstract import AbstractComponent, AbstractImage
 from pepper.framework.sensor.face import OpenFace, FaceClassifier, Face
-from pepper.framework.util import Scheduler, Mailbox
+from pepper.framework.util import Pipeline, Tracer
 from pepper import config
 
+from threading import Lock
+
 from typing import List
 
 
@@ -36,29 +38,20 @@ class FaceRecognitionComponent(AbstractComponent):
         # Initialize Face Classifier
         self.face_classifier = FaceClassifier(people)
 
-        # Initialize Image Mailbox
-        mailbox = Mailbox()
+        tracer = Tracer.default()
+        lock = Lock()
 
-        def on_image(image):
+        def worker(image):
             # type: (AbstractImage) -> None
-            """
-            Private On Image Event. Called every time the camera yields a frame.
-
-            Parameters
-            ----------
-            image: AbstractImage
-            """
-            mailbox.put(image)
-
-        def worker():
-            # type: () -> None
             """Find and Classify Faces in Images"""
 
-            # Get latest Image from Mailbox
-            image = mailbox.get()
-
             # Get All Face Representations from OpenFace & Initialize Known/New Face Categories
-            on_face = [self.face_classifier.classify(r, b, image) for r, b in open_face.represent(image.image)]
+            with tracer.span(image.hash, "FaceDetection/openface"):
+                representations = open_face.represent(image.image)
+
+            with tracer.span(image.hash, "FaceDetection/classify"):
+                on_face = [self.face_classifier.classify(r, b, image) for r, b in representations]
+
             on_face_known = []
             on_face_new = []
 
@@ -70,26 +63,27 @@ class FaceRecognitionComponent(AbstractComponent):
                 elif face.confidence > config.FACE_RECOGNITION_THRESHOLD:
                     on_face_known.append(face)
 
-            # Call Appropriate Callbacks
-            if on_face:
-                for callback in self.on_face_callbacks:
-                    callback(on_face)
-                self.on_face(on_face)
-            if on_face_known:
-                for callback in self.on_face_known_callbacks:
-                    callback(on_face_known)
-                self.on_face_known(on_face_known)
-            if on_face_new:
-                for callback in self.on_face_new_callbacks:
-                    callback(on_face_new)
-                self.on_face_new(on_face_new)
-
-        # Initialize Worker
-        schedule = Scheduler(worker, name="FaceDetectionComponentThread")
-        schedule.start()
-
-        # Add on_image to Camera Callbacks
-        self.backend.camera.callbacks += [on_image]
+            # Call Appropriate Callbacks (one image at a time, as several images are processed at the same time)
+            with lock:
+                if on_face:
+                    for callback in self.on_face_callbacks:
+                        callback(on_face)
+                    self.on_face(on_face)
+                if on_face_known:
+                    for callback in self.on_face_known_callbacks:
+                        callback(on_face_known)
+                    self.on_face_known(on_face_known)
+                if on_face_new:
+                    for callback in self.on_face_new_callbacks:
+                        callback(on_face_new)
+                    self.on_face_new(on_face_new)
+
+        # Register Worker as Stage processing the latest Camera Images (older Images are dropped while it is busy)
+        # Several Images are in flight to OpenFace at the same time, over its shared connection
+        pipeline = Pipeline.default()
+        stage = pipeline.add_stage("FaceDetection", worker, Pipeline.VISION,
+                                   concurrency=config.FACE_RECOGNITION_CONCURRENCY, trace=lambda image: image.hash)
+        pipeline.connect(self.backend.camera.stage, stage)
 
     def on_face(self, faces):
         # type: (List[Face]) -> None
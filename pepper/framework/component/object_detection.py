@@ -1,11 +1,12 @@
 from pepper.framework.abstract import AbstractComponent, AbstractImage
 from pepper.framework.sensor.obj import ObjectDetectionClient
-from pepper.framework.util import Scheduler, Mailbox
+from pepper.framework.util import Pipeline
 from pepper import config
 
 from threading import Lock
+from functools import partial
 
-from typing import List, Dict
+from typing import List
 
 
 class ObjectDetectionComponent(AbstractComponent):
@@ -28,32 +29,16 @@ class ObjectDetectionComponent(AbstractComponent):
         # Allowing other Components to Subscribe to it
         self.on_object_callbacks = []
 
-        # Create Object Detection Client and a Mailbox per Target
+        # Create Object Detection Client per Target
         # Make sure the corresponding server @ pepper_tensorflow is actually running
         clients = [ObjectDetectionClient(target) for target in ObjectDetectionComponent.TARGETS]
-        mailboxes = {client: Mailbox() for client in clients}  # type: Dict[ObjectDetectionClient, Mailbox]
 
         lock = Lock()
 
-        def on_image(image):
-            # type: (AbstractImage) -> None
-            """
-            Raw On Image Event. Called every time the camera yields a frame.
-
-            Parameters
-            ----------
-            image: AbstractImage
-            """
-            for client in clients:
-                mailboxes[client].put(image)
-
-        def worker(client):
-            # type: (ObjectDetectionClient) -> None
+        def worker(client, image):
+            # type: (ObjectDetectionClient, AbstractImage) -> None
             """Object Detection Worker"""
 
-            # Get Image from Mailbox Corresponding with Client
-            image = mailboxes[client].get()
-
             # Classify Objects in this Image using Client
             objects = [obj for obj in client.classify(image) if obj.confidence > config.OBJECT_RECOGNITION_THRESHOLD]
 
@@ -68,13 +53,12 @@ class ObjectDetectionComponent(AbstractComponent):
                     # Call on_object Event Function
                     self.on_object(objects)
 
-        # Initialize & Start Object Workers
-        schedule = [Scheduler(worker, args=(client,), name="{}Thread".format(client.target.name)) for client in clients]
-        for s in schedule:
-            s.start()
-
-        # Add on_image to Camera Callbacks
-        self.backend.camera.callbacks += [on_image]
+        # Register an Object Worker Stage per Client, each processing the latest Camera Image
+        pipeline = Pipeline.default()
+        for client in clients:
+            stage = pipeline.add_stage(client.target.name, partial(worker, client), Pipeline.VISION,
+                                       trace=lambda image: image.hash)
+            pipeline.connect(self.backend.camera.stage, stage)
 
     def on_object(self, objects):
         # type: (List[Object]) -> None
@@ -1,8 +1,10 @@
 from pepper.framework import AbstractComponent
 from pepper.framework.sensor import VAD, StreamedGoogleASR, UtteranceHypothesis
+from pepper.framework.sensor.vad import Voice
 from pepper import config
 
 from threading import Thread
+from Queue import Queue, Full
 
 import numpy as np
 
@@ -19,6 +21,9 @@ class SpeechRecognitionComponent(AbstractComponent):
         Application Backend
     """
 
+    # Number of voices waiting to be transcribed, after which new voices are dropped
+    QUEUE_SIZE = 10
+
     def __init__(self, backend):
         super(SpeechRecognitionComponent, self).__init__(backend)
 
@@ -32,30 +37,48 @@ class SpeechRecognitionComponent(AbstractComponent):
         # Initialize Voice Activity Detection
         self._vad = VAD(self.backend.microphone)
 
+        # Voices registered by the Voice Activity Detection, waiting to be transcribed
+        voices = Queue(maxsize=SpeechRecognitionComponent.QUEUE_SIZE)
+
+        def on_voice(voice):
+            # type: (Voice) -> None
+            try:
+                voices.put_nowait(voice)
+            except Full:
+                self.log.warning("Dropped voice, {} waiting to be transcribed".format(voices.qsize()))
+
         def worker():
             # type: () -> None
             """Speech Transcription Worker"""
 
-            # Every time a voice has been registered by the Voice Activity Detection (long running generator)
-            for voice in self._vad:
+            while True:
+                voice = voices.get()
+
+                try:
+                    # Transcribe this Voice and obtain a number of UtteranceHypotheses
+                    # (streams the Voice while the Microphone is still adding frames to it)
+                    hypotheses = self.asr.transcribe(voice)
+
+                    if hypotheses:
 
-                # Transcribe this Voice and obtain a number of UtteranceHypotheses
-                hypotheses = self.asr.transcribe(voice)
+                        # Get Voice Audio Corresponding with Hypotheses
+                        audio = voice.audio
 
-                if hypotheses:
+                        # Call on_transcript Event Function
+                        self.on_transcript(hypotheses, audio)
 
-                    # Get Voice Audio Corresponding with Hypotheses
-                    audio = voice.audio
+                        # Call Callback Functions
+                        for callback in self.on_transcript_callbacks:
+                            callback(hypotheses, audio)
 
-                    # Call on_transcript Event Function
-                    self.on_transcript(hypotheses, audio)
+                except Exception as e:
+                    self.log.exception("Could not transcribe voice: {}".format(e))
 
-                    # Call Callback Functions
-                    for callback in self.on_transcript_callbacks:
-                        callback(hypotheses, audio)
+        # Transcription blocks for as long as a voice lasts, so it runs on its own thread, not on the Pipeline Workers
+        # (where it would hold up the Microphone Stage feeding the voice it waits for)
+        self._vad.callbacks += [on_voice]
 
-        # TODO: Make into Schedule to give breathing room to other Threads? (Python GIL)
-        thread = Thread(target=worker, name="StreamingSpeechRecognitionComponentWorker")
+        thread = Thread(target=worker, name="SpeechRecognitionThread")
         thread.daemon = True
         thread.start()
 
@@ -2,7 +2,7 @@ from __future__ import print_function
 from sys import stdout, stderr
 
 from pepper.framework.abstract import AbstractComponent
-from pepper.framework.util import Scheduler
+from pepper.framework.util import Pipeline
 from pepper.framework.component import SpeechRecognitionComponent
 from pepper import config
 
@@ -71,7 +71,6 @@ class StatisticsComponent(AbstractComponent):
                 self.LIVE_SPEECH),
                 end="", file=(stderr if error else stdout))
 
-        # Run 10 times a second
+        # Run 10 times a second, when there is nothing more important to do
         # TODO: Bit Much?
-        schedule = Scheduler(worker, 0.1)
-        schedule.start()
+        Pipeline.default().add_stage("Statistics", worker, Pipeline.BACKGROUND, interval=0.1)
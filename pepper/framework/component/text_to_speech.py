@@ -1,5 +1,5 @@
 from pepper.framework.abstract import AbstractComponent
-from pepper.framework.util import Scheduler
+from pepper.framework.util import Pipeline
 from threading import Lock
 
 from typing import Optional, Union
@@ -31,8 +31,7 @@ class TextToSpeechComponent(AbstractComponent):
                 if not self.backend.text_to_speech.talking and not self.backend.microphone.running:
                     self.backend.microphone.start()
 
-        schedule = Scheduler(worker, name="TextToSpeechComponentThread")
-        schedule.start()
+        Pipeline.default().add_stage("TextToSpeechComponent", worker, Pipeline.SPEECH, interval=0.1)
 
     def say(self, text, animation=None, block=False):
         # type: (Union[str, unicode], Optional[str], bool) -> None
@@ -7,12 +7,15 @@ from sklearn.neighbors import KNeighborsClassifier
 from sklearn.model_selection import cross_val_score
 import numpy as np
 
+from concurrent.futures import Future, TimeoutError
+from threading import Thread, Lock
 from time import sleep
 import subprocess
 import socket
+import struct
 import os
 
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 
 class Face(Object):
@@ -67,6 +70,12 @@ class OpenFace(object):
         3. run the server included within the container
 
     It will then connect a client to this server to request face representations via a socket connection.
+
+    The connection is kept open and shared by all threads. Several images can be in flight at the same time:
+    requests carry an id, and responses are matched to them by a reader thread (see util/_openface.py for the protocol)
+
+    Images OpenFace has not answered yet are capped (including those given up on, which OpenFace still processes), and
+    a send that does not complete within the timeout closes the connection
     """
 
     DOCKER_NAME = "openface"
@@ -84,6 +93,14 @@ class OpenFace(object):
 
         self._log = logger.getChild(self.__class__.__name__)
 
+        # Persistent Connection and Requests waiting for a Response: request id -> (connection, future, image shape)
+        self._lock = Lock()
+        self._send_lock = Lock()
+        self._connection = None
+        self._request_id = 0
+        self._pending = {}  # type: Dict[int, Tuple[socket.socket, Future, Tuple[int, ...]]]
+        self._unanswered = 0  # Requests sent on the connection without Response, including those given up on
+
         if not self._openface_running():
 
             self._log.debug("{} is not running -> booting it!".format(OpenFace.DOCKER_IMAGE))
@@ -104,7 +121,8 @@ class OpenFace(object):
 
         self._log.debug("Booted")
 
-    def represent(self, image):
+    def represent(self, image, timeout=config.FACE_RECOGNITION_TIMEOUT):
+        # type: (np.ndarray, Optional[float]) -> List[Tuple[np.ndarray, Bounds]]
         """
         Represent Face in Image as 128-dimensional vector
 
@@ -112,45 +130,211 @@ class OpenFace(object):
         ----------
         image: np.ndarray
             Image (possibly containing a human face)
+        timeout: float or None
+            Seconds to wait for OpenFace, after which the request fails (None: wait until it responds)
 
         Returns
         -------
         result: list of (np.ndarray, Bounds)
             List of (representation, bounds)
         """
+        future = self.represent_async(image)
 
         try:
-            # Connect to OpenFace Service
-            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client.connect((self.HOST, self.PORT))
+            return future.result(timeout)
+        except TimeoutError:
+            self._fail(future, RuntimeError("OpenFace did not respond within {} seconds".format(timeout)))
+            return future.result()
 
-            # Send Image
-            client.send(np.array(image.shape, np.int32))
-            client.sendall(image.tobytes())
+    def represent_async(self, image):
+        # type: (np.ndarray) -> Future
+        """
+        Send Image to OpenFace without waiting for its Faces, so other Images can be sent in the meantime
 
-            # Receive Number of Faces in Image
-            n_faces = np.frombuffer(client.recv(4), np.int32)[0]
+        Parameters
+        ----------
+        image: np.ndarray
+            Image (possibly containing a human face)
 
-            # Wrap information into Face instances
-            faces = []
-            for i in range(n_faces):
+        Returns
+        -------
+        future: Future
+            Future of the list of (representation, bounds), see :meth:`OpenFace.represent`
+        """
+        image = np.ascontiguousarray(image, np.uint8)
+        future = Future()
+        connection = None
 
-                # Face Bounds
-                bounds = Bounds(*np.frombuffer(client.recv(4*4), np.float32))
-                bounds = bounds.scaled(1.0 / image.shape[1], 1.0 / image.shape[0])
+        try:
+            with self._lock:
+                connection = self._connect()
+
+                if self._unanswered >= config.FACE_RECOGNITION_MAX_UNANSWERED:
+                    future.set_exception(RuntimeError("OpenFace has {} images to answer yet".format(self._unanswered)))
+                    return future
+
+                self._request_id = (self._request_id + 1) % 2 ** 31
+                request_id = self._request_id
+                self._pending[request_id] = (connection, future, image.shape)
+                self._unanswered += 1
+
+            # Send Header and Image (without copying it) together, as other threads share the connection. A send that
+            # times out (see _connect) raises, and closes the connection
+            with self._send_lock:
+                connection.sendall(memoryview(np.array((request_id,) + image.shape, np.int32)))
+                connection.sendall(memoryview(image))
+
+        except socket.error as e:
+            if connection is None:
+                future.set_exception(RuntimeError("Couldn't connect to OpenFace Docker service."))
+            else:
+                self._disconnect(connection, e)
+
+        return future
+
+    def _fail(self, future, exception):
+        # type: (Future, Exception) -> None
+        """
+        Fail a Request still waiting for a Response (a late Response to it is ignored)
 
-                # Face Representation
-                representation = np.frombuffer(client.recv(self.FEATURE_DIM * 4), np.float32)
+        Parameters
+        ----------
+        future: Future
+        exception: Exception
+        """
+        with self._lock:
+            failed = [request_id for request_id, (conn, f, shape) in self._pending.items() if f is future]
+            for request_id in failed:
+                del self._pending[request_id]
+
+        if failed:
+            future.set_exception(exception)
+
+    def _connect(self):
+        # type: () -> socket.socket
+        """
+        Connect to OpenFace Service, if not yet connected (call holding self._lock)
+
+        Returns
+        -------
+        connection: socket.socket
+        """
+        if self._connection is None:
+            connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            # Bound sends by the timeout, without bounding the reader waiting for Responses (as settimeout would)
+            seconds = int(config.FACE_RECOGNITION_TIMEOUT)
+            microseconds = int((config.FACE_RECOGNITION_TIMEOUT - seconds) * 1e6)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, struct.pack('ll', seconds, microseconds))
+
+            try:
+                connection.connect((self.HOST, self.PORT))
+            except socket.error:
+                connection.close()
+                raise
+
+            reader = Thread(target=self._reader, args=(connection,), name="OpenFaceReader")
+            reader.daemon = True
+            reader.start()
 
-                faces.append((representation, bounds))
+            self._connection = connection
+            self._unanswered = 0
 
-            return faces
+        return self._connection
 
+    def _disconnect(self, connection, reason):
+        # type: (socket.socket, object) -> None
+        """
+        Close Connection and fail the Requests still waiting for a Response on it
+
+        Parameters
+        ----------
+        connection: socket.socket
+        reason: object
+        """
+        with self._lock:
+            if self._connection is connection:
+                self._connection = None
+
+            failed = [request_id for request_id, (conn, future, shape) in self._pending.items() if conn is connection]
+            futures = [self._pending.pop(request_id)[1] for request_id in failed]
+
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
         except socket.error:
-            raise RuntimeError("Couldn't connect to OpenFace Docker service.")
+            pass
+        connection.close()
+
+        if futures:
+            self._log.warning("Lost connection to OpenFace ({}), {} images failed".format(reason, len(futures)))
+
+        for future in futures:
+            future.set_exception(RuntimeError("Couldn't connect to OpenFace Docker service."))
+
+    def _reader(self, connection):
+        # type: (socket.socket) -> None
+        """
+        Receive Responses from OpenFace and hand their Faces to the Futures of the corresponding Requests
+
+        Parameters
+        ----------
+        connection: socket.socket
+        """
+        header = np.empty(2, np.int32)
+        reason = "closed by server"
+
+        try:
+            while self._receive(connection, header):
+                request_id, n_faces = int(header[0]), int(header[1])
+
+                # Bounds (left, top, right, bottom) and Representation per Face
+                result = np.empty((n_faces, 4 + self.FEATURE_DIM), np.float32)
+                if not self._receive(connection, result):
+                    break
+
+                with self._lock:
+                    conn, future, shape = self._pending.pop(request_id, (None, None, None))
+
+                    if self._connection is connection:
+                        self._unanswered = max(self._unanswered - 1, 0)
+
+                if future is not None:
+                    future.set_result([(face[4:], Bounds(*face[:4]).scaled(1.0 / shape[1], 1.0 / shape[0]))
+                                       for face in result])
+        except socket.error as e:
+            reason = e
+        finally:
+            self._disconnect(connection, reason)
+
+    @staticmethod
+    def _receive(connection, buffer):
+        # type: (socket.socket, np.ndarray) -> bool
+        """
+        Fill (contiguous) Buffer from Connection, without copying
+
+        Returns
+        -------
+        received: bool
+            False if the connection was closed
+        """
+        view = memoryview(buffer.reshape(-1).view(np.uint8))
+        received = 0
+        while received < len(view):
+            n = connection.recv_into(view[received:], len(view) - received)
+            if not n:
+                return False
+            received += n
+        return True
 
     def stop(self):
         """Stop OpenFace Image"""
+        with self._lock:
+            connection = self._connection
+
+        if connection is not None:
+            self._disconnect(connection, "stopped")
+
         subprocess.call(['docker', 'stop', self.DOCKER_NAME])
 
     def _openface_running(self):
@@ -1,8 +1,17 @@
 # This Script gets Executed inside the 'bamos/openface' Docker Container #
 
+# Protocol (all numbers little endian, as sent by numpy on x86):
+#   Clients keep their connection open and may send several requests before reading the responses (pipelining)
+#   Request:  int32[4] (request id, height, width, channels), followed by height * width * channels uint8 pixels
+#   Response: int32[2] (request id, number of faces), followed by float32[number of faces, 4 + 128]
+#             (left, top, right, bottom, representation) per face
+
 import openface  # The Openface package is imported inside the Docker Container
 import numpy as np
 
+from threading import Thread, Lock
+from Queue import Queue, Empty
+import traceback
 import os
 import socket
 
@@ -11,45 +20,147 @@ MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
 DLIB_DIR = os.path.join(MODEL_DIR, 'dlib')
 OPENFACE_DIR = os.path.join(MODEL_DIR, 'openface')
 DIM = 96
+FEATURE_DIM = 128
+
+# Maximum number of queued images taken together in one batch
+BATCH_SIZE = 8
 
 ADDRESS = ('', 8989)
 
 align = openface.AlignDlib(os.path.join(DLIB_DIR, "shape_predictor_68_face_landmarks.dat"))
 net = openface.TorchNeuralNet(os.path.join(OPENFACE_DIR, "nn4.small2.v1.t7"), DIM)
 
-server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server.bind(ADDRESS)
-
-try:
+# Maximum number of queued images: once full, readers stop reading, and clients sending more time out
+QUEUE_SIZE = 4 * BATCH_SIZE
+
+# Requests of all connections: (connection, send lock, request id, image)
+requests = Queue(QUEUE_SIZE)
+
+
+def receive(connection, buffer):
+    """Fill (contiguous numpy) buffer from connection without copying, return False if the connection was closed"""
+    view = memoryview(buffer.reshape(-1).view(np.uint8))
+    received = 0
+    while received < len(view):
+        n = connection.recv_into(view[received:], len(view) - received)
+        if not n:
+            return False
+        received += n
+    return True
+
+
+def reader(connection):
+    """Read requests from a connection, until it is closed"""
+    lock = Lock()
+    header = np.empty(4, np.int32)
+
+    try:
+        while receive(connection, header):
+            request_id, shape = header[0], tuple(header[1:])
+
+            image = np.empty(shape, np.uint8)
+            if not receive(connection, image):
+                break
+
+            requests.put((connection, lock, request_id, image))
+    finally:
+        # Pending responses for this connection fail to send, and are dropped
+        connection.close()
+
+
+def represent(faces):
+    """Represent aligned faces (of several images) with the Torch net, in one pass over the batch"""
+    return [net.forward(face) for face in faces]
+
+
+def detect(image):
+    """Find and align the faces in an image, return a list of (bounds, aligned face)"""
+    faces = []
+    for bounding_box in align.getAllFaceBoundingBoxes(image) or []:
+        face = align.align(DIM, image, bounding_box, landmarkIndices=openface.AlignDlib.OUTER_EYES_AND_NOSE)
+
+        # Faces whose landmarks cannot be found are left out
+        if face is not None:
+            faces.append(([bounding_box.left(), bounding_box.top(), bounding_box.right(), bounding_box.bottom()], face))
+    return faces
+
+
+def process(batch):
+    """Find, align and represent the faces in a batch of images, return a result per image"""
+
+    # Find and align faces in all images (an image that fails has no faces), then represent them together
+    detections = []
+    for connection, lock, request_id, image in batch:
+        try:
+            detections.append(detect(image))
+        except Exception:
+            traceback.print_exc()
+            detections.append([])
+
+    representations = represent([face for faces in detections for bounds, face in faces])
+
+    results, start = [], 0
+    for faces in detections:
+        result = np.empty((len(faces), 4 + FEATURE_DIM), np.float32)
+        for i, (bounds, face) in enumerate(faces):
+            result[i, :4] = bounds
+            result[i, 4:] = representations[start + i]
+        start += len(faces)
+        results.append(result)
+    return results
+
+
+def respond(connection, lock, request_id, result):
+    """Send the faces of a request, close the connection if that fails (a partial response would corrupt it)"""
+    try:
+        with lock:
+            connection.sendall(memoryview(np.array([request_id, len(result)], np.int32)))
+            connection.sendall(memoryview(result))
+    except socket.error:
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+
+def worker():
+    """Detect, align and represent faces in batches of queued images (the Torch net is not thread-safe)"""
     while True:
-        server.listen(5)
-        connection, address = server.accept()
+        batch = [requests.get()]
+        try:
+            while len(batch) < BATCH_SIZE:
+                batch.append(requests.get_nowait())
+        except Empty:
+            pass
 
-        shape = np.frombuffer(connection.recv(3*4), np.int32)
-        length = np.prod(shape)
+        # Every request gets a response: without faces if the batch could not be processed
+        try:
+            results = process(batch)
+        except Exception:
+            traceback.print_exc()
+            results = [np.empty((0, 4 + FEATURE_DIM), np.float32) for _ in batch]
 
-        image = np.empty(shape, np.uint8)
-        connection.recv_into(image, length, socket.MSG_WAITALL)
+        for (connection, lock, request_id, image), result in zip(batch, results):
+            respond(connection, lock, request_id, result)
 
-        bounding_boxes = align.getAllFaceBoundingBoxes(image)
 
-        if bounding_boxes:
-
-            connection.sendall(np.int32(len(bounding_boxes)))
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+server.bind(ADDRESS)
+server.listen(5)
 
-            for bounding_box in bounding_boxes:
-                bounds = np.array([[bounding_box.left() , bounding_box.top()],
-                                   [bounding_box.right(), bounding_box.bottom()]],
-                                  np.float32)
+worker_thread = Thread(target=worker)
+worker_thread.daemon = True
+worker_thread.start()
 
-                connection.sendall(bounds)
+try:
+    while True:
+        connection, address = server.accept()
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-                aligned_face = align.align(DIM, image, bounding_box,
-                                           landmarkIndices=openface.AlignDlib.OUTER_EYES_AND_NOSE)
-                representation = net.forward(aligned_face)
-                connection.sendall(representation.astype(np.float32))
-        else:
-            connection.sendall(np.int32(0))
+        reader_thread = Thread(target=reader, args=(connection,))
+        reader_thread.daemon = True
+        reader_thread.start()
 
 finally:
-    server.close()
\ No newline at end of file
+    server.close()
@@ -5,7 +5,7 @@ import numpy as np
 
 from Queue import Queue
 
-from typing import Iterable
+from typing import Iterable, List, Callable
 
 
 class Voice(object):
@@ -104,7 +104,7 @@ class VAD(object):
         self._buffer_index = 0
 
         self._voice = None
-        self._voice_queue = Queue()
+        self._callbacks = []  # type: List[Callable[[Voice], None]]
 
         self._frame_buffer = bytearray()
 
@@ -137,18 +137,45 @@ class VAD(object):
         """
         return self._activation
 
+    @property
+    def callbacks(self):
+        # type: () -> List[Callable[[Voice], None]]
+        """
+        Get/Set Functions to call each time a Voice starts (its frames are added while it continues)
+
+        Returns
+        -------
+        callbacks: list of callable
+        """
+        return self._callbacks
+
+    @callbacks.setter
+    def callbacks(self, value):
+        # type: (List[Callable[[Voice], None]]) -> None
+        """
+        Get/Set Functions to call each time a Voice starts (its frames are added while it continues)
+
+        Parameters
+        ----------
+        value: list of callable
+        """
+        self._callbacks = value
+
     @property
     def voices(self):
         # type: () -> Iterable[Voice]
         """
-        Get Voices from Microphone Stream
+        Get Voices from Microphone Stream (from the moment iteration starts)
 
         Yields
         -------
         voices: Iterable[Voice]
         """
+        queue = Queue()
+        self.callbacks += [queue.put]
+
         while True:
-            yield self._voice_queue.get()
+            yield queue.get()
 
     def _on_audio(self, audio):
         # type: (np.ndarray) -> None
@@ -187,8 +214,9 @@ class VAD(object):
                 self._voice.add_frame(self._audio_buffer[self._buffer_index:].ravel())
                 self._voice.add_frame(self._audio_buffer[:self._buffer_index].ravel())
 
-                # Add Utterance to Utterance Queue
-                self._voice_queue.put(self._voice)
+                # Pass Utterance on to Callbacks
+                for callback in self.callbacks:
+                    callback(self._voice)
         else:
             # If Utterance Ongoing: Add Frame to Utterance Object
             if self.activation > VAD.VOICE_THRESHOLD:
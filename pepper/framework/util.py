@@ -1,10 +1,15 @@
-from threading import Thread, Lock
+from pepper import logger
+from pepper import config
+
+from threading import Thread, Condition, Lock, current_thread
+from multiprocessing import cpu_count
+from collections import deque, OrderedDict
 from Queue import Empty
-from time import sleep
+from time import sleep, time
 import json
 import numpy as np
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Callable, Any
 
 
 class Scheduler(Thread):
@@ -16,12 +21,14 @@ class Scheduler(Thread):
         By specifying an interval in which the CPU on this thread is told to sleep,
         breathing room is realized for the other threads to execute their commands.
 
+    Targets that block until there is work (e.g. on a Mailbox) need no interval, and are scheduled with interval 0
+
     Parameters
     ----------
     target: Callable
         Function to Run
     interval: float
-        Interval between function calls
+        Interval between function calls (0: call again right away)
     name: str or None
         Name of Thread (for identification in debug mode)
     args: tuple
@@ -44,7 +51,8 @@ class Scheduler(Thread):
         self._running = True
         while self._running:
             self._target(*self._args, **self._kwargs)
-            sleep(self._interval)
+            if self._interval:
+                sleep(self._interval)
 
     def join(self, timeout=None):
         self._running = False
@@ -54,13 +62,26 @@ class Scheduler(Thread):
 class Mailbox(object):
     """
     Mailbox Object: Single-Item Queue with Override on 'put'
-    """
 
-    EPSILON = 1E-1
+    Waiting consumers are woken up as soon as mail is put in the Mailbox
+    """
 
     def __init__(self):
-        self._mutex = Lock()
+        self._condition = Condition()
         self._mail = None
+        self._dropped = 0
+
+    @property
+    def dropped(self):
+        # type: () -> int
+        """
+        Number of Mails Overridden before they were taken from the Mailbox
+
+        Returns
+        -------
+        dropped: int
+        """
+        return self._dropped
 
     def put(self, mail):
         """
@@ -70,9 +91,14 @@ class Mailbox(object):
         ----------
         mail: Any
         """
-        self._mail = mail
+        with self._condition:
+            if self._mail is not None:
+                self._dropped += 1
+
+            self._mail = mail
+            self._condition.notify()
 
-    def get(self, block=True):
+    def get(self, block=True, timeout=None):
         """
         Get latest Mail from Mailbox
 
@@ -81,15 +107,26 @@ class Mailbox(object):
         block: bool
             If True: Wait for Mail until it arrives in Mailbox
             If False: Return Empty Exception when Mailbox is Empty
+        timeout: float or None
+            If blocking, seconds to wait for Mail before raising an Empty Exception (None: wait until Mail arrives)
 
         Returns
         -------
         mail: Any
         """
-        with self._mutex:
+        with self._condition:
             if block:
+                deadline = time() + timeout if timeout is not None else None
+
                 while self._mail is None:
-                    sleep(Mailbox.EPSILON)
+                    if deadline is None:
+                        self._condition.wait()
+                    else:
+                        remaining = deadline - time()
+                        if remaining <= 0:
+                            raise Empty
+                        self._condition.wait(remaining)
+
                 return self._get()
 
             else:
@@ -110,6 +147,699 @@ class Mailbox(object):
         return mail
 
 
+class Tracer(object):
+    """
+    Tracer: Records Timed Spans of Work per Key (e.g. per Camera Frame, keyed by AbstractImage.hash)
+
+    Spans are recorded by Pipeline Stages that are given a trace key (queueing and processing),
+    and by Sensors and Components for finer steps (acquisition, callbacks, detectors, context fusion).
+    Only the most recent spans are kept. They can be summarized into percentiles per span name,
+    and exported as JSON lines or in the Chrome Trace Event Format (open in chrome://tracing or ui.perfetto.dev)
+
+    Parameters
+    ----------
+    size: int
+        Number of most recent Spans kept (0: tracing off)
+    """
+
+    _default = None
+    _default_lock = Lock()
+
+    def __init__(self, size=10000):
+        # type: (int) -> None
+        self._size = size
+
+        self._lock = Lock()
+        self._spans = deque(maxlen=size or None)
+        self._open = OrderedDict()
+
+    @classmethod
+    def default(cls):
+        # type: () -> Tracer
+        """
+        Tracer shared by Pipeline, Sensors and Components
+
+        Returns
+        -------
+        tracer: Tracer
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(config.TRACE_SIZE)
+            return cls._default
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        """
+        Whether Spans are recorded
+
+        Returns
+        -------
+        enabled: bool
+        """
+        return self._size > 0
+
+    @property
+    def spans(self):
+        # type: () -> List[Dict]
+        """
+        Recorded Spans, oldest first
+
+        Returns
+        -------
+        spans: List[Dict]
+            Dictionaries with key, name, start & end (seconds since epoch) and thread
+        """
+        with self._lock:
+            spans = list(self._spans)
+
+        return [{"key": key, "name": name, "start": start, "end": end, "thread": thread}
+                for key, name, start, end, thread in spans]
+
+    def add(self, key, name, start, end=None):
+        # type: (str, str, float, Optional[float]) -> None
+        """
+        Record Span
+
+        Parameters
+        ----------
+        key: str
+            What the Span is about (e.g. AbstractImage.hash)
+        name: str
+            What happened during the Span (e.g. "FaceDetection/openface")
+        start: float
+            Start of Span (seconds since epoch)
+        end: float or None
+            End of Span (None: now)
+        """
+        if self._size:
+            span = (key, name, start, time() if end is None else end, current_thread().name)
+            with self._lock:
+                self._spans.append(span)
+
+    def begin(self, key, name):
+        # type: (str, str) -> None
+        """
+        Begin Span, that is recorded once :meth:`Tracer.end` is called with the same key and name
+
+        Parameters
+        ----------
+        key: str
+        name: str
+        """
+        if self._size:
+            with self._lock:
+                self._open[(key, name)] = time()
+
+                # Spans that never end (e.g. of dropped Items) are forgotten
+                if len(self._open) > self._size:
+                    self._open.popitem(last=False)
+
+    def end(self, key, name):
+        # type: (str, str) -> None
+        """
+        End Span started with :meth:`Tracer.begin` (nothing happens if it was not started)
+
+        Parameters
+        ----------
+        key: str
+        name: str
+        """
+        if self._size:
+            with self._lock:
+                start = self._open.pop((key, name), None)
+
+            if start is not None:
+                self.add(key, name, start)
+
+    def cancel(self, key, name):
+        # type: (str, str) -> None
+        """
+        Forget Span started with :meth:`Tracer.begin`
+
+        Parameters
+        ----------
+        key: str
+        name: str
+        """
+        if self._size:
+            with self._lock:
+                self._open.pop((key, name), None)
+
+    def span(self, key, name):
+        """
+        Record Span of a with block
+
+        >>> with Tracer.default().span(image.hash, "FaceDetection/openface"):
+        ...     open_face.represent(image.image)
+
+        Parameters
+        ----------
+        key: str
+        name: str
+        """
+        return _TracerSpan(self, key, name)
+
+    def summary(self, percentiles=(50, 90, 99)):
+        # type: (Tuple[int, ...]) -> Dict[str, Dict[str, float]]
+        """
+        Summarize Span Durations per Span Name, in milliseconds
+
+        Parameters
+        ----------
+        percentiles: tuple of int
+
+        Returns
+        -------
+        summary: dict
+            count, mean, max and percentiles (e.g. p50) of the durations per span name
+        """
+        with self._lock:
+            spans = list(self._spans)
+
+        durations = {}
+        for key, name, start, end, thread in spans:
+            durations.setdefault(name, []).append((end - start) * 1000)
+
+        summary = {}
+        for name, values in durations.items():
+            values = np.array(values)
+            summary[name] = {"count": len(values), "mean": float(values.mean()), "max": float(values.max())}
+            for percentile in percentiles:
+                summary[name]["p{}".format(percentile)] = float(np.percentile(values, percentile))
+
+        return summary
+
+    def dump_json_lines(self, path):
+        # type: (str) -> None
+        """
+        Write Spans to file, one JSON object per line
+
+        Parameters
+        ----------
+        path: str
+        """
+        with open(path, 'w') as f:
+            for span in self.spans:
+                f.write(json.dumps(span) + "\n")
+
+    def dump_chrome_trace(self, path):
+        # type: (str) -> None
+        """
+        Write Spans to file in the Chrome Trace Event Format, with a row per thread
+
+        Parameters
+        ----------
+        path: str
+        """
+        spans = self.spans
+        threads = {}
+
+        events = []
+        for span in spans:
+            tid = threads.setdefault(span["thread"], len(threads))
+            events.append({"name": span["name"], "cat": span["name"].split("/")[0], "ph": "X", "pid": 0, "tid": tid,
+                           "ts": span["start"] * 1E6, "dur": (span["end"] - span["start"]) * 1E6,
+                           "args": {"key": span["key"]}})
+
+        events.extend({"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": thread}}
+                      for thread, tid in threads.items())
+
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def clear(self):
+        """Forget all Spans"""
+        with self._lock:
+            self._spans.clear()
+            self._open.clear()
+
+
+class _TracerSpan(object):
+    # Context Manager recording a Span of a with block
+    def __init__(self, tracer, key, name):
+        self._tracer = tracer
+        self._key = key
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._tracer.add(self._key, self._name, self._start)
+
+
+class Stage(object):
+    """
+    Pipeline Stage: Bounded Queue of Items, processed by a Target on the Workers of a Pipeline
+
+    Stages are created with :meth:`Pipeline.add_stage`, items are put in them with :meth:`Stage.put`
+
+    Parameters
+    ----------
+    pipeline: Pipeline
+        Pipeline running the Stage
+    name: str
+        Name of Stage (for identification in logs and statistics)
+    target: Callable
+        Function called with every Item (without arguments for periodic Stages).
+        Results that are not None are put in the downstream Stages
+    priority: int
+        Stages with higher priority are run first when several Stages have items waiting
+    queue_size: int or None
+        Number of Items waiting in the Stage, after which the drop policy applies (None: unbounded)
+    drop: str
+        What happens to an Item put in a full Stage:
+            Stage.DROP_OLDEST: the oldest waiting Item is dropped (only the latest Items matter, e.g. images)
+            Stage.DROP_NEWEST: the new Item is dropped
+            Stage.BLOCK: put waits for room (backpressure). Puts from Pipeline Workers (results of upstream Stages)
+                never wait, to avoid deadlocks: like Stage.DROP_NEWEST, the new Item is dropped
+    concurrency: int
+        Number of Items of this Stage processed at the same time (1: in order, for targets that are not thread-safe)
+    interval: float or None
+        If set, the Stage takes no Items, but its target is called periodically with interval seconds in between
+    trace: Callable or None
+        If set, the time every Item waits in and is processed by the Stage is recorded by :meth:`Tracer.default`,
+        as spans "<name>/queue" and "<name>", keyed by trace(item) (e.g. AbstractImage.hash)
+    """
+
+    DROP_OLDEST = "oldest"
+    DROP_NEWEST = "newest"
+    BLOCK = "block"
+
+    def __init__(self, pipeline, name, target, priority, queue_size=1, drop=DROP_OLDEST, concurrency=1, interval=None,
+                 trace=None):
+        # type: (Pipeline, str, Callable, int, Optional[int], str, int, Optional[float], Optional[Callable]) -> None
+
+        if drop not in (Stage.DROP_OLDEST, Stage.DROP_NEWEST, Stage.BLOCK):
+            raise ValueError("Unknown drop policy: {}".format(drop))
+
+        self._pipeline = pipeline
+        self._name = name
+        self._target = target
+        self._priority = priority
+        self._queue_size = queue_size
+        self._drop = drop
+        self._concurrency = concurrency
+        self._interval = interval
+        self._trace = trace
+        self._queue_span = "{}/queue".format(name)
+
+        self._queue = deque()
+        self._downstream = []  # type: List[Stage]
+        self._active = 0
+        self._due = time()
+
+        self._processed = 0
+        self._dropped = 0
+
+    @property
+    def name(self):
+        # type: () -> str
+        """
+        Name of Stage
+
+        Returns
+        -------
+        name: str
+        """
+        return self._name
+
+    @property
+    def priority(self):
+        # type: () -> int
+        """
+        Priority of Stage
+
+        Returns
+        -------
+        priority: int
+        """
+        return self._priority
+
+    @property
+    def downstream(self):
+        # type: () -> List[Stage]
+        """
+        Stages the results of this Stage are put in
+
+        Returns
+        -------
+        downstream: List[Stage]
+        """
+        return list(self._downstream)
+
+    @property
+    def pending(self):
+        # type: () -> int
+        """
+        Number of Items waiting to be processed
+
+        Returns
+        -------
+        pending: int
+        """
+        return len(self._queue)
+
+    @property
+    def processed(self):
+        # type: () -> int
+        """
+        Number of Items processed (or periodic calls made)
+
+        Returns
+        -------
+        processed: int
+        """
+        return self._processed
+
+    @property
+    def dropped(self):
+        # type: () -> int
+        """
+        Number of Items dropped because the Stage was full
+
+        Returns
+        -------
+        dropped: int
+        """
+        return self._dropped
+
+    def put(self, item):
+        # type: (Any) -> bool
+        """
+        Put Item in Stage, to be processed by a Pipeline Worker
+
+        Parameters
+        ----------
+        item: Any
+
+        Returns
+        -------
+        accepted: bool
+            Whether the Item was accepted (False: it was dropped)
+        """
+        return self._pipeline.put(self, item)
+
+    def _full(self):
+        return self._queue_size is not None and len(self._queue) >= self._queue_size
+
+
+class Pipeline(object):
+    """
+    Pipeline: Runs Stages of Sensor Processing and Components on a Pool of Worker Threads
+
+    Instead of running a thread per component, components register Stages.
+    Stages form a directed acyclic graph (see :meth:`Pipeline.connect`) with bounded queues in between.
+    Whenever a Worker is free, it processes the next Item of the Stage with the highest priority that has Items waiting,
+    so speech is not delayed by vision when there is more work than cores.
+
+    Targets should return quickly: a Worker is occupied for as long as its target runs. Long running, blocking
+    consumers (e.g. Speech Recognition waiting for Microphone audio, or Text to Speech waiting for speech to be
+    produced) run on threads of their own, like the frame acquisition loops of the backends.
+    Vision Stages may still block (e.g. waiting for OpenFace), so some Workers are reserved for Audio and Speech.
+
+    Parameters
+    ----------
+    workers: int or None
+        Number of Worker Threads (None: one per CPU core, at least two)
+    reserved: int
+        Number of Workers only Stages with at least SPEECH priority run on (at most all Workers but one)
+    """
+
+    # Stage Priorities
+    AUDIO = 30
+    SPEECH = 20
+    VISION = 10
+    BACKGROUND = 0
+
+    _default = None
+    _default_lock = Lock()
+
+    def __init__(self, workers=None, reserved=0):
+        # type: (Optional[int], int) -> None
+        self._workers = workers or max(2, cpu_count())
+        self._reserved = max(0, min(reserved, self._workers - 1))
+
+        self._condition = Condition()
+        self._stages = []  # type: List[Stage]
+        self._threads = []  # type: List[Thread]
+        self._running = False
+
+        self._tracer = Tracer.default()
+
+        self._log = logger.getChild(self.__class__.__name__)
+
+    @classmethod
+    def default(cls):
+        # type: () -> Pipeline
+        """
+        Pipeline shared by Sensors and Components, started on first use
+
+        Returns
+        -------
+        pipeline: Pipeline
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(config.PIPELINE_WORKERS, config.PIPELINE_RESERVED_WORKERS)
+                cls._default.start()
+            return cls._default
+
+    @property
+    def workers(self):
+        # type: () -> int
+        """
+        Number of Worker Threads
+
+        Returns
+        -------
+        workers: int
+        """
+        return self._workers
+
+    @property
+    def stages(self):
+        # type: () -> List[Stage]
+        """
+        Stages in Pipeline, highest priority first
+
+        Returns
+        -------
+        stages: List[Stage]
+        """
+        with self._condition:
+            return list(self._stages)
+
+    def add_stage(self, name, target, priority=BACKGROUND, queue_size=1, drop=Stage.DROP_OLDEST, concurrency=1,
+                  interval=None, trace=None):
+        # type: (str, Callable, int, Optional[int], str, int, Optional[float], Optional[Callable]) -> Stage
+        """
+        Add Stage to Pipeline (see :class:`Stage` for the Parameters)
+
+        Returns
+        -------
+        stage: Stage
+        """
+        stage = Stage(self, name, target, priority, queue_size, drop, concurrency, interval, trace)
+
+        with self._condition:
+            self._stages.append(stage)
+
+            # Stable sort: Stages with the same priority are run in the order they were added
+            self._stages.sort(key=lambda s: -s.priority)
+            self._condition.notify_all()
+
+        return stage
+
+    def connect(self, upstream, downstream):
+        # type: (Stage, Stage) -> None
+        """
+        Put the results of upstream Stage in downstream Stage
+
+        Parameters
+        ----------
+        upstream: Stage
+        downstream: Stage
+        """
+        with self._condition:
+            if self._reaches(downstream, upstream):
+                raise ValueError("Connecting {} to {} would create a cycle".format(upstream.name, downstream.name))
+            upstream._downstream.append(downstream)
+
+    def remove(self, stage):
+        # type: (Stage) -> None
+        """
+        Remove Stage from Pipeline, dropping the Items waiting in it
+
+        Parameters
+        ----------
+        stage: Stage
+        """
+        with self._condition:
+            if stage in self._stages:
+                self._stages.remove(stage)
+            for other in self._stages:
+                if stage in other._downstream:
+                    other._downstream.remove(stage)
+            stage._queue.clear()
+            self._condition.notify_all()
+
+    def put(self, stage, item):
+        # type: (Stage, Any) -> bool
+        """
+        Put Item in Stage, applying the drop policy of the Stage when it is full
+
+        Parameters
+        ----------
+        stage: Stage
+        item: Any
+
+        Returns
+        -------
+        accepted: bool
+            Whether the Item was accepted (False: it was dropped)
+        """
+        with self._condition:
+            return self._put(stage, item)
+
+    def start(self):
+        """Start Pipeline Workers"""
+        with self._condition:
+            if self._running:
+                return
+
+            self._running = True
+            self._threads = [Thread(target=self._work, name="PipelineWorker{}".format(i)) for i in range(self._workers)]
+
+            for thread in self._threads:
+                thread.daemon = True
+                thread.start()
+
+    def stop(self, timeout=None):
+        # type: (Optional[float]) -> None
+        """
+        Stop Pipeline Workers, after the Items they are processing
+
+        Parameters
+        ----------
+        timeout: float or None
+            Seconds to wait for each Worker (None: wait until it is done)
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            if thread is not current_thread():
+                thread.join(timeout)
+
+    def _put(self, stage, item):
+        # Must be called holding the condition
+        if stage._full():
+            if stage._drop == Stage.DROP_OLDEST:
+                dropped = stage._queue.popleft()
+                stage._dropped += 1
+
+                if stage._trace:
+                    self._tracer.cancel(stage._trace(dropped), stage._queue_span)
+            else:
+                # Workers never wait for room (they would hold up the Stages they have to make room in)
+                if stage._drop == Stage.BLOCK and current_thread() not in self._threads:
+                    while stage._full() and self._running and stage in self._stages:
+                        self._condition.wait()
+
+                if stage._full():
+                    stage._dropped += 1
+                    return False
+
+        if stage._trace:
+            self._tracer.begin(stage._trace(item), stage._queue_span)
+
+        stage._queue.append(item)
+        self._condition.notify_all()
+        return True
+
+    def _reaches(self, source, target):
+        # Must be called holding the condition: whether target is (indirectly) downstream of source
+        return source is target or any(self._reaches(stage, target) for stage in source._downstream)
+
+    def _next(self):
+        # Must be called holding the condition: (stage, item) to process next, or (None, None, seconds to wait)
+        now = time()
+        wait = None
+
+        # Stages below SPEECH priority leave the reserved Workers free
+        low_priority_active = sum(stage._active for stage in self._stages if stage.priority < self.SPEECH)
+        low_priority_full = low_priority_active >= self._workers - self._reserved
+
+        for stage in self._stages:
+            if stage._active >= stage._concurrency:
+                continue
+
+            if low_priority_full and stage.priority < self.SPEECH:
+                continue
+
+            if stage._interval is not None:
+                if stage._due <= now:
+                    return stage, None, None
+                wait = stage._due - now if wait is None else min(wait, stage._due - now)
+
+            elif stage._queue:
+                item = stage._queue.popleft()
+
+                if stage._trace:
+                    self._tracer.end(stage._trace(item), stage._queue_span)
+
+                return stage, item, None
+
+        return None, None, wait
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._running:
+                        return
+
+                    stage, item, wait = self._next()
+
+                    if stage is not None:
+                        stage._active += 1
+                        if stage._drop == Stage.BLOCK:
+                            self._condition.notify_all()
+                        break
+
+                    self._condition.wait(wait)
+
+            result = None
+            start = time()
+
+            try:
+                result = stage._target() if stage._interval is not None else stage._target(item)
+            except Exception as e:
+                self._log.exception("Stage {} failed: {}".format(stage.name, e))
+
+            if stage._trace:
+                self._tracer.add(stage._trace(item), stage.name, start)
+
+            with self._condition:
+                stage._active -= 1
+                stage._processed += 1
+
+                if stage._interval is not None:
+                    stage._due = time() + stage._interval
+
+                if result is not None:
+                    for downstream in stage._downstream:
+                        self._put(downstream, result)
+
+                self._condition.notify_all()
+
+
 class Bounds(object):
     """
     Rectangle Bounds Object
@@ -41,11 +41,12 @@ class BrainResponder(Responder):
                 brain_response_question = []
 
                 if utterance.type == UtteranceType.QUESTION:
-                    brain_response_question = app.brain.query_brain(utterance)
+                    brain_response_question = app.async_brain.query_brain(utterance).result()
                     reply = reply_to_question(brain_response_question)
                     self._log.info("REPLY to question: {}".format(reply))
                 else:
-                    brain_response_statement = app.brain.update(utterance, reason_types=True)  # Searches for types in dbpedia
+                    # Searches for types in dbpedia
+                    brain_response_statement = app.async_brain.update(utterance, reason_types=True).result()
                     reply = phrase_thoughts(brain_response_statement, True, True, True)
                     self._log.info("REPLY to statement: {}".format(reply))
 
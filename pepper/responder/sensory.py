@@ -230,10 +230,10 @@ class LocationResponder(Responder):
         # Guess where we are
         if utterance.transcript.lower() in self.CUE_GUESS_LOCATION:
             if utterance.context.location.label == utterance.context.location.UNKNOWN:
-                guess = app.brain.reason_location(utterance.context)
+                guess = app.async_brain.reason_location(utterance.context).result()
                 if guess:
                     utterance.context.location.label = guess
-                    app.brain.set_location_label(guess)
+                    app.async_brain.set_location_label(guess)
                     return 1, lambda: app.say("{} {}".format(choice(self.ANSWER_GUESS),
                                                              self._location_to_text(utterance.context.location)))
                 else:
@@ -245,7 +245,7 @@ class LocationResponder(Responder):
                 if utterance.transcript.lower().startswith(cue):
                     location = utterance.transcript.lower().replace(cue, "").strip().title()
                     utterance.context.location.label = location
-                    app.brain.set_location_label(location)
+                    app.async_brain.set_location_label(location)
                     return 1, lambda: app.say("Aha, so {}".format(self._location_to_text(utterance.context.location)))
 
     @staticmethod
@@ -0,0 +1,259 @@
+"""
+Throughput and latency of the brain, replaying the statements of base_cases
+
+For every brain size, the brain is cleared and filled with that many statements (variations of base_cases, loaded
+with update_many), after which the base_cases statements are replayed one by one with update. Every stage of update
+is timed: casefold, model_graphs, serialize (flushes that upload, minus upload and journal), upload, journal, each
+thought query and trust. Results are written as JSON, for regression tracking. The journal is written to a temporary
+directory, which is removed afterwards.
+
+Usage: python brain_benchmark.py [--address local://] [--sizes 1000,100000,1000000] [--statements 100]
+                                 [--seed 0] [--output results.json]
+    address: brain to benchmark, the local GraphDB by default. The brain is cleared!
+    sizes: number of statements in the brain before replaying
+    statements: number of base_cases statements replayed per size (all by default)
+"""
+
+from pepper.brain import LongTermMemory
+from pepper.brain import long_term_memory
+from pepper.brain.utils.base_cases import statements
+from pepper import config
+
+from test.brain.utils import transform_capsule
+
+from threading import Lock, local
+from datetime import datetime
+from time import time
+import argparse
+import tempfile
+import shutil
+import random
+import copy
+import json
+import sys
+import os
+
+import numpy as np
+
+THOUGHT_QUERIES = ['get_thoughts_before_upload', 'get_thoughts_after_upload', 'get_statement_novelty',
+                   'fill_entity_novelty', 'get_overlaps', 'get_negation_conflicts',
+                   'get_complement_cardinality_conflicts', 'get_entity_gaps']
+TRUST = ['get_trust', 'update_trust_network']
+
+MODEL_GRAPHS = long_term_memory.model_graphs
+
+
+class StageTimer(object):
+    def __init__(self):
+        # type: () -> None
+        """
+        Collect the duration of every call to the functions it wraps, per stage (calls may come from many threads)
+        """
+        self._lock = Lock()
+        self.durations = {}
+
+    def wrap(self, function, stage):
+        def timed(*args, **kwargs):
+            start = time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time() - start)
+
+        return timed
+
+    def instrument(self, obj, name, stage=None):
+        """
+        Time the calls to a method of an object from now on
+        :param obj: object with the method
+        :param name: name of the method
+        :param stage: name of the stage, the name of the method by default
+        :return:
+        """
+        setattr(obj, name, self.wrap(getattr(obj, name), stage or name))
+
+    def add(self, stage, duration):
+        with self._lock:
+            self.durations.setdefault(stage, []).append(duration)
+
+    def clear(self):
+        with self._lock:
+            self.durations = {}
+
+    def report(self):
+        """
+        Summarize the durations of every stage, in milliseconds
+        :return: dictionary of stage to calls, total, mean, p50, p95 and max
+        """
+        with self._lock:
+            durations = {stage: np.array(values) * 1000 for stage, values in self.durations.items()}
+
+        report = {stage: {'calls': len(values), 'total': float(values.sum()), 'mean': float(values.mean()),
+                          'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+                          'max': float(values.max())}
+                  for stage, values in durations.items() if len(values)}
+
+        # Serializing happens in flush, together with uploading and journaling, so only its total is known (flushes
+        # with nothing to upload are not timed)
+        if 'flush' in report:
+            total = report['flush']['total'] - sum(report[stage]['total'] for stage in ['upload', 'journal']
+                                                   if stage in report)
+            report['serialize'] = {'calls': report['flush']['calls'], 'total': total,
+                                   'mean': total / report['flush']['calls']}
+
+        return report
+
+
+def instrument(brain, timer):
+    """
+    Time the stages of update on a brain
+    :param brain: LongTermMemory
+    :param timer: StageTimer
+    :return:
+    """
+    long_term_memory.model_graphs = timer.wrap(MODEL_GRAPHS, 'model_graphs')
+
+    instrument_flush(brain.context.write_buffer, brain.context.connection, timer)
+    timer.instrument(brain.context.brain_log, 'write', 'journal')
+
+    for name in THOUGHT_QUERIES:
+        timer.instrument(brain.thought_generator, name)
+
+    for name in TRUST:
+        timer.instrument(brain.trust_calculator, name)
+
+
+def instrument_flush(write_buffer, connection, timer):
+    """
+    Time the uploads of a connection, and the flushes of a write buffer that upload something
+    :param write_buffer: WriteBuffer
+    :param connection: StoreConnector the write buffer uploads with
+    :param timer: StageTimer
+    :return:
+    """
+    uploading = local()
+
+    upload = timer.wrap(connection.upload, 'upload')
+    flush = write_buffer.flush
+
+    def uploaded(*args, **kwargs):
+        uploading.uploaded = True
+        return upload(*args, **kwargs)
+
+    def flushed(*args, **kwargs):
+        uploading.uploaded = False
+        start = time()
+        try:
+            return flush(*args, **kwargs)
+        finally:
+            if uploading.uploaded:
+                timer.add('flush', time() - start)
+
+    connection.upload = uploaded
+    write_buffer.flush = flushed
+
+
+def utterance(capsule, timer=None):
+    # Contexts without objects or people at a known place, the same for every run
+    utt = transform_capsule(capsule, empty=True, no_people=True, place=True)
+
+    if timer is not None:
+        timer.instrument(utt, 'casefold')
+
+    return utt
+
+
+def variation(capsule, number):
+    # Same statement about other entities, so the brain grows with every variation
+    capsule = copy.deepcopy(capsule)
+    capsule['subject']['label'] = '{}_{}'.format(capsule['subject']['label'], number)
+    capsule['object']['label'] = '{}_{}'.format(capsule['object']['label'], number)
+
+    return capsule
+
+
+def fill(brain, size, batch_size=1000):
+    """
+    Fill a brain with variations of the base_cases statements
+    :param brain: LongTermMemory
+    :param size: number of statements
+    :param batch_size: number of statements uploaded at once
+    :return:
+    """
+    for start in range(0, size, batch_size):
+        batch = [variation(statements[i % len(statements)], i // len(statements))
+                 for i in range(start, min(start + batch_size, size))]
+        brain.update_many([utterance(capsule) for capsule in batch])
+
+
+def benchmark(address, size, replayed, timer):
+    """
+    Fill a brain to a size, and replay base_cases statements on it
+    :param address: address of the brain
+    :param size: number of statements in the brain before replaying
+    :param replayed: base_cases statements to replay
+    :param timer: StageTimer
+    :return: dictionary with the results for this size
+    """
+    brain = LongTermMemory(address=address, clear_all=True)
+
+    # Only the incremental trust updates are timed, the periodic rebuild would compete with filling and replaying
+    brain.trust_calculator.stop_rebuilding()
+
+    try:
+        start = time()
+        fill(brain, size)
+        fill_seconds = time() - start
+
+        instrument(brain, timer)
+        timer.clear()
+
+        start = time()
+        for capsule in replayed:
+            timer.wrap(brain.update, 'update')(utterance(capsule, timer))
+        replay_seconds = time() - start
+
+    finally:
+        long_term_memory.model_graphs = MODEL_GRAPHS
+        brain.context.write_buffer.stop()
+        brain.context.brain_log.close()
+
+    return {'size': size, 'fill_seconds': fill_seconds, 'statements': len(replayed),
+            'replay_seconds': replay_seconds, 'statements_per_second': len(replayed) / replay_seconds,
+            'stages': timer.report()}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the brain on the base_cases statements")
+    parser.add_argument('--address', default=config.BRAIN_URL_LOCAL)
+    parser.add_argument('--sizes', default='1000')
+    parser.add_argument('--statements', type=int, default=len(statements))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    timer = StageTimer()
+
+    # Keep the journal of the benchmark out of the brain log of the robot
+    journal_root = tempfile.mkdtemp(prefix='brain_benchmark_')
+    config.BRAIN_LOG_ROOT = os.path.join(journal_root, 'brain_log_{}')
+
+    try:
+        results = []
+        for size in [int(size) for size in args.sizes.split(',')]:
+            results.append(benchmark(args.address, size, statements[:args.statements], timer))
+    finally:
+        shutil.rmtree(journal_root, ignore_errors=True)
+
+    output = json.dumps({'date': datetime.now().isoformat(), 'address': args.address, 'seed': args.seed,
+                         'consolidated_thoughts': config.BRAIN_CONSOLIDATED_THOUGHTS,
+                         'wire_format': config.BRAIN_WIRE_FORMAT, 'results': results}, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + '\n')
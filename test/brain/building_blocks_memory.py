@@ -0,0 +1,112 @@
+"""
+Memory taken by brain building blocks when materializing large result sets
+
+Every row of a result is turned into a Triple of two Entities and a Predicate, once with the building blocks and once
+with dict-backed records holding the same attributes (the layout building blocks had before __slots__). Every variant
+runs in its own process, so their peak RSS can be compared.
+
+Usage: python building_blocks_memory.py [rows] [--brain predicate]
+    rows: number of synthetic result rows to materialize (default 200000)
+    --brain: materialize get_triples_with_predicate(predicate) from the brain instead
+"""
+
+from pepper.brain.infrastructure import Entity, Predicate, Triple
+
+from random import Random
+import subprocess
+import resource
+import json
+import sys
+import gc
+
+VARIANTS = ['slots', 'dict']
+
+
+class DictBacked(object):
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def synthetic_rows(n, seed=0):
+    """
+    Result rows of triples_with_predicate, with labels repeating as they do in a brain
+    :param n: number of rows
+    :param seed: random seed
+    :return: list of rows, with all strings decoded from JSON like query responses
+    """
+    random = Random(seed)
+    people = ['person_{}'.format(i) for i in range(max(1, n // 20))]
+    places = ['place_{}'.format(i) for i in range(max(1, n // 200))]
+
+    rows = [{'sname': {'type': 'literal', 'value': random.choice(people)},
+             'oname': {'type': 'literal', 'value': random.choice(places)}} for _ in range(n)]
+
+    return json.loads(json.dumps(rows))
+
+
+def brain_rows(predicate):
+    from pepper.brain import LongTermMemory
+
+    brain = LongTermMemory(clear_all=False)
+    return [{'sname': {'value': s}, 'oname': {'value': o}} for s, o in brain.get_triples_with_predicate(predicate)]
+
+
+def materialize(rows, variant):
+    if variant == 'slots':
+        return [Triple(Entity(row['sname']['value'], row['sname']['value'], [u'person']),
+                       Predicate(u'be-from', u'be-from'),
+                       Entity(row['oname']['value'], row['oname']['value'], [u'location']))
+                for row in rows]
+
+    return [DictBacked(_subject=DictBacked(_id=row['sname']['value'], _label=row['sname']['value'],
+                                           _offset=None, _confidence=0.0, _types=[u'person']),
+                       _predicate=DictBacked(_id=u'be-from', _label=u'be-from', _offset=None, _confidence=0.0,
+                                             _cardinality=1),
+                       _complement=DictBacked(_id=row['oname']['value'], _label=row['oname']['value'],
+                                              _offset=None, _confidence=0.0, _types=[u'location']))
+            for row in rows]
+
+
+def footprint(triple):
+    # Bytes of a triple and its three parts, without the strings they share
+    parts = [triple, triple._subject, triple._predicate, triple._complement]
+    return sum(sys.getsizeof(part) + (sys.getsizeof(part.__dict__) if hasattr(part, '__dict__') else 0)
+               for part in parts)
+
+
+def measure(arguments, variant):
+    rows = brain_rows(arguments[arguments.index('--brain') + 1]) if '--brain' in arguments \
+        else synthetic_rows(int(arguments[0]) if arguments and arguments[0].isdigit() else 200000)
+
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    objects_before = len(gc.get_objects())
+
+    triples = materialize(rows, variant)
+
+    gc.collect()
+    return {'variant': variant, 'rows': len(rows),
+            'objects': len(gc.get_objects()) - objects_before,
+            'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+            'bytes_per_triple': footprint(triples[0]) if triples else 0}
+
+
+if __name__ == "__main__":
+
+    if '--variant' in sys.argv:
+        variant = sys.argv[sys.argv.index('--variant') + 1]
+        arguments = [argument for argument in sys.argv[1:] if argument not in ['--variant', variant]]
+        print(json.dumps(measure(arguments, variant)))
+
+    else:
+        results = {}
+        for variant in VARIANTS:
+            output = subprocess.check_output([sys.executable, __file__, '--variant', variant] + sys.argv[1:])
+            results[variant] = json.loads(output.strip().splitlines()[-1])
+
+        for variant in VARIANTS:
+            print("{variant:>6}: {rows} rows, {objects} tracked objects, {rss_kb} KB RSS, "
+                  "{bytes_per_triple} bytes per triple".format(**results[variant]))
+
+        if results['dict']['rss_kb']:
+            print("RSS saved: {:.0%}".format(1 - float(results['slots']['rss_kb']) / results['dict']['rss_kb']))
@@ -0,0 +1,50 @@
+"""
+LongTermMemory.update on the statements of base_cases, against the in-process store
+
+The brain starts empty, so the first statements run every thought query over empty groups, which the local store
+must answer as GraphDB does (a row of empty aggregates).
+
+Usage: python local_store_update.py
+"""
+
+from pepper.brain import LongTermMemory
+from pepper.brain.infrastructure import LocalStoreConnector
+from pepper.brain.utils.base_cases import statements
+from pepper.brain.utils.helper_functions import fill_query, read_query
+
+from test.brain.utils import transform_capsule
+
+ADDRESS = 'local://'
+
+
+def test_empty_aggregates():
+    store = LocalStoreConnector(ADDRESS, 'trig')
+
+    rows = store.query(fill_query('context/ranked_object_ids_per_type', 'nowhere'))
+    assert [{key: value['value'] for key, value in row.items()} for row in rows] == \
+        [{'type': u'', 'ids': u'', 'imp': u''}], rows
+
+    rows = store.query(read_query('context/detections_per_context'))
+    assert rows[0]['detections']['value'] == u'', rows
+
+    rows = store.query(read_query('content exploration/all_conflicts'))
+    assert rows == [], rows
+
+
+def test_update():
+    brain = LongTermMemory(address=ADDRESS, clear_all=True)
+    brain.trust_calculator.stop_rebuilding()
+
+    for elem in statements:
+        capsule = transform_capsule(elem, empty=True, no_people=True, place=True)
+        response = brain.update(capsule, reason_types=False)
+
+        assert 'statement' in response and 'thoughts' in response, response
+
+    assert brain.count_statements() > 0
+
+
+if __name__ == "__main__":
+    for test in [test_empty_aggregates, test_update]:
+        test()
+        print("{}: ok".format(test.__name__))
@@ -0,0 +1,102 @@
+"""
+Streaming SPARQL TSV results with StoreConnector.query_iter, against a fake triple store
+
+Usage: python store_connector_stream.py
+"""
+
+from pepper.brain.infrastructure.store_connector import StoreConnector
+
+import re
+
+OFFSET = re.compile(r'LIMIT (\d+) OFFSET (\d+)$')
+
+
+class FakeResponse(object):
+    def __init__(self, body):
+        self._body = body
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, delimiter=None):
+        # Like requests: split on the delimiter, so a body ending with it yields a trailing empty line
+        for line in self._body.split(delimiter):
+            yield line
+
+    def close(self):
+        pass
+
+
+class FakeSession(object):
+    def __init__(self, header, rows):
+        self.header = header
+        self.rows = rows
+        self.requests = 0
+
+    def post(self, address, data=None, headers=None, timeout=None, stream=False):
+        self.requests += 1
+
+        rows = self.rows
+        match = OFFSET.search(data['query'])
+        if match:
+            limit, offset = int(match.group(1)), int(match.group(2))
+            rows = rows[offset:offset + limit]
+
+        return FakeResponse(b''.join(line + b'\n' for line in [self.header] + rows))
+
+
+def connector(header, rows):
+    store = StoreConnector.__new__(StoreConnector)
+    super(StoreConnector, store).__init__('http://fake', 'nquads')
+    store.timeout = None
+    store._session = FakeSession(header, rows)
+    return store
+
+
+def test_one_column():
+    store = connector(b'?name', [b'"piek"', b'"lenka"', b'"bram"'])
+
+    rows = list(store.query_iter('SELECT ?name WHERE {}'))
+
+    assert [row['name']['value'] for row in rows] == [u'piek', u'lenka', u'bram'], rows
+    assert store.query_stats['inline']['rows'] == 3, store.query_stats
+
+
+def test_one_column_paged():
+    store = connector(b'?name', [u'"person_{}"'.format(i).encode('utf-8') for i in range(5)])
+
+    rows = list(store.query_iter('SELECT ?name WHERE {} ORDER BY ?name', page_size=2))
+
+    assert [row['name']['value'] for row in rows] == [u'person_{}'.format(i) for i in range(5)], rows
+    assert store._session.requests == 3, store._session.requests
+
+
+def test_two_columns_unbound():
+    store = connector(b'?s\t?o', [b'<http://cltl.nl/leolani/world/piek>\t',
+                                   b'\t"12"^^<http://www.w3.org/2001/XMLSchema#integer>'])
+
+    rows = list(store.query_iter('SELECT ?s ?o WHERE {}'))
+
+    assert rows == [{'s': {'type': 'uri', 'value': u'http://cltl.nl/leolani/world/piek'}},
+                    {'o': {'type': 'literal', 'value': u'12',
+                           'datatype': 'http://www.w3.org/2001/XMLSchema#integer'}}], rows
+
+
+def test_cell_count_mismatch():
+    store = connector(b'?s\t?o', [b'<http://cltl.nl/leolani/world/piek>\t"piek"', b'"lenka"'])
+
+    rows = store.query_iter('SELECT ?s ?o WHERE {}')
+    assert next(rows)['o']['value'] == u'piek'
+
+    try:
+        next(rows)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("A row with a missing cell was not reported")
+
+
+if __name__ == "__main__":
+    for test in [test_one_column, test_one_column_paged, test_two_columns_unbound, test_cell_count_mismatch]:
+        test()
+        print("{}: ok".format(test.__name__))
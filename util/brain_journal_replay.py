@@ -0,0 +1,103 @@
+from pepper.brain.infrastructure import StoreConnector, BrainJournal
+from pepper import config
+
+import zlib
+import json
+import sys
+
+
+def decompress(path, block_size=1024 * 1024):
+    """
+    Decompress a journal segment block by block
+
+    Segments that were not closed (e.g. after a crash) miss their gzip trailer, everything before it is still read
+
+    :param path: path of the segment
+    :param block_size: number of compressed bytes to read at once
+    :return: generator of decompressed blocks
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    with open(path, 'rb') as segment:
+        for block in iter(lambda: segment.read(block_size), b''):
+            yield decompressor.decompress(block)
+
+
+def read(root, chunk_size=10000):
+    """
+    Read the brain journal, oldest segment first
+
+    N-Quads segments are read in chunks of at most chunk_size statements, TriG segments one upload at a time. SPARQL
+    updates are read as records of their own, in order with the data
+
+    :param root: path of the journal segments, with a {} placeholder (see config.BRAIN_LOG_ROOT)
+    :param chunk_size: number of statements per chunk of N-Quads
+    :return: generator of (format, data) tuples, with format 'update' and the SPARQL update as data for updates
+    """
+    for path, format in BrainJournal.segments(root):
+        chunk = []
+        rest = ''
+        for block in decompress(path):
+            lines = (rest + block).split('\n')
+            rest = lines.pop()
+
+            for line in lines:
+                if line.startswith(BrainJournal.UPDATE):
+                    # Updates start on a line of their own, data before them may just be that line end
+                    if ''.join(chunk).strip():
+                        yield format, ''.join(chunk)
+                    chunk = []
+
+                    yield 'update', json.loads(line[len(BrainJournal.UPDATE):])
+                elif line or format != 'nquads':
+                    chunk.append(line + '\n')
+
+                    if format == 'nquads' and len(chunk) >= chunk_size:
+                        yield format, ''.join(chunk)
+                        chunk = []
+
+        # A statement cut off by a crash has no line end, and is left out (TriG documents end with a line end too)
+        if chunk:
+            yield format, ''.join(chunk)
+
+
+def replay(root, address, clear=False):
+    """
+    Rebuild a brain from its journal, by uploading every segment and posting every SPARQL update (e.g. trust values,
+    renamed locations) in order
+
+    :param root: path of the journal segments, with a {} placeholder (see config.BRAIN_LOG_ROOT)
+    :param address: address of the (GraphDB) repository to rebuild
+    :param clear: whether to clear the repository first
+    :return: number of uploads and updates
+    """
+    connections = {}
+
+    if clear:
+        StoreConnector(address, 'nquads').query("CLEAR ALL", post=True)
+
+    uploads = 0
+    for format, data in read(root):
+        if format not in connections:
+            connections[format] = StoreConnector(address, 'nquads' if format == 'update' else format)
+
+        if format == 'update':
+            code = connections[format].query(data, post=True)
+        else:
+            code = connections[format].upload(data)
+
+        if not code.startswith('2'):
+            raise IOError("Could not replay journal to {}, got status {}".format(address, code))
+
+        uploads += 1
+
+    return uploads
+
+
+if __name__ == '__main__':
+
+    # Usage: python brain_journal_replay.py [address] [--clear]
+    arguments = [argument for argument in sys.argv[1:] if argument != '--clear']
+    address = arguments[0] if arguments else config.BRAIN_URL_LOCAL
+
+    print("Replayed {} uploads and updates to {}".format(replay(config.BRAIN_LOG_ROOT, address, '--clear' in sys.argv), address))